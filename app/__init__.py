@@ -4,8 +4,15 @@ from flask import Flask
 from flask_cors import CORS
 
 from app.api.routes import api
+from app.asgi import ASGIApp
 from app.cache import cache
-from app.middleware import site_middleware
+from app.commands import catalogue_command, prewarm_command
+from app.metrics import metrics_view
+from app.middleware import (
+    conditional_middleware,
+    metrics_middleware,
+    request_middleware,
+)
 from app.settings import PT_ALLOWED_ORIGINS
 
 logging.basicConfig(level=logging.INFO)
@@ -15,12 +22,23 @@ logger = logging.getLogger(__name__)
 
 def create_app() -> Flask:
     app = Flask(__name__)
-    CORS(app, resources={r"/api/*": {"origins": PT_ALLOWED_ORIGINS}})
+    CORS(
+        app,
+        resources={r"/api/*": {"origins": PT_ALLOWED_ORIGINS}},
+        expose_headers=["X-Timed-Out-Sites", "X-Failed-Sites", "X-Unavailable-Sites"],
+    )
     api.init_app(app)
     cache.init_app(app)
-    app.before_request(site_middleware())
+    app.before_request(request_middleware())
+    app.after_request(metrics_middleware())
+    app.after_request(conditional_middleware())
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    app.cli.add_command(prewarm_command)
+    app.cli.add_command(catalogue_command)
 
     return app
 
 
 app = create_app()
+# Entry point for ASGI servers, e.g. `uvicorn app:asgi_app`
+asgi_app = ASGIApp(app, api)
@@ -1,11 +1,30 @@
+import asyncio
+import json
+import math
+import time
+from contextlib import aclosing
 from datetime import datetime, timedelta
+from typing import AsyncGenerator, Iterator
 
-from flask_restx import Namespace, Resource, fields, inputs
+from flask import Response, make_response, stream_with_context
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
 
-from app.api.common import headers_parser
-from app.context_helpers import get_geo_filter, get_sites
-from app.models import MatchFilter
-from app.services.availability import get_court_data
+from app.api.common import cache_headers, headers_parser
+from app.asgi import AsyncStreamingResponse, async_view
+from app.context_helpers import get_geo_filter, get_site_distances, get_sites
+from app.models import CourtAvailabilityResponse, MatchFilter, SiteMatches
+from app.services.availability import (
+    get_court_data,
+    get_court_data_async,
+    stream_court_data,
+    stream_court_data_async,
+)
+from app.services.prewarm import queried_hours
+from app.settings import (
+    AVAILABILITY_MAX_TIMEOUT,
+    AVAILABILITY_TIMEOUT,
+    HTTP_CACHE_AVAILABILITY_MAX_AGE,
+)
 
 ns = Namespace("availability", description="See court availability")
 
@@ -37,6 +56,10 @@ site_matches_model = ns.model(
         "date": fields.String,
         "distance_km": fields.Float,
         "matches": fields.List(fields.Nested(match_info_model)),
+        "scraped_at": fields.DateTime(description="when the site was scraped, the data may be served from cache"),
+        "unavailable": fields.Boolean(
+            description="the site is not answering, the matches are the last ones scraped and may be outdated"
+        ),
     },
 )
 
@@ -56,26 +79,152 @@ availability_parser.add_argument("time_min", type=str, help="minimum time to fil
 availability_parser.add_argument(
     "time_max", type=str, help="maximum time to filter in format HH:MM, max 3 hours later", location="args"
 )
+availability_parser.add_argument(
+    "timeout",
+    type=float,
+    help=(
+        f"seconds to wait for the sites before returning partial results, default={AVAILABILITY_TIMEOUT:g}, "
+        f"max={AVAILABILITY_MAX_TIMEOUT:g}. Sites that did not answer in time are listed in the X-Timed-Out-Sites "
+        "header, sites that failed in the X-Failed-Sites header and sites that are not answering, skipped until they "
+        "recover, in the X-Unavailable-Sites header"
+    ),
+    location="args",
+)
+
+
+stream_parser = availability_parser.copy()
+stream_parser.add_argument(
+    "format",
+    type=str,
+    choices=("ndjson", "sse"),
+    help="ndjson for a JSON object per line, sse for Server-Sent Events, default=ndjson",
+    location="args",
+    default="ndjson",
+)
+
+
+def parse_availability_args(parser: reqparse.RequestParser) -> tuple[MatchFilter, float, dict]:
+    args = parser.parse_args()
+    current_time = datetime.now()
+    three_hours_later = current_time + timedelta(hours=3)
+    time_min_str = args.get("time_min") or current_time.strftime("%H:%M")
+    time_max_str = args.get("time_max") or three_hours_later.strftime("%H:%M")
+
+    match_filter = MatchFilter(
+        sport=args.get("sport"),
+        is_available=args.get("is_available"),
+        days=args.get("days", "012"),
+        time_min=time_min_str,
+        time_max=time_max_str,
+    )
+    queried_hours.record()
+    timeout = AVAILABILITY_TIMEOUT if args.get("timeout") is None else args["timeout"]
+    # NaN passes the comparison and would make every site time out, infinity is not a timeout either
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError("timeout must be greater than 0")
+    return match_filter, min(timeout, AVAILABILITY_MAX_TIMEOUT), args
 
 
 @ns.route("/")
 class CourtAvailability(Resource):
     @ns.expect(availability_parser)
     @ns.marshal_list_with(site_matches_model)
-    def get(self) -> list:
+    def get(self) -> tuple[list, int, dict]:
         """See court availability"""
-        args = availability_parser.parse_args()
-        current_time = datetime.now()
-        three_hours_later = current_time + timedelta(hours=3)
-        time_min_str = args.get("time_min") or current_time.strftime("%H:%M")
-        time_max_str = args.get("time_max") or three_hours_later.strftime("%H:%M")
-
-        match_filter = MatchFilter(
-            sport=args.get("sport"),
-            is_available=args.get("is_available"),
-            days=args.get("days", "012"),
-            time_min=time_min_str,
-            time_max=time_max_str,
+        match_filter, timeout, _ = parse_availability_args(availability_parser)
+
+        data = get_court_data(match_filter, get_sites(), get_geo_filter(), timeout, get_site_distances())
+        site_matches = [match.model_dump() for match in data.site_matches]
+        return site_matches, 200, availability_headers(data, site_matches)
+
+
+@async_view("availability_court_availability")
+async def get_court_availability_async() -> Response:
+    match_filter, timeout, _ = await asyncio.to_thread(parse_availability_args, availability_parser)
+    # Resolving the sites may request Playtomic for the clubs around
+    sites = await asyncio.to_thread(get_sites)
+
+    data = await get_court_data_async(match_filter, sites, get_geo_filter(), timeout, get_site_distances())
+    site_matches = [match.model_dump() for match in data.site_matches]
+    return make_response(ns.marshal(site_matches, site_matches_model), 200, availability_headers(data, site_matches))
+
+
+def availability_headers(data: CourtAvailabilityResponse, site_matches: list[dict]) -> dict:
+    # Partial responses are not cached, the sites that timed out or failed may answer on the next request
+    if data.timed_out_sites or data.failed_sites:
+        headers = {"Cache-Control": "no-store"}
+    else:
+        headers = cache_headers(
+            {"site_matches": site_matches, "unavailable_sites": data.unavailable_sites}, HTTP_CACHE_AVAILABILITY_MAX_AGE
         )
-        data = get_court_data(match_filter, get_sites(), get_geo_filter())
-        return [match.model_dump() for match in data]
+    if data.timed_out_sites:
+        headers["X-Timed-Out-Sites"] = ",".join(data.timed_out_sites)
+    if data.failed_sites:
+        headers["X-Failed-Sites"] = ",".join(data.failed_sites)
+    if data.unavailable_sites:
+        headers["X-Unavailable-Sites"] = ",".join(data.unavailable_sites)
+    return headers
+
+
+@ns.route("/stream")
+class CourtAvailabilityStream(Resource):
+    @ns.expect(stream_parser)
+    @ns.produces(["application/x-ndjson", "text/event-stream"])
+    def get(self) -> Response:
+        """See court availability as each site answers.
+
+        Sends a `site_matches` event per site and date, in the format of the availability endpoint, as soon as it
+        is ready (cached sites first) and a final `summary` event with the sites that timed out, failed or are
+        unavailable and the elapsed milliseconds. With ndjson each line is an object with the `event` and `data`
+        keys.
+        """
+        match_filter, timeout, args = parse_availability_args(stream_parser)
+        started_at = time.perf_counter()
+        items = stream_court_data(match_filter, get_sites(), get_geo_filter(), timeout, get_site_distances())
+
+        def generate() -> Iterator[str]:
+            for item in items:
+                yield encode_stream_item(item, args["format"], started_at)
+
+        return Response(stream_with_context(generate()), **stream_response_options(args["format"]))
+
+
+@async_view("availability_court_availability_stream")
+async def stream_court_availability_async() -> Response:
+    match_filter, timeout, args = await asyncio.to_thread(parse_availability_args, stream_parser)
+    sites = await asyncio.to_thread(get_sites)
+    started_at = time.perf_counter()
+    items = stream_court_data_async(match_filter, sites, get_geo_filter(), timeout, get_site_distances())
+
+    async def generate() -> AsyncGenerator[str, None]:
+        async with aclosing(items):
+            async for item in items:
+                yield encode_stream_item(item, args["format"], started_at)
+
+    return AsyncStreamingResponse(generate(), **stream_response_options(args["format"]))
+
+
+def stream_response_options(format: str) -> dict:
+    # Proxies must not buffer the events, the point is getting the first sites right away
+    return {
+        "mimetype": "text/event-stream" if format == "sse" else "application/x-ndjson",
+        "headers": {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    }
+
+
+def encode_stream_item(item: SiteMatches | CourtAvailabilityResponse, format: str, started_at: float) -> str:
+    encode_event = encode_sse_event if format == "sse" else encode_ndjson_event
+    if isinstance(item, SiteMatches):
+        return encode_event("site_matches", ns.marshal(item.model_dump(), site_matches_model))
+
+    summary = item.model_dump(exclude={"site_matches"})
+    summary["duration_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+    return encode_event("summary", summary)
+
+
+def encode_ndjson_event(event: str, data: dict) -> str:
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+
+def encode_sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -1,4 +1,9 @@
+import hashlib
+import json
+from typing import Any
+
 from flask_restx import reqparse
+from werkzeug.http import quote_etag
 
 headers_parser = reqparse.RequestParser()
 headers_parser.add_argument(
@@ -15,3 +20,18 @@ headers_parser.add_argument(
     required=False,
     help="The geolocation to filter by. Must be a string with the format *lat,lon,radius_km*. e.g. `39.566059,-0.545158,10`",
 )
+
+
+def cache_headers(data: Any, max_age: int) -> dict:
+    # The ETag is a digest of the data the response is made of (catalogue version, scrape time and matches of each
+    # site and day...), browsers and CDNs revalidate with If-None-Match and get a 304 while it does not change. It is
+    # computed from the fully built response, so a 304 saves the bandwidth of the body but not the work of building
+    # it. There is no Last-Modified: the matches also depend on the current time (past slots are filtered out), a
+    # response can change without any scrape. The sites depend on the X-SITE and X-GEOLOCATION headers, so caches
+    # keep a copy per value of them.
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return {
+        "ETag": quote_etag(digest[:32]),
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "X-SITE, X-GEOLOCATION",
+    }
@@ -1,8 +1,13 @@
+import asyncio
+
+from flask import Response, make_response
 from flask_restx import Namespace, Resource, fields
 
-from app.api.common import headers_parser
+from app.api.common import cache_headers, headers_parser
+from app.asgi import async_view
 from app.context_helpers import get_geo_filter
 from app.services.sites import get_available_sites
+from app.settings import HTTP_CACHE_SITES_MAX_AGE
 
 ns = Namespace("sites", description="Get the list of supported sites and last update (may be outdated)")
 
@@ -31,6 +36,14 @@ tested_sites_model = ns.model(
 class AvailableSites(Resource):
     @ns.expect(headers_parser)
     @ns.marshal_with(tested_sites_model)
-    def get(self) -> dict:
+    def get(self) -> tuple[dict, int, dict]:
         """Get the list of supported sites and last update (may be outdated)"""
-        return get_available_sites(get_geo_filter()).model_dump()
+        sites = get_available_sites(get_geo_filter()).model_dump()
+        return sites, 200, cache_headers(sites, HTTP_CACHE_SITES_MAX_AGE)
+
+
+@async_view("sites_available_sites")
+async def get_available_sites_async() -> Response:
+    # Playtomic clubs around the location may be discovered by requesting Playtomic
+    sites = (await asyncio.to_thread(get_available_sites, get_geo_filter())).model_dump()
+    return make_response(ns.marshal(sites, tested_sites_model), 200, cache_headers(sites, HTTP_CACHE_SITES_MAX_AGE))
@@ -0,0 +1,135 @@
+import asyncio
+from contextlib import aclosing, suppress
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask, Response
+from flask_restx import Api
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+AsyncView = Callable[[], Awaitable[Response]]
+
+# Async variants of the endpoints bound by waiting for the scrapes, by Flask endpoint name
+ASYNC_VIEWS: dict[str, AsyncView] = {}
+
+
+def async_view(endpoint: str) -> Callable[[AsyncView], AsyncView]:
+    def register(view: AsyncView) -> AsyncView:
+        ASYNC_VIEWS[endpoint] = view
+        return view
+
+    return register
+
+
+class AsyncStreamingResponse(Response):
+    # Response whose body is sent by the ASGI app as the async iterator produces it.
+    def __init__(self, body: AsyncGenerator[str, None], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.async_body = body
+
+
+# Serves the Flask app under an ASGI server. GET requests to the endpoints with an async view run on the event
+# loop, so a request waiting for the scrapes does not hold a thread, while the rest of the requests (docs,
+# geolocation, metrics...) are handed to the WSGI app in a thread. Async views go through the same request hooks
+# (metrics, tracing, CORS) and error handlers as the WSGI ones.
+class ASGIApp:
+    def __init__(self, flask_app: Flask, api: Api) -> None:
+        self.flask_app = flask_app
+        self.api = api
+        self.wsgi_app = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            environ = self._build_environ(scope)
+            view = ASYNC_VIEWS.get(self._match_endpoint(environ) or "")
+            if view is not None:
+                await self._call_async_view(view, environ, receive, send)
+                return
+
+        await self.wsgi_app(scope, receive, send)
+
+    async def _call_async_view(self, view: AsyncView, environ: dict, receive: Receive, send: Send) -> None:
+        with self.flask_app.request_context(environ):
+            try:
+                # The before request hooks only start the request span and timer, the views resolve the sites
+                rv = self.flask_app.preprocess_request()
+                response = self.flask_app.make_response(rv) if rv is not None else await view()
+            except Exception as e:
+                response = self.api.handle_error(e)
+            response = self.flask_app.process_response(response)
+            await self._send_response(response, receive, send)
+
+    async def _send_response(self, response: Response, receive: Receive, send: Send) -> None:
+        headers = [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in response.headers.items()]
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        if isinstance(response, AsyncStreamingResponse):
+            await self._send_stream(response.async_body, receive, send)
+        else:
+            # Like werkzeug, the body of a 304 Not Modified is not sent
+            data = b"" if response.status_code in (204, 304) else response.get_data()
+            await send({"type": "http.response.body", "body": data})
+
+    async def _send_stream(self, body: AsyncGenerator[str, None], receive: Receive, send: Send) -> None:
+        # The body is sent while watching for the client to go away, then the generator is closed so the units
+        # of the stream not started yet are cancelled.
+        async with aclosing(body):
+            sending = asyncio.ensure_future(self._send_chunks(body, send))
+            disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+            try:
+                await asyncio.wait({sending, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                disconnected.cancel()
+                if not sending.done():
+                    # The generator is left at its await point, it cannot be closed while it runs
+                    sending.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await sending
+            # Raises the errors of sending the body, or of receiving when the client did not go away
+            (disconnected if sending.cancelled() else sending).result()
+
+    async def _send_chunks(self, body: AsyncGenerator[str, None], send: Send) -> None:
+        async for chunk in body:
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _wait_for_disconnect(self, receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    def _match_endpoint(self, environ: dict) -> str | None:
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return endpoint
+
+    def _build_environ(self, scope: Scope) -> dict:
+        headers = [(key.decode("latin-1"), value.decode("latin-1")) for key, value in scope["headers"]]
+        server_host, server_port = scope.get("server") or ("localhost", 80)
+        environ = EnvironBuilder(
+            path=scope["path"],
+            base_url=f"{scope.get('scheme', 'http')}://{server_host}:{server_port}{scope.get('root_path', '')}",
+            method=scope["method"],
+            headers=headers,
+            query_string=scope["query_string"].decode("latin-1"),
+        ).get_environ()
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+        return environ
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -1,8 +1,47 @@
+from typing import Any
+
 from flask_caching import Cache
 
+from app.metrics import record_view_cache_lookup
 from app.settings import CACHE_REDIS_DB, CACHE_REDIS_HOST, CACHE_REDIS_PORT
+from app.tracing import tracer
+
+
+class TracedCache(Cache):
+    # A span per cache round trip, the key of the availability entries tells the site and the date.
+    def get(self, *args: Any, **kwargs: Any) -> Any:
+        key = args[0] if args else kwargs.get("key")
+        with tracer.span("cache.get", key=key):
+            value = super().get(*args, **kwargs)
+        record_view_cache_lookup(str(key), value)
+        return value
+
+    def set(self, *args: Any, **kwargs: Any) -> bool | None:
+        with tracer.span("cache.set", key=args[0] if args else kwargs.get("key")):
+            return super().set(*args, **kwargs)
+
+    def add(self, *args: Any, **kwargs: Any) -> bool:
+        with tracer.span("cache.add", key=args[0] if args else kwargs.get("key")):
+            return super().add(*args, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> bool:
+        with tracer.span("cache.delete", key=args[0] if args else kwargs.get("key")):
+            return super().delete(*args, **kwargs)
+
+    def has(self, *args: Any, **kwargs: Any) -> bool:
+        with tracer.span("cache.has", key=args[0] if args else kwargs.get("key")):
+            return super().has(*args, **kwargs)
+
+    def get_many(self, *args: Any, **kwargs: Any) -> list[Any]:
+        with tracer.span("cache.get_many", keys=len(args)):
+            return super().get_many(*args, **kwargs)
+
+    def set_many(self, *args: Any, **kwargs: Any) -> list[Any]:
+        with tracer.span("cache.set_many", keys=len(args[0]) if args else 0):
+            return super().set_many(*args, **kwargs)
+
 
-cache = Cache(
+cache = TracedCache(
     config={
         "CACHE_TYPE": "RedisCache",
         "CACHE_REDIS_HOST": CACHE_REDIS_HOST,
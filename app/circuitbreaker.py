@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from typing import Callable, TypeVar
+
+from app.cache import cache
+from app.metrics import CIRCUITS_OPENED
+from app.settings import (
+    CIRCUIT_BREAKER_COOLDOWN,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+    CIRCUIT_BREAKER_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, site_url: str) -> None:
+        super().__init__(f"Circuit open for site {site_url}, it is not answering")
+        self.site_url = site_url
+
+
+# Stops calling a site after repeated failures or slow calls, so a club website that is down does not hold the
+# scraper threads until the HTTP timeout on every request. The state is stored in the cache and shared by every
+# worker: the failures within the window and, once the circuit opens, when it did. After the cooldown a single
+# caller probes the site, closing the circuit if it answers and opening it again if it does not.
+# The state is read and written without locking, concurrent failures may be counted once, which only delays opening.
+# A call made within a call for the same site (e.g. a scrape fetching the bootstrap data it needs) is left to the
+# outer one, so a failure is counted once.
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, slow_call_duration: float, cooldown: float, window: int) -> None:
+        self.failure_threshold = failure_threshold
+        self.slow_call_duration = slow_call_duration
+        self.cooldown = cooldown
+        self.window = window
+        self._local = threading.local()
+
+    def call(self, site_url: str, fn: Callable[[], T]) -> T:
+        calls = self._calls_in_progress()
+        if site_url in calls:
+            return fn()
+
+        calls.add(site_url)
+        try:
+            return self._call(site_url, fn)
+        finally:
+            calls.discard(site_url)
+
+    def _call(self, site_url: str, fn: Callable[[], T]) -> T:
+        state = self._get_state(site_url)
+        if state is not None and not self._allow(site_url, state):
+            raise CircuitOpenError(site_url)
+
+        started_at = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self._record_failure(site_url)
+            raise
+
+        duration = time.monotonic() - started_at
+        if duration > self.slow_call_duration:
+            logger.warning(f"Site {site_url} took {duration:.1f} seconds to answer")
+            self._record_failure(site_url)
+        elif state is not None:
+            cache.delete(self._key(site_url))
+            cache.delete(self._probe_key(site_url))
+        return result
+
+    def is_open(self, site_url: str) -> bool:
+        # Open and cooling down, once the cooldown is over the next call probes the site.
+        state = self._get_state(site_url)
+        return state is not None and self._is_cooling_down(state)
+
+    def _calls_in_progress(self) -> set[str]:
+        if not hasattr(self._local, "calls"):
+            self._local.calls = set()
+        return self._local.calls
+
+    def _allow(self, site_url: str, state: dict) -> bool:
+        if state.get("opened_at") is None:
+            return True
+        if self._is_cooling_down(state):
+            return False
+        return cache.add(self._probe_key(site_url), True, timeout=int(self.cooldown))
+
+    def _is_cooling_down(self, state: dict) -> bool:
+        opened_at = state.get("opened_at")
+        return opened_at is not None and time.time() - opened_at < self.cooldown
+
+    def _record_failure(self, site_url: str) -> None:
+        state = self._get_state(site_url) or {"failures": 0, "opened_at": None}
+        state["failures"] += 1
+        # A failed probe opens the circuit again right away
+        if state["opened_at"] is not None or state["failures"] >= self.failure_threshold:
+            if state["opened_at"] is None:
+                logger.warning(f"Circuit opened for site {site_url} after {state['failures']} failures")
+                CIRCUITS_OPENED.labels(site_url).inc()
+            else:
+                cache.delete(self._probe_key(site_url))
+            state["opened_at"] = time.time()
+            cache.set(self._key(site_url), state, timeout=int(self.cooldown) + self.window)
+        else:
+            cache.set(self._key(site_url), state, timeout=self.window)
+
+    def _get_state(self, site_url: str) -> dict | None:
+        state = cache.get(self._key(site_url))
+        return state if isinstance(state, dict) else None
+
+    def _key(self, site_url: str) -> str:
+        return f"circuit-{site_url}"
+
+    def _probe_key(self, site_url: str) -> str:
+        return f"circuit-{site_url}-probe"
+
+
+circuit_breaker = CircuitBreaker(
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+    CIRCUIT_BREAKER_COOLDOWN,
+    CIRCUIT_BREAKER_WINDOW,
+)
@@ -0,0 +1,38 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from app.services.catalogue import init_catalogue
+from app.services.prewarm import run_prewarm_cycle
+from app.services.sites import SUPPORTED_SITES
+from app.settings import PREWARM_DAYS, PREWARM_INTERVAL, SITE_CATALOGUE_PATH
+
+
+@click.command("prewarm")
+@click.option("--days", type=click.IntRange(1, 7), default=PREWARM_DAYS, show_default=True, help="Days to scrape.")
+@click.option(
+    "--interval", type=float, default=PREWARM_INTERVAL, show_default=True, help="Seconds each scraping cycle lasts."
+)
+@click.option("--once", is_flag=True, help="Run a single cycle and exit.")
+@with_appcontext
+def prewarm_command(days: int, interval: float, once: bool) -> None:
+    """Scrape the known sites ahead of the user requests and store the results in the cache."""
+    while True:
+        run_prewarm_cycle(days, interval)
+        if once:
+            break
+
+
+@click.group("catalogue")
+def catalogue_command() -> None:
+    """Manage the site catalogue."""
+
+
+@catalogue_command.command("init")
+@click.option("--path", default=SITE_CATALOGUE_PATH, show_default=True, help="SQLite file of the catalogue.")
+def init_catalogue_command(path: str) -> None:
+    """Create the site catalogue and add the supported sites to it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = init_catalogue(path, SUPPORTED_SITES)
+    click.echo(f"Added {count} sites to the catalogue {path}")
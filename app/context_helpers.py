@@ -1,17 +1,64 @@
 from typing import cast
 
-from flask import g
+from flask import g, request
 
 from app.models import GeolocationFilter, SiteInfo
+from app.services.sites import (
+    compute_site_distances,
+    find_site_by_url_or_unknown,
+    get_sites_in_radius,
+)
+from app.settings import DEFAULT_GEOLOCATION
+from app.tracing import tracer
+
+# The sites and the geo filter of a request are resolved from the X-SITE and X-GEOLOCATION headers the first time
+# they are used, so the endpoints that do not work with sites (docs, geolocation, metrics...) neither validate the
+# headers nor request Playtomic for the clubs around.
 
 
 def get_sites() -> list[SiteInfo]:
     # This function is used to get the sites from the global context typed correctly
     # since the global context is not typed by default.
+    if "sites" not in g:
+        _resolve_sites()
     return cast(list[SiteInfo], g.sites)
 
 
 def get_geo_filter() -> GeolocationFilter:
     # This function is used to get the geo filter from the global context typed correctly
     # since the global context is not typed by default.
+    if "geo_filter" not in g:
+        g.geo_filter = _parse_geo_filter()
     return cast(GeolocationFilter, g.geo_filter)
+
+
+def get_site_distances() -> dict[str, float]:
+    # This function is used to get the distance in km to each site from the global context typed correctly
+    # since the global context is not typed by default.
+    if "site_distances" not in g:
+        _resolve_sites()
+    return cast(dict[str, float], g.site_distances)
+
+
+def _parse_geo_filter() -> GeolocationFilter:
+    if request.headers.get("X-SITE") and request.headers.get("X-GEOLOCATION"):
+        raise ValueError("Please provide only one of the following headers: X-SITE or X-GEOLOCATION")
+    geo_filter_header = request.headers.get("X-GEOLOCATION") or DEFAULT_GEOLOCATION
+    try:
+        latitude, longitude, radius = geo_filter_header.split(",")
+    except ValueError:
+        raise ValueError("Please provide a valid geolocation header with the format: latitude,longitude,radius_km")
+    return GeolocationFilter(latitude=float(latitude), longitude=float(longitude), radius_km=int(radius))
+
+
+def _resolve_sites() -> None:
+    geo_filter = get_geo_filter()
+    with tracer.span("resolve_sites"):
+        site_url = request.headers.get("X-SITE")
+        if site_url:
+            g.sites = [find_site_by_url_or_unknown(site_url)]
+            g.site_distances = compute_site_distances(g.sites, geo_filter)
+        else:
+            sites_in_radius = get_sites_in_radius(geo_filter)
+            g.sites = [site for site, _ in sites_in_radius]
+            g.site_distances = {site.url: distance_km for site, distance_km in sites_in_radius}
@@ -0,0 +1,102 @@
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, TypeVar
+
+from flask import current_app, has_app_context
+
+from app.settings import SCRAPER_MAX_WORKERS, SCRAPER_MAX_WORKERS_PER_HOST
+from app.tracing import Span, current_span, use_span
+
+T = TypeVar("T")
+
+
+def with_app_context(fn: Callable[..., T], *args: Any) -> Callable[[], T]:
+    # Scrapers rely on the Flask cache, so the work units have to run inside the caller's app context. The spans
+    # they open are children of the caller's one.
+    parent_span = current_span()
+    if not has_app_context():
+        return partial(_run_in_span, parent_span, fn, *args)
+
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+
+    def task() -> T:
+        with app.app_context():
+            return _run_in_span(parent_span, fn, *args)
+
+    return task
+
+
+def _run_in_span(span: Span | None, fn: Callable[..., T], *args: Any) -> T:
+    with use_span(span):
+        return fn(*args)
+
+
+# Thread pool with a global concurrency limit and a per-host one. Work units over the per-host limit wait in a
+# queue instead of holding a pool thread, so a host with many pending units (e.g. playtomic.io) does not starve
+# the rest of the hosts. Units can be cancelled until a pool thread starts them, so a unit waiting for units it
+# submitted can take back the ones not started and run them itself (see `run_all`).
+class ScrapeExecutor:
+
+    def __init__(self, max_workers: int, max_workers_per_host: int) -> None:
+        self.max_workers_per_host = max_workers_per_host
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scraper")
+        self._lock = Lock()
+        self._running: dict[str, int] = defaultdict(int)
+        self._pending: dict[str, deque[tuple[Future, Callable[[], Any]]]] = defaultdict(deque)
+
+    def submit(self, host: str, fn: Callable[..., T], *args: Any) -> Future[T]:
+        future: Future[T] = Future()
+        task = with_app_context(fn, *args)
+        with self._lock:
+            if self._running[host] >= self.max_workers_per_host:
+                self._pending[host].append((future, task))
+                return future
+            self._running[host] += 1
+
+        self._run(host, future, task)
+        return future
+
+    def run_all(self, host: str, fn: Callable[[Any], T], items: list[Any]) -> list[T]:
+        # Runs `fn` on every item within the limits of the host, from a unit of the executor too: the first item
+        # runs in the calling thread and the items still waiting for a slot of the host or a pool thread when their
+        # turn comes are run by it as well, so the caller never waits for units that cannot start.
+        futures = [self.submit(host, fn, item) for item in items[1:]]
+        results = [fn(items[0])] if items else []
+        for future, item in zip(futures, items[1:]):
+            results.append(fn(item) if future.cancel() else future.result())
+        return results
+
+    def _run(self, host: str, future: Future, task: Callable[[], Any]) -> None:
+        self._pool.submit(self._execute, host, future, task)
+
+    def _execute(self, host: str, future: Future, task: Callable[[], Any]) -> None:
+        try:
+            # Units cancelled while waiting for a pool thread are skipped
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = task()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        finally:
+            self._release(host)
+
+    def _release(self, host: str) -> None:
+        while True:
+            with self._lock:
+                if not self._pending[host]:
+                    self._running[host] -= 1
+                    return
+                future, task = self._pending[host].popleft()
+
+            # Units cancelled while waiting for their host are skipped, keeping the host slot for the next one.
+            if not future.cancelled():
+                self._run(host, future, task)
+                return
+
+
+scrape_executor = ScrapeExecutor(SCRAPER_MAX_WORKERS, SCRAPER_MAX_WORKERS_PER_HOST)
@@ -5,6 +5,7 @@ import requests
 from app.integrations.geolocation.geolocation_provider_interface import (
     GeolocationProvider,
 )
+from app.integrations.http import http_session
 from app.models import GeolocatedPlace
 from app.settings import LOCATION_IQ_API_KEY
 
@@ -24,7 +25,7 @@ class LocationIQProvider(GeolocationProvider):
         )
 
     def _handle_get_response(self, url: str, params: dict) -> list:
-        response = requests.get(url, params={**self.BASE_QUERY_PARAMS, **params})
+        response = http_session.get(url, params={**self.BASE_QUERY_PARAMS, **params})
         try:
             response.raise_for_status()
             json_response = response.json()
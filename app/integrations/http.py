@@ -0,0 +1,67 @@
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.metrics import record_http_response
+from app.settings import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF,
+    SCRAPER_HTTP_TIMEOUT,
+)
+from app.tracing import tracer
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    # requests.Session has no default timeout, without it a hanging club website blocks the scraper forever.
+    def __init__(self, *args: Any, timeout: float = SCRAPER_HTTP_TIMEOUT, **kwargs: Any) -> None:
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        with tracer.span(f"http {request.method}", url=request.url) as span:
+            try:
+                response = super().send(request, **kwargs)
+            except requests.RequestException:
+                record_http_response(request.url or "", None)
+                raise
+            span.set_attribute("status", response.status_code)
+        record_http_response(request.url or "", response.status_code)
+        return response
+
+
+class SharedHTTPAdapter(TimeoutHTTPAdapter):
+    # The connection pools outlive the sessions mounting the adapter, closing a session must not drop them.
+    def close(self) -> None:
+        pass
+
+
+# Process wide connection pools, one per host, so the TCP and TLS handshakes are paid once per connection instead of
+# once per scraper. Only idempotent methods are retried on connection errors and gateway errors.
+http_adapter = SharedHTTPAdapter(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    max_retries=Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,
+    ),
+)
+
+
+def new_session() -> requests.Session:
+    # Sessions keep their own headers and cookies, while the connections come from the shared pools.
+    session = requests.Session()
+    session.mount("https://", http_adapter)
+    session.mount("http://", http_adapter)
+    return session
+
+
+# Session for the stateless integrations (Playtomic tenants, geolocation)
+http_session = new_session()
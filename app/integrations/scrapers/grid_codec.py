@@ -0,0 +1,76 @@
+import struct
+from datetime import datetime, timedelta, timezone
+
+from app.models import DayGrid
+
+# Day grids are cached in a compact columnar encoding instead of pickled pydantic models. The sport, court and url
+# strings repeat on most slots of a club, they are interned in a table and the columns store their indexes, while
+# times are stored as minutes since midnight. The first byte is the format version, grids cached with another
+# version (or pickled DayGrid objects) are read by `decode_day_grid` too, so a deploy does not drop the cache.
+GRID_FORMAT_VERSION = 1
+
+# version, scraped_at (microseconds since the epoch), number of strings, number of matches
+_HEADER = struct.Struct("!BqHI")
+_STRING_LENGTH = struct.Struct("!H")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_TIMES = [f"{minutes // 60:02d}:{minutes % 60:02d}" for minutes in range(24 * 60)]
+
+
+def encode_day_grid(grid: DayGrid) -> bytes:
+    strings: dict[str, int] = {}
+    sports, courts, urls, minutes = [], [], [], []
+    for match in grid.matches:
+        sports.append(strings.setdefault(match.sport, len(strings)))
+        courts.append(strings.setdefault(match.court, len(strings)))
+        urls.append(strings.setdefault(match.url, len(strings)))
+        hours, mins = match.time.split(":")
+        minutes.append(int(hours) * 60 + int(mins))
+
+    count = len(grid.matches)
+    scraped_at = (grid.scraped_at - _EPOCH) // timedelta(microseconds=1)
+    parts = [_HEADER.pack(GRID_FORMAT_VERSION, scraped_at, len(strings), count)]
+    for string in strings:
+        encoded = string.encode()
+        parts.append(_STRING_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    parts.append(struct.pack(f"!{4 * count}H", *sports, *courts, *urls, *minutes))
+    parts.append(bytes(match.is_available for match in grid.matches))
+    return b"".join(parts)
+
+
+def is_day_grid(data: object) -> bool:
+    return isinstance(data, DayGrid) or (
+        isinstance(data, bytes) and len(data) >= _HEADER.size and data[0] == GRID_FORMAT_VERSION
+    )
+
+
+def decode_day_grid(data: object) -> DayGrid | None:
+    # Returns None for entries that are not a day grid or use an unknown version, they are scraped again.
+    if isinstance(data, DayGrid):
+        return data
+    if not isinstance(data, bytes) or not is_day_grid(data):
+        return None
+
+    _, scraped_at, string_count, count = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    strings = []
+    for _ in range(string_count):
+        (length,) = _STRING_LENGTH.unpack_from(data, offset)
+        offset += _STRING_LENGTH.size
+        strings.append(data[offset : offset + length].decode())
+        offset += length
+
+    columns = struct.unpack_from(f"!{4 * count}H", data, offset)
+    sports, courts, urls = (map(strings.__getitem__, columns[i * count : (i + 1) * count]) for i in range(3))
+    times = map(_TIMES.__getitem__, columns[3 * count :])
+    available = map(bool, data[offset + 8 * count :])
+    # Validating the whole grid in one call is faster than building the models one by one
+    return DayGrid.model_validate(
+        {
+            "matches": [
+                {"sport": sport, "court": court, "url": url, "time": time, "is_available": is_available}
+                for sport, court, url, time, is_available in zip(sports, courts, urls, times, available)
+            ],
+            "scraped_at": _EPOCH + timedelta(microseconds=scraped_at),
+        }
+    )
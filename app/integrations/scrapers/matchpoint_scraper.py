@@ -1,32 +1,80 @@
 import logging
 import re
 import unicodedata
+from copy import copy
 from datetime import datetime
-from typing import Self
+from typing import Callable, Self, TypeVar
 
 from bs4 import BeautifulSoup
 
-from app.integrations.scrapers.scraper_interface import ScraperInterface
-from app.models import MatchFilter, MatchInfo, SiteInfo
-from app.services.common import check_filters, time_in_past, time_not_in_range
+from app.cache import cache
+from app.circuitbreaker import circuit_breaker
+from app.executor import scrape_executor
+from app.integrations.scrapers.scraper_interface import ScrapeError, ScraperInterface
+from app.models import MatchFilter, MatchInfo, SiteInfo, SiteMatches
+from app.settings import MATCHPOINT_BOOTSTRAP_TTL
+from app.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class MatchpointScraper(ScraperInterface):
     BASE_URL = "https://{site}/Booking/Grid.aspx"
     SPORTS_URL = "https://{site}/booking/srvc.aspx/ObtenerCuadros"
     BOOKING_URL = "https://{site}/booking/srvc.aspx/ObtenerCuadro"
 
-    def __init__(self, site: SiteInfo, filter: MatchFilter) -> None:
+    def __init__(self, site: SiteInfo, filter: MatchFilter, sport_id: int | None = None) -> None:
         super().__init__(site, filter)
+        # Clubs have a grid per sport, scrapers bound to a sport scrape and cache that grid only.
+        self.sport_id = sport_id
         self.session.headers.update(
             {
                 "Referer": self.BASE_URL.format(site=site.url),
             }
         )
-        self.key = self._get_api_key()
-        self.sport_ids = self._get_sport_ids()
+        self.sport_names: dict[int, str] = {}
+        self._key: str | None = None
+        self._sport_ids: list[int] | None = None
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            self._key = self._get_bootstrap_data("key", self._get_api_key)
+        return self._key
+
+    @property
+    def sport_ids(self) -> list[int]:
+        if self._sport_ids is None:
+            self._sport_ids = self._get_sport_ids()
+        return self._sport_ids
+
+    def _get_bootstrap_data(self, name: str, fetch: Callable[[], T]) -> T:
+        # The api key and the sports of the club rarely change, they are cached so warm requests skip the Grid.aspx
+        # and ObtenerCuadros round trips. Empty values are not cached, they are usually a failed bootstrap.
+        # The sports are fetched before the scrapes of the grids, the circuit breaker counts the bootstrap failures;
+        # within a scrape the failure is counted once, by the scrape.
+        cache_key = self._bootstrap_cache_key(name)
+        data = self.prefetched_data.get(cache_key)
+        if data is None:
+            data = cache.get(cache_key)
+        if data is None:
+            with tracer.span("matchpoint.bootstrap", site=self.site.url, data=name):
+                data = circuit_breaker.call(self.site.url, fetch)
+            if data:
+                cache.set(cache_key, data, timeout=MATCHPOINT_BOOTSTRAP_TTL)
+        return data
+
+    def _invalidate_bootstrap_data(self) -> None:
+        cache.delete(self._bootstrap_cache_key("key"))
+        cache.delete(self._bootstrap_cache_key("sports"))
+        self.prefetched_data.pop(self._bootstrap_cache_key("key"), None)
+        self.prefetched_data.pop(self._bootstrap_cache_key("sports"), None)
+        self._key = None
+
+    def _bootstrap_cache_key(self, name: str) -> str:
+        return f"matchpoint-{name}-{self.site.url}"
 
     def _get_api_key(self) -> str:
         url = self.BASE_URL.format(site=self.site.url)
@@ -58,48 +106,125 @@ class MatchpointScraper(ScraperInterface):
                 sport_ids.append(sport["Id"])
         return sport_ids
 
-    def _get_sport_ids(self) -> list[int]:
+    def _get_sports(self) -> list[dict]:
         url = self.SPORTS_URL.format(site=self.site.url)
         response = self.session.post(url, json={"key": self.key})
-        response_data = response.json()
-        return self._filter_sport_ids(response_data["d"], self.filter)
+        return response.json()["d"]
 
-    def _get_scraped_availability(self: Self, date: str) -> list[dict]:
+    def _get_sport_ids(self) -> list[int]:
+        sports = self._get_bootstrap_data("sports", self._get_sports)
+        self.sport_names = {sport["Id"]: sport["Nombre"] for sport in sports}
+        return self._filter_sport_ids(self._get_site_sports(sports), self.filter)
+
+    def _get_site_sports(self, sports: list[dict]) -> list[dict]:
+        # The `sport_ids` param of the catalogue (e.g. "4,5") limits the grids scraped to those of the club with
+        # bookable courts, by default every grid is.
+        sport_ids = self.site.scraper_params.get("sport_ids")
+        if not sport_ids:
+            return sports
+        allowed_ids = {int(sport_id) for sport_id in sport_ids.split(",")}
+        return [sport for sport in sports if sport["Id"] in allowed_ids]
+
+    def get_date_matches(self: Self, date: str) -> SiteMatches:
+        if self.sport_id is not None:
+            return super().get_date_matches(date)
+
+        site_matches = self._map_sport_scrapers(lambda scraper: scraper.get_date_matches(date))
+        scraped_at = [site_match.scraped_at for site_match in site_matches if site_match.scraped_at]
+        return SiteMatches(
+            site=self.site,
+            date=date,
+            matches=[match for site_match in site_matches for match in site_match.matches],
+            scraped_at=min(scraped_at, default=None),
+            unavailable=any(site_match.unavailable for site_match in site_matches),
+        )
+
+    def get_cache_keys(self: Self, date: str) -> list[str]:
+        if self.sport_id is not None:
+            return super().get_cache_keys(date)
+
+        # The grid keys depend on the sports of the club, the cached sports are read first. Without them the sports
+        # are requested to the site while scraping, there is nothing else to prefetch.
+        if self._sport_ids is None:
+            sports_key = self._bootstrap_cache_key("sports")
+            if sports_key not in self.prefetched_data:
+                return [sports_key]
+            if not self.prefetched_data[sports_key]:
+                return []
+        return [self._get_sport_scraper(sport_id)._generate_cache_key(self.site, date) for sport_id in self.sport_ids]
+
+    def refresh_date_matches(self: Self, date: str) -> None:
+        if self.sport_id is not None:
+            return super().refresh_date_matches(date)
+
+        self._map_sport_scrapers(lambda scraper: scraper.refresh_date_matches(date))
+
+    def _map_sport_scrapers(self: Self, fn: Callable[["MatchpointScraper"], T]) -> list[T]:
+        # The grids of the matching sports are cached separately, so any sport filter reuses them, and the missing
+        # ones are fetched concurrently within the per-host limit of the club.
         if not self.sport_ids:
             logger.info(f"No sport id found for site {self.site.url}")
             return []
 
+        scrapers = [self._get_sport_scraper(sport_id) for sport_id in self.sport_ids]
+        return scrape_executor.run_all(self.site.host, fn, scrapers)
+
+    def _get_sport_scraper(self: Self, sport_id: int) -> Self:
+        # The sport scrapers share the session and the bootstrap data of this one.
+        scraper = copy(self)
+        scraper.sport_id = sport_id
+        return scraper
+
+    def _clone(self: Self) -> Self:
+        # The sports of the club are kept, the name of the sport of the grid comes from them
+        clone = type(self)(self.site, self.filter, self.sport_id)
+        clone.sport_names = self.sport_names
+        clone._sport_ids = self._sport_ids
+        return clone
+
+    def _generate_cache_key(self: Self, site: SiteInfo, date: str) -> str:
+        return f"availability-{site.url}-{self.sport_id}-{date}"
+
+    def _get_scraped_availability(self: Self, date: str) -> list[dict]:
+        response_data = self._get_grid(date)
+        if not self._has_courts(response_data):
+            # A rejected key gets an answer without courts, the bootstrap is fetched again and the grid retried once.
+            logger.info(f"Courts not found for date {date}, site {self.site.url}, renewing the api key")
+            self._invalidate_bootstrap_data()
+            response_data = self._get_grid(date)
+
+        if not self._has_courts(response_data):
+            raise ScrapeError(self.site.url, date, "Columns not found")
+
+        return response_data["d"]["Columnas"]
+
+    def _get_grid(self: Self, date: str) -> dict:
         url = self.BOOKING_URL.format(site=self.site.url)
         payload_date = datetime.strptime(date, "%Y-%m-%d").strftime("%d/%m/%Y")
-        payload = {"idCuadro": self.sport_ids[0], "fecha": payload_date, "key": self.key}
+        payload = {"idCuadro": self.sport_id, "fecha": payload_date, "key": self.key}
         response = self.session.post(url, json=payload)
-        response_data = response.json()
+        return response.json()
 
-        if "d" not in response_data or "Columnas" not in response_data["d"]:
-            logger.error(f"Columns not found for date {date}, site {self.site.url}")
-            return []
-
-        return response_data["d"]["Columnas"]
+    def _has_courts(self: Self, response_data: dict) -> bool:
+        return isinstance(response_data.get("d"), dict) and "Columnas" in response_data["d"]
 
     def _get_daily_matches(self: Self, date: str) -> list[MatchInfo]:
         data: list[MatchInfo] = []
 
         courts = self._get_scraped_availability(date)
+        sport_name = self.sport_names.get(self.sport_id, "padel") if self.sport_id is not None else "padel"
         for court in courts:
             court_name = court["TextoPrincipal"]
             matches = court["HorariosFijos"]
             for match in matches:
-                start_time = match["StrHoraInicio"]
-                if time_not_in_range(start_time, self.filter) or time_in_past(date, start_time):
-                    continue
-                match_info = MatchInfo(
-                    sport=self.filter.sport or "padel",
-                    url=self.BASE_URL.format(site=self.site.url),
-                    time=start_time,
-                    court=court_name,
-                    is_available=True,
+                data.append(
+                    MatchInfo(
+                        sport=sport_name,
+                        url=self.BASE_URL.format(site=self.site.url),
+                        time=match["StrHoraInicio"],
+                        court=court_name,
+                        is_available=True,
+                    )
                 )
-                if check_filters(match_info, self.filter):
-                    data.append(match_info)
 
         return data
@@ -1,11 +1,12 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Self
 
 import pytz
 
-from app.integrations.scrapers.scraper_interface import ScraperInterface
+from app.integrations.scrapers.scraper_interface import ScrapeError, ScraperInterface
 from app.models import MatchFilter, MatchInfo, SiteInfo
-from app.services.common import check_filters
+from app.services.common import check_filters, time_not_in_range
 
 
 class PlaytomicScraper(ScraperInterface):
@@ -15,10 +16,10 @@ class PlaytomicScraper(ScraperInterface):
         super().__init__(site, filter)
         self.court_friendly_names: dict[str, str] = {}
 
-    def _reduce_results(self: Self, date: str, start_time: str, duration: int, used_start_times: set[str]) -> bool:
-        # Artificially reduce the results to only show 90 minutes matches that start at the hour
-        match_date = datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M:%S")
-        return match_date >= datetime.now() and duration == 90 and start_time not in used_start_times
+    def _time_in_past(self: Self, date: str, time: str) -> bool:
+        # Playtomic slots are compared in UTC, the same timezone the API returns them.
+        local_time = pytz.timezone("Europe/Madrid").localize(datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M"))
+        return local_time.astimezone(pytz.utc).replace(tzinfo=None) < datetime.now()
 
     def _localize_time(self: Self, date: str, start_time: str) -> str:
         time_utc = pytz.utc.localize(datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M:%S"))
@@ -29,18 +30,22 @@ class PlaytomicScraper(ScraperInterface):
             self.court_friendly_names[court_id] = f"Padel {len(self.court_friendly_names) + 1}"
         return self.court_friendly_names[court_id]
 
+    def _tenant_id(self: Self) -> str:
+        # The `tenant_id` param of the catalogue, for clubs listed with their own url instead of the Playtomic one
+        return self.site.scraper_params.get("tenant_id") or self.site.url.split("/")[-1]
+
     def _get_scraped_availability(self: Self, date: str) -> list[dict]:
         params = {
             "user_id": "me",
-            "tenant_id": self.site.url.split("/")[-1],
+            "tenant_id": self._tenant_id(),
             "sport_id": "PADEL",
-            "local_start_min": f"{date}T{self.filter.time_min}:00",
-            "local_start_max": f"{date}T{self.filter.time_max}:00",
+            "local_start_min": f"{date}T00:00:00",
+            "local_start_max": f"{date}T23:59:59",
         }
 
         response = self.session.get(self.BASE_URL, params=params)
         if response.status_code != 200:
-            return []
+            raise ScrapeError(self.site.url, date, f"Availability answered with status {response.status_code}")
 
         return response.json()
 
@@ -49,25 +54,40 @@ class PlaytomicScraper(ScraperInterface):
 
         courts = self._get_scraped_availability(date)
         for court in courts:
-
-            used_start_times: set[str] = set()
             for match in court["slots"]:
-                if not self._reduce_results(date, match["start_time"], match["duration"], used_start_times):
+                # Artificially reduce the results to only show 90 minutes matches
+                if match["duration"] != 90:
                     continue
 
-                time = datetime.strptime(match["start_time"], "%H:%M:%S")
-                used_start_times.add(match["start_time"])
-                used_start_times.add((time + timedelta(minutes=30)).strftime("%H:%M:%S"))
-                used_start_times.add((time + timedelta(hours=1)).strftime("%H:%M:%S"))
-
-                match_info = MatchInfo(
-                    sport="padel",
-                    court=self._friendly_court_name(court["resource_id"]),
-                    time=self._localize_time(date, match["start_time"]),
-                    url=self.site.url,
-                    is_available=True,
+                data.append(
+                    MatchInfo(
+                        sport="padel",
+                        court=self._friendly_court_name(court["resource_id"]),
+                        time=self._localize_time(date, match["start_time"]),
+                        url=self.site.url,
+                        is_available=True,
+                    )
                 )
-                if check_filters(match_info, self.filter):
-                    data.append(match_info)
+
+        return data
+
+    def _filter_matches(self: Self, date: str, matches: list[MatchInfo]) -> list[MatchInfo]:
+        data: list[MatchInfo] = []
+
+        # Artificially reduce the results to only show matches that don't overlap with the previous one shown
+        used_start_times: dict[str, set[str]] = defaultdict(set)
+        for match in matches:
+            if time_not_in_range(match.time, self.filter) or self._time_in_past(date, match.time):
+                continue
+            if match.time in used_start_times[match.court]:
+                continue
+
+            time = datetime.strptime(match.time, "%H:%M")
+            used_start_times[match.court].add(match.time)
+            used_start_times[match.court].add((time + timedelta(minutes=30)).strftime("%H:%M"))
+            used_start_times[match.court].add((time + timedelta(hours=1)).strftime("%H:%M"))
+
+            if check_filters(match, self.filter):
+                data.append(match)
 
         return data
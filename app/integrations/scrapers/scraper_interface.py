@@ -1,55 +1,175 @@
 import logging
-from typing import Self
-
-import requests
+from datetime import datetime, timedelta, timezone
+from typing import Any, Self
 
 from app.cache import cache
-from app.models import MatchFilter, MatchInfo, SiteInfo, SiteMatches
-from app.services.common import get_weekly_dates
+from app.circuitbreaker import circuit_breaker
+from app.executor import scrape_executor
+from app.integrations.http import new_session
+from app.integrations.scrapers.grid_codec import (
+    decode_day_grid,
+    encode_day_grid,
+    is_day_grid,
+)
+from app.metrics import SCRAPE_LATENCY, SCRAPES_IN_PROGRESS, record_cache_lookup
+from app.models import DayGrid, MatchFilter, MatchInfo, SiteInfo, SiteMatches
+from app.services.common import (
+    check_filters,
+    get_weekly_dates,
+    time_in_past,
+    time_not_in_range,
+)
+from app.settings import (
+    AVAILABILITY_CACHE_HARD_TTL,
+    AVAILABILITY_CACHE_SOFT_TTL,
+    SINGLE_FLIGHT_LEASE,
+)
+from app.singleflight import single_flight
+from app.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 
+# The site answered without the availability (an error status, a page without the grid...). It is raised instead of
+# returning no matches, so the empty answer is neither cached as the grid of the day nor missed by the circuit breaker.
+class ScrapeError(Exception):
+    def __init__(self, site_url: str, date: str, reason: str) -> None:
+        super().__init__(f"{reason} for date {date}, site {site_url}")
+        self.site_url = site_url
+
+
 class ScraperInterface:
 
     def __init__(self, site: SiteInfo, filter: MatchFilter) -> None:
         self.site = site
         self.filter = filter
-        self.session = requests.Session()
+        self.session = new_session()
+        # Cache entries read in bulk before the scrape (see `get_cache_keys`), they are used instead of reading
+        # the cache again
+        self.prefetched_data: dict[str, Any] = {}
 
     def get_site_matches(self: Self) -> list[SiteMatches]:
         site_matches: list[SiteMatches] = []
         try:
             for date in get_weekly_dates(self.filter):
-                site_match = SiteMatches(site=self.site, date=date, matches=[])
-                cache_key = self._generate_cache_key(self.site, self.filter, date)
-                site_match.matches = self._get_cached_data(cache_key)
-                if site_match.matches:
-                    site_matches.append(site_match)
-                    continue
-
-                site_match.matches = self._get_daily_matches(date)
-
-                site_match.matches.sort(key=lambda x: (x.court, x.time))
-                self._cache_data(cache_key, site_match.matches)
+                site_match = self.get_date_matches(date)
                 if site_match.matches:
                     site_matches.append(site_match)
         finally:
             self.session.close()
         return site_matches
 
-    def _generate_cache_key(self: Self, site: SiteInfo, filter: MatchFilter, date: str) -> str:
-        return f"{site.url}-{filter.sport}-{filter.is_available}-{date}-{filter.time_min}-{filter.time_max}"
+    def get_date_matches(self: Self, date: str) -> SiteMatches:
+        # The cache holds the whole day grid of the site, filters are applied on read so one scrape serves every
+        # filter combination. Stale grids are served right away while they are refreshed in background.
+        # While the circuit of the site is open stale grids are served flagged as unavailable and not refreshed.
+        cache_key = self._generate_cache_key(self.site, date)
+        grid = self._get_prefetched_or_cached_data(cache_key)
+        unavailable = False
+        if grid is None:
+            record_cache_lookup("availability", "miss")
+            grid = self._scrape(cache_key, date)
+        elif self._is_stale(grid):
+            record_cache_lookup("availability", "stale")
+            unavailable = circuit_breaker.is_open(self.site.url)
+            if not unavailable:
+                self._refresh_in_background(cache_key, date)
+        else:
+            record_cache_lookup("availability", "hit")
+
+        return SiteMatches(
+            site=self.site,
+            date=date,
+            matches=self._filter_matches(date, grid.matches),
+            scraped_at=grid.scraped_at,
+            unavailable=unavailable,
+        )
+
+    def refresh_date_matches(self: Self, date: str) -> None:
+        cache_key = self._generate_cache_key(self.site, date)
+        grid = self._get_prefetched_or_cached_data(cache_key)
+        if grid is None or self._is_stale(grid):
+            self._scrape(cache_key, date)
+
+    def get_cache_keys(self: Self, date: str) -> list[str]:
+        # Cache entries `get_date_matches` reads, so the caller can read those of many scrapers in one round trip.
+        # Keys depending on other cache entries are returned once those are in `prefetched_data`.
+        return [self._generate_cache_key(self.site, date)]
+
+    def has_prefetched_grids(self: Self, date: str) -> bool:
+        # Whether `get_date_matches` is served from the prefetched entries alone, without requesting the site.
+        cache_keys = self.get_cache_keys(date)
+        return bool(cache_keys) and all(is_day_grid(self.prefetched_data.get(key)) for key in cache_keys)
+
+    def _scrape(self: Self, cache_key: str, date: str) -> DayGrid:
+        return single_flight.do(
+            cache_key, lambda: self._scrape_and_cache(cache_key, date), lambda: self._get_cached_data(cache_key)
+        )
+
+    def _scrape_and_cache(self: Self, cache_key: str, date: str) -> DayGrid:
+        with (
+            tracer.span("scrape", site=self.site.url, site_type=self.site.type, date=date),
+            SCRAPE_LATENCY.labels(self.site.type, self.site.url).time(),
+            SCRAPES_IN_PROGRESS.labels(self.site.type).track_inprogress(),
+        ):
+            matches = circuit_breaker.call(self.site.url, lambda: self._get_daily_matches(date))
+        matches.sort(key=lambda x: (x.court, x.time))
+        grid = DayGrid(matches=matches, scraped_at=datetime.now(timezone.utc))
+        self._cache_data(cache_key, grid)
+        return grid
+
+    def _refresh_in_background(self: Self, cache_key: str, date: str) -> None:
+        # Only one refresh per key at a time across workers, the rest keep serving the stale grid.
+        if not cache.add(f"{cache_key}-refresh", True, timeout=SINGLE_FLIGHT_LEASE):
+            return
+
+        def refresh() -> None:
+            scraper = self._clone()
+            try:
+                scraper._scrape(cache_key, date)
+            except Exception as e:
+                logger.error(f"Error refreshing site {self.site.url} for date {date}: {e}")
+            finally:
+                scraper.session.close()
+                cache.delete(f"{cache_key}-refresh")
+
+        scrape_executor.submit(self.site.host, refresh)
+
+    def _clone(self: Self) -> Self:
+        # New scraper for the same work, with its own session, used to scrape out of the request.
+        return type(self)(self.site, self.filter)
+
+    def _is_stale(self: Self, grid: DayGrid) -> bool:
+        return datetime.now(timezone.utc) - grid.scraped_at > timedelta(seconds=AVAILABILITY_CACHE_SOFT_TTL)
+
+    def _generate_cache_key(self: Self, site: SiteInfo, date: str) -> str:
+        return f"availability-{site.url}-{date}"
+
+    def _get_prefetched_or_cached_data(self: Self, cache_key: str) -> DayGrid | None:
+        if cache_key in self.prefetched_data:
+            return decode_day_grid(self.prefetched_data[cache_key])
+        return self._get_cached_data(cache_key)
+
+    def _get_cached_data(self: Self, cache_key: str) -> DayGrid | None:
+        grid = decode_day_grid(cache.get(cache_key))
+        if grid is None:
+            return None
+        logger.debug(f"Data retrieved from cache with key: {cache_key}")
+        return grid
 
-    def _get_cached_data(self: Self, cache_key: str) -> list[MatchInfo]:
-        cached_data = cache.get(cache_key) if cache.get(cache_key) else []
-        if len(cached_data) > 0:
-            logger.debug(f"Data retrieved from cache with key: {cache_key}")
-        return cached_data
+    def _cache_data(self: Self, cache_key: str, data: DayGrid) -> None:
+        cache.set(cache_key, encode_day_grid(data), timeout=AVAILABILITY_CACHE_HARD_TTL)
+        logger.debug(f"Data cached with key: {cache_key} for {AVAILABILITY_CACHE_HARD_TTL} seconds")
 
-    def _cache_data(self: Self, cache_key: str, data: list[MatchInfo]) -> None:
-        cache.set(cache_key, data, timeout=1800)
-        logger.debug(f"Data cached with key: {cache_key} for 30 minutes")
+    def _filter_matches(self: Self, date: str, matches: list[MatchInfo]) -> list[MatchInfo]:
+        return [
+            match
+            for match in matches
+            if not time_not_in_range(match.time, self.filter)
+            and not time_in_past(date, match.time)
+            and check_filters(match, self.filter)
+        ]
 
     def _get_daily_matches(self: Self, date: str) -> list[MatchInfo]:
+        # Returns every match of the day for the site, without applying the filters.
         raise NotImplementedError
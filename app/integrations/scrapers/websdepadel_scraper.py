@@ -1,27 +1,45 @@
 from typing import Self
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 
-from app.integrations.scrapers.scraper_interface import ScraperInterface
+from app.integrations.scrapers.scraper_interface import ScrapeError, ScraperInterface
 from app.models import MatchInfo
-from app.services.common import check_filters, time_in_past, time_not_in_range
+
+# Only the availability summary is built into a tree, the parser skips the rest of the page (menus, news, footer...)
+AVAILABILITY_STRAINER = SoupStrainer("div", id="resumen-disponibilidad")
+AVAILABILITY_ID_ATTRIBUTE = 'id="resumen-disponibilidad"'
 
 
 class WebsdepadelScraper(ScraperInterface):
     BASE_URL = "https://www.{site}/partidas/{date}#contenedor-partidas"
 
-    def _get_scraped_availability(self: Self, date: str) -> Tag | None:
+    def _get_scraped_availability(self: Self, date: str) -> Tag:
         url = self.BASE_URL.format(site=self.site.url, date=date)
         response = self.session.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
+        availability = self._parse_availability(response.text)
+        if availability is None:
+            raise ScrapeError(self.site.url, date, "Availability summary not found")
+        return availability
+
+    def _parse_availability(self: Self, html: str) -> Tag | None:
+        # The page head is not even tokenized, parsing starts at the tag holding the availability id. If that tag
+        # is not the summary (e.g. the id is quoted in a script) the whole page is parsed.
+        index = html.find(AVAILABILITY_ID_ATTRIBUTE)
+        start = html.rfind("<", 0, index) if index != -1 else -1
+        availability = self._find_availability(html[start:]) if start != -1 else None
+        return availability if availability is not None else self._find_availability(html)
+
+    def _find_availability(self: Self, html: str) -> Tag | None:
+        soup = BeautifulSoup(html, "html.parser", parse_only=AVAILABILITY_STRAINER)
         availability = soup.find("div", id="resumen-disponibilidad")
 
         return availability if isinstance(availability, Tag) else None
 
     def _get_daily_matches(self: Self, date: str) -> list[MatchInfo]:
-        data: list[MatchInfo] = []
+        return self._get_availability_matches(self._get_scraped_availability(date))
 
-        availability = self._get_scraped_availability(date)
+    def _get_availability_matches(self: Self, availability: Tag | None) -> list[MatchInfo]:
+        data: list[MatchInfo] = []
 
         sports = availability.find_all("li", class_="deporte") if availability else []
         for sport in sports:
@@ -31,17 +49,15 @@ class WebsdepadelScraper(ScraperInterface):
                 court_name = court.find("span", class_="nombre").get_text(strip=True)
                 matches = court.find_all("li", class_="partida")
                 for match in matches:
-                    start_time = match.find("a").get_text(strip=True)
-                    if time_not_in_range(start_time, self.filter) or time_in_past(date, start_time):
-                        continue
-                    match_info = MatchInfo(
-                        sport=sport_name,
-                        court=court_name,
-                        time=start_time,
-                        url=match.find("a")["href"],
-                        is_available="partida-reservada" not in match["class"],
+                    link = match.find("a")
+                    data.append(
+                        MatchInfo(
+                            sport=sport_name,
+                            court=court_name,
+                            time=link.get_text(strip=True),
+                            url=link["href"],
+                            is_available="partida-reservada" not in match["class"],
+                        )
                     )
-                    if check_filters(match_info, self.filter):
-                        data.append(match_info)
 
         return data
@@ -0,0 +1,69 @@
+import os
+from urllib.parse import urlsplit
+
+from flask import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    "padel_api_request_duration_seconds", "API request latency by namespace.", ["namespace", "method", "status"]
+)
+SCRAPE_LATENCY = Histogram(
+    "padel_scrape_duration_seconds",
+    "Time to scrape the day grid of a site.",
+    ["site_type", "site"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+SCRAPES_IN_PROGRESS = Gauge(
+    "padel_scrapes_in_progress", "Scrapes running by site type.", ["site_type"], multiprocess_mode="livesum"
+)
+CACHE_REQUESTS = Counter("padel_cache_requests", "Cache lookups by key family and result.", ["family", "result"])
+HTTP_RESPONSES = Counter("padel_http_responses", "Outbound HTTP responses by host and status.", ["host", "status"])
+CIRCUITS_OPENED = Counter("padel_circuit_breaker_opened", "Times the circuit breaker of a site opened.", ["site"])
+
+# Key prefixes of the views cached with `cache.cached`, the rest of the families are recorded where they are looked up
+VIEW_CACHE_FAMILIES = {"reverse_geolocation": "geolocation", "matching_places": "geolocation"}
+
+
+def record_request(rule: str | None, method: str, status: int, duration: float) -> None:
+    # The namespace is taken from the matched route, so unknown urls do not create new series.
+    if rule is None:
+        namespace = "unmatched"
+    elif rule.startswith("/api/"):
+        namespace = rule.split("/")[2]
+    else:
+        namespace = rule.strip("/") or "root"
+    REQUEST_LATENCY.labels(namespace, method, str(status)).observe(duration)
+
+
+def record_cache_lookup(family: str, result: str) -> None:
+    CACHE_REQUESTS.labels(family, result).inc()
+
+
+def record_http_response(url: str, status: int | None) -> None:
+    HTTP_RESPONSES.labels(urlsplit(url).hostname or "unknown", str(status) if status else "error").inc()
+
+
+def record_view_cache_lookup(cache_key: str, value: object) -> None:
+    # Called with every cache read, only the keys of the cached views are counted. `cache.cached` reads them with
+    # `cache.get`, a view never caches None so it is a miss.
+    family = VIEW_CACHE_FAMILIES.get(cache_key.split("-", 1)[0])
+    if family is not None:
+        record_cache_lookup(family, "miss" if value is None else "hit")
+
+
+def metrics_view() -> Response:
+    # With several worker processes each one writes its metrics to PROMETHEUS_MULTIPROC_DIR and they are merged here.
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -1,30 +1,43 @@
+import time
 from typing import Callable
 
-from flask import g, request
+from flask import Response, g, request
 
-from app.models import GeolocationFilter
-from app.services.sites import find_site_by_url_or_unknown, get_available_sites
+from app.metrics import record_request
+from app.tracing import tracer
 
 
-def site_middleware() -> Callable:
+def request_middleware() -> Callable:
+    # The sites of the request are resolved by the views that use them, see `app.context_helpers`
     def middleware() -> None:
-        site_url = request.headers.get("X-SITE")
-        geo_filter_header = request.headers.get("X-GEOLOCATION")
-        if site_url and geo_filter_header:
-            raise ValueError("Please provide only one of the following headers: X-SITE or X-GEOLOCATION")
-        geo_filter_header = geo_filter_header or "39.469908,-0.376288,100"
-        try:
-            latitude, longitude, radius = geo_filter_header.split(",")
-        except ValueError:
-            raise ValueError("Please provide a valid geolocation header with the format: latitude,longitude,radius_km")
-        g.geo_filter = GeolocationFilter(latitude=float(latitude), longitude=float(longitude), radius_km=int(radius))
-        if site_url:
-            g.sites = [find_site_by_url_or_unknown(site_url)]
-        elif geo_filter_header:
-            g.sites = get_available_sites(g.geo_filter).sites
-        else:
-            raise ValueError(
-                "Please provide a site by using X-SITE header or a geolocation filter by using X-GEOLOCATION header"
-            )
+        g.request_started_at = time.perf_counter()
+        # The request span is closed by the metrics middleware, once the response is ready
+        g.request_span = tracer.span(f"{request.method} {request.path}")
+        g.request_span.__enter__()
+
+    return middleware
+
+
+def metrics_middleware() -> Callable:
+    def middleware(response: Response) -> Response:
+        started_at = g.get("request_started_at")
+        if started_at is not None:
+            rule = request.url_rule.rule if request.url_rule else None
+            record_request(rule, request.method, response.status_code, time.perf_counter() - started_at)
+        span = g.pop("request_span", None)
+        if span is not None:
+            span.set_attribute("status", response.status_code)
+            span.__exit__(None, None, None)
+        return response
+
+    return middleware
+
+
+def conditional_middleware() -> Callable:
+    # Answers 304 Not Modified to the conditional requests of the responses with an ETag, once the view built them
+    def middleware(response: Response) -> Response:
+        if response.status_code == 200 and response.get_etag()[0] is not None:
+            response.make_conditional(request)
+        return response
 
     return middleware
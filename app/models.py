@@ -2,6 +2,7 @@ import re
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Self
+from urllib.parse import urlparse
 
 from pydantic import BaseModel, field_validator, model_validator
 
@@ -17,10 +18,16 @@ class SiteInfo(BaseModel):
     url: str
     type: SiteType
     coordinates: tuple[float, float] | None = None
+    scraper_params: dict[str, str] = {}
 
     class Config:
         use_enum_values = True
 
+    @property
+    def host(self) -> str:
+        # Site urls are stored with and without scheme (e.g. `ialesport.com`, `https://playtomic.io/tenant/1`)
+        return urlparse(self.url if "://" in self.url else f"//{self.url}").netloc
+
 
 class AvailableSitesResponse(BaseModel):
     sites: list[SiteInfo]
@@ -40,6 +47,20 @@ class SiteMatches(BaseModel):
     date: str
     distance_km: float = 0
     matches: list[MatchInfo]
+    scraped_at: datetime | None = None
+    unavailable: bool = False
+
+
+class DayGrid(BaseModel):
+    matches: list[MatchInfo]
+    scraped_at: datetime
+
+
+class CourtAvailabilityResponse(BaseModel):
+    site_matches: list[SiteMatches]
+    timed_out_sites: list[str] = []
+    failed_sites: list[str] = []
+    unavailable_sites: list[str] = []
 
 
 class GeolocationFilter(BaseModel):
@@ -1,28 +1,250 @@
-from geopy.distance import distance
+import asyncio
+import logging
+from concurrent.futures import Future, TimeoutError, as_completed, wait
+from typing import Any, AsyncGenerator, Iterator
 
-from app.integrations.scrapers import SCRAPERS
-from app.models import GeolocationFilter, MatchFilter, SiteInfo, SiteMatches
+from app.cache import cache
+from app.circuitbreaker import CircuitOpenError
+from app.executor import scrape_executor
+from app.integrations.scrapers import SCRAPERS, ScraperInterface
+from app.models import (
+    CourtAvailabilityResponse,
+    GeolocationFilter,
+    MatchFilter,
+    SiteInfo,
+    SiteMatches,
+)
+from app.services.common import get_weekly_dates
+from app.services.sites import compute_site_distances
 
+logger = logging.getLogger(__name__)
 
-def add_distance_to_site_matches(
-    site_match: SiteMatches, geolocation_filter: GeolocationFilter, site: SiteInfo
-) -> None:
-    site_match.distance_km = distance(
-        (geolocation_filter.latitude, geolocation_filter.longitude),
-        site.coordinates,
-    ).km
+
+def get_date_matches(scraper: ScraperInterface, date: str) -> SiteMatches:
+    try:
+        return scraper.get_date_matches(date)
+    finally:
+        scraper.session.close()
+
+
+def prefetch_cached_data(units: list[tuple[ScraperInterface, str]]) -> None:
+    # Reads the cache entries of every unit with one MGET per level of keys (Matchpoint grids depend on the cached
+    # sports of the club), instead of a round trip per entry from each unit.
+    prefetched_data: dict[str, Any] = {}
+    for scraper, _ in units:
+        scraper.prefetched_data = prefetched_data
+    while True:
+        cache_keys = list(
+            dict.fromkeys(
+                key for scraper, date in units for key in scraper.get_cache_keys(date) if key not in prefetched_data
+            )
+        )
+        if not cache_keys:
+            return
+        prefetched_data.update(zip(cache_keys, cache.get_many(*cache_keys)))
+
+
+def _get_cached_date_matches(scraper: ScraperInterface, date: str) -> Future[SiteMatches]:
+    future: Future[SiteMatches] = Future()
+    try:
+        future.set_result(get_date_matches(scraper, date))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def refresh_date_matches(site: SiteInfo, filter: MatchFilter, date: str) -> None:
+    scraper = SCRAPERS[site.type](site, filter)
+    try:
+        scraper.refresh_date_matches(date)
+    finally:
+        scraper.session.close()
 
 
 def get_court_data(
-    filter: MatchFilter, sites: list[SiteInfo], geolocation_filter: GeolocationFilter | None = None
-) -> list[SiteMatches]:
-    data: list[SiteMatches] = []
-    for site in sites:
-        site_matches = SCRAPERS[site.type](site, filter).get_site_matches()
-        if geolocation_filter:
-            for site_match in site_matches:
-                add_distance_to_site_matches(site_match, geolocation_filter, site)
-        data.extend(site_matches)
-
-    data.sort(key=lambda x: (x.date, x.distance_km))
-    return data
+    filter: MatchFilter,
+    sites: list[SiteInfo],
+    geolocation_filter: GeolocationFilter | None = None,
+    timeout: float | None = None,
+    site_distances: dict[str, float] | None = None,
+) -> CourtAvailabilityResponse:
+    # Results are collected in submission order so the final sort keeps the same tie-breaking as the sequential
+    # version.
+    futures = _submit_units(filter, sites)
+    if geolocation_filter and site_distances is None:
+        site_distances = compute_site_distances(sites, geolocation_filter)
+    wait([future for _, future in futures], timeout=timeout)
+    return _collect_response(futures, geolocation_filter, site_distances)
+
+
+async def get_court_data_async(
+    filter: MatchFilter,
+    sites: list[SiteInfo],
+    geolocation_filter: GeolocationFilter | None = None,
+    timeout: float | None = None,
+    site_distances: dict[str, float] | None = None,
+) -> CourtAvailabilityResponse:
+    # Same as `get_court_data` for the ASGI app, the request awaits the units instead of holding a thread. Reading
+    # the cache and serving the cached units is done in a thread too, so the event loop never blocks on Redis.
+    futures = await asyncio.to_thread(_submit_units, filter, sites)
+    if geolocation_filter and site_distances is None:
+        site_distances = compute_site_distances(sites, geolocation_filter)
+    await asyncio.wait(_wrap_units(futures), timeout=timeout)
+    return _collect_response(futures, geolocation_filter, site_distances)
+
+
+def stream_court_data(
+    filter: MatchFilter,
+    sites: list[SiteInfo],
+    geolocation_filter: GeolocationFilter | None = None,
+    timeout: float | None = None,
+    site_distances: dict[str, float] | None = None,
+) -> Iterator[SiteMatches | CourtAvailabilityResponse]:
+    # Yields the matches of each site and date as soon as they are ready, cached ones first, and finally a
+    # response without matches listing the sites that timed out, failed or are unavailable.
+    futures = _submit_units(filter, sites)
+    if geolocation_filter and site_distances is None:
+        site_distances = compute_site_distances(sites, geolocation_filter)
+    sites_by_future = {future: site for site, future in futures}
+
+    response = CourtAvailabilityResponse(site_matches=[])
+    try:
+        for future in as_completed(sites_by_future, timeout=timeout):
+            site_match = _collect_result(sites_by_future[future], future, response, geolocation_filter, site_distances)
+            if site_match is not None:
+                yield site_match
+    except TimeoutError:
+        pass
+    finally:
+        # Also when the client goes away, the units not started yet are cancelled
+        for site, future in futures:
+            if not future.done():
+                future.cancel()
+                response.timed_out_sites.append(site.url)
+
+    yield _deduplicate_sites(response)
+
+
+async def stream_court_data_async(
+    filter: MatchFilter,
+    sites: list[SiteInfo],
+    geolocation_filter: GeolocationFilter | None = None,
+    timeout: float | None = None,
+    site_distances: dict[str, float] | None = None,
+) -> AsyncGenerator[SiteMatches | CourtAvailabilityResponse, None]:
+    # Same as `stream_court_data` for the ASGI app.
+    futures = await asyncio.to_thread(_submit_units, filter, sites)
+    if geolocation_filter and site_distances is None:
+        site_distances = compute_site_distances(sites, geolocation_filter)
+    units = _wrap_units(futures)
+
+    response = CourtAvailabilityResponse(site_matches=[])
+    pending = set(units)
+    deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+    try:
+        while pending:
+            remaining = None if deadline is None else max(deadline - asyncio.get_running_loop().time(), 0)
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for unit in done:
+                site, future = units[unit]
+                site_match = _collect_result(site, future, response, geolocation_filter, site_distances)
+                if site_match is not None:
+                    yield site_match
+    finally:
+        for site, future in futures:
+            if not future.done():
+                future.cancel()
+                response.timed_out_sites.append(site.url)
+
+    yield _deduplicate_sites(response)
+
+
+def _wrap_units(
+    futures: list[tuple[SiteInfo, Future[SiteMatches]]],
+) -> dict[asyncio.Future[SiteMatches], tuple[SiteInfo, Future[SiteMatches]]]:
+    # Awaitable wrappers of the units. The results are read from the units themselves, so the exception of each
+    # wrapper is retrieved once it is done (also after the deadline) and asyncio does not log it as never retrieved.
+    units = {}
+    for site, future in futures:
+        unit = asyncio.wrap_future(future)
+        unit.add_done_callback(_retrieve_exception)
+        units[unit] = (site, future)
+    return units
+
+
+def _retrieve_exception(unit: asyncio.Future[SiteMatches]) -> None:
+    if not unit.cancelled():
+        unit.exception()
+
+
+def _submit_units(filter: MatchFilter, sites: list[SiteInfo]) -> list[tuple[SiteInfo, Future[SiteMatches]]]:
+    # Every (site, date) pair is an independent work unit. The cache entries of all the units are read up front,
+    # units fully served from them run right away and only the rest go to the scrape executor.
+    units = [(SCRAPERS[site.type](site, filter), date) for site in sites for date in get_weekly_dates(filter)]
+    prefetch_cached_data(units)
+    return [
+        (
+            scraper.site,
+            (
+                _get_cached_date_matches(scraper, date)
+                if scraper.has_prefetched_grids(date)
+                else scrape_executor.submit(scraper.site.host, get_date_matches, scraper, date)
+            ),
+        )
+        for scraper, date in units
+    ]
+
+
+def _collect_response(
+    futures: list[tuple[SiteInfo, Future[SiteMatches]]],
+    geolocation_filter: GeolocationFilter | None,
+    site_distances: dict[str, float] | None,
+) -> CourtAvailabilityResponse:
+    response = CourtAvailabilityResponse(site_matches=[])
+    for site, future in futures:
+        site_match = _collect_result(site, future, response, geolocation_filter, site_distances)
+        if site_match is not None:
+            response.site_matches.append(site_match)
+
+    response.site_matches.sort(key=lambda x: (x.date, x.distance_km))
+    return _deduplicate_sites(response)
+
+
+def _collect_result(
+    site: SiteInfo,
+    future: Future[SiteMatches],
+    response: CourtAvailabilityResponse,
+    geolocation_filter: GeolocationFilter | None,
+    site_distances: dict[str, float] | None,
+) -> SiteMatches | None:
+    # Units still running after the deadline are left to finish in background (they still fill the cache),
+    # the ones waiting for a worker are cancelled. Sites without matches are not returned.
+    if not future.done():
+        future.cancel()
+        response.timed_out_sites.append(site.url)
+        return None
+    if isinstance(future.exception(), CircuitOpenError):
+        response.unavailable_sites.append(site.url)
+        return None
+    if future.exception():
+        logger.error(f"Error getting matches for site {site.url}: {future.exception()}")
+        response.failed_sites.append(site.url)
+        return None
+
+    site_match = future.result()
+    if site_match.unavailable:
+        response.unavailable_sites.append(site.url)
+    if not site_match.matches:
+        return None
+    if geolocation_filter and site_distances:
+        site_match.distance_km = site_distances.get(site.url, 0)
+    return site_match
+
+
+def _deduplicate_sites(response: CourtAvailabilityResponse) -> CourtAvailabilityResponse:
+    response.timed_out_sites = list(dict.fromkeys(response.timed_out_sites))
+    response.failed_sites = list(dict.fromkeys(response.failed_sites))
+    response.unavailable_sites = list(dict.fromkeys(response.unavailable_sites))
+    return response
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from threading import Lock
+from typing import NamedTuple
+
+from app.models import SiteInfo
+from app.services.site_index import SiteIndex
+
+logger = logging.getLogger(__name__)
+
+SEED_LAST_UPDATE = "2024-06-20"
+
+# The triggers bump the catalogue version on any change of the site data, so the running processes know when to
+# reload it. Health columns are left out on purpose, they are updated on every scrape.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    url TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    scraper_params TEXT NOT NULL DEFAULT '{}',
+    enabled INTEGER NOT NULL DEFAULT 1,
+    last_success_at TEXT,
+    last_failure_at TEXT,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS catalogue_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+INSERT OR IGNORE INTO catalogue_meta (key, value) VALUES ('version', '0'), ('last_update', date('now'));
+
+CREATE TRIGGER IF NOT EXISTS sites_inserted AFTER INSERT ON sites BEGIN
+    UPDATE catalogue_meta SET value = CASE key WHEN 'version' THEN value + 1 ELSE date('now') END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sites_updated
+AFTER UPDATE OF url, name, type, latitude, longitude, scraper_params, enabled ON sites BEGIN
+    UPDATE catalogue_meta SET value = CASE key WHEN 'version' THEN value + 1 ELSE date('now') END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sites_deleted AFTER DELETE ON sites BEGIN
+    UPDATE catalogue_meta SET value = CASE key WHEN 'version' THEN value + 1 ELSE date('now') END;
+END;
+"""
+
+
+class CatalogueSnapshot(NamedTuple):
+    version: str | None
+    sites_by_url: dict[str, SiteInfo]
+    last_update: str
+
+
+def _site_from_row(row: sqlite3.Row) -> SiteInfo:
+    coordinates = (row["latitude"], row["longitude"]) if row["latitude"] is not None else None
+    return SiteInfo(
+        name=row["name"],
+        url=row["url"],
+        type=row["type"],
+        coordinates=coordinates,
+        scraper_params=json.loads(row["scraper_params"]),
+    )
+
+
+def init_catalogue(path: str, sites: list[SiteInfo]) -> int:
+    # Creates the catalogue schema and upserts the given sites, the health metadata of existing sites is kept.
+    with closing(sqlite3.connect(path)) as connection, connection:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            """
+            INSERT INTO sites (url, name, type, latitude, longitude, scraper_params)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                name = excluded.name,
+                type = excluded.type,
+                latitude = excluded.latitude,
+                longitude = excluded.longitude,
+                scraper_params = excluded.scraper_params
+            """,
+            [
+                (
+                    site.url,
+                    site.name,
+                    site.type,
+                    site.coordinates[0] if site.coordinates else None,
+                    site.coordinates[1] if site.coordinates else None,
+                    json.dumps(site.scraper_params),
+                )
+                for site in sites
+            ],
+        )
+    return len(sites)
+
+
+# In memory copy of the site catalogue stored in SQLite, indexed by url and location. The file is checked for changes
+# at most once every `reload_interval` seconds, so lookups never touch the disk. Without a catalogue file the seed
+# sites are served, which is what development and tests use.
+class SiteCatalogue:
+    def __init__(self, path: str, seed: list[SiteInfo], index: SiteIndex, reload_interval: float = 30) -> None:
+        self.path = path
+        self.index = index
+        self.reload_interval = reload_interval
+        self._lock = Lock()
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._snapshot = CatalogueSnapshot(None, {}, SEED_LAST_UPDATE)
+        self._apply(CatalogueSnapshot(None, {site.url: site for site in seed}, SEED_LAST_UPDATE))
+        self.reload_if_changed(force=True)
+
+    @property
+    def sites(self) -> list[SiteInfo]:
+        return list(self._get_snapshot().sites_by_url.values())
+
+    @property
+    def last_update(self) -> str:
+        return self._get_snapshot().last_update
+
+    def get(self, url: str) -> SiteInfo | None:
+        return self._get_snapshot().sites_by_url.get(url)
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                return False
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+
+            try:
+                snapshot = self._load()
+            except sqlite3.Error as e:
+                logger.error(f"Error loading site catalogue {self.path}: {e}")
+                return False
+            if snapshot.version == self._snapshot.version:
+                return False
+
+            self._apply(snapshot)
+            logger.info(f"Loaded {len(snapshot.sites_by_url)} sites from catalogue version {snapshot.version}")
+            return True
+
+    def record_scrape_result(self, url: str, success: bool) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        now = datetime.now(timezone.utc).isoformat()
+        query = (
+            "UPDATE sites SET last_success_at = ?, consecutive_failures = 0 WHERE url = ?"
+            if success
+            else "UPDATE sites SET last_failure_at = ?, consecutive_failures = consecutive_failures + 1 WHERE url = ?"
+        )
+        try:
+            with closing(sqlite3.connect(self.path)) as connection, connection:
+                connection.execute(query, (now, url))
+        except sqlite3.Error as e:
+            logger.error(f"Error recording health of site {url}: {e}")
+
+    def _get_snapshot(self) -> CatalogueSnapshot:
+        self.reload_if_changed()
+        return self._snapshot
+
+    def _load(self) -> CatalogueSnapshot:
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as connection:
+            connection.row_factory = sqlite3.Row
+            meta = dict(connection.execute("SELECT key, value FROM catalogue_meta").fetchall())
+            if meta.get("version") == self._snapshot.version:
+                return self._snapshot
+            rows = connection.execute("SELECT * FROM sites WHERE enabled = 1 ORDER BY rowid").fetchall()
+
+        sites_by_url = {row["url"]: _site_from_row(row) for row in rows}
+        return CatalogueSnapshot(meta.get("version"), sites_by_url, meta.get("last_update", SEED_LAST_UPDATE))
+
+    def _apply(self, snapshot: CatalogueSnapshot) -> None:
+        # Sites removed from the catalogue or left without coordinates are dropped, the rest are inserted or moved.
+        for url in self._snapshot.sites_by_url:
+            site = snapshot.sites_by_url.get(url)
+            if site is None or site.coordinates is None:
+                self.index.remove(url)
+        self.index.insert_many(list(snapshot.sites_by_url.values()))
+        self._snapshot = snapshot
@@ -0,0 +1,68 @@
+import math
+
+# Same earth radius geopy uses for great circle distances
+EARTH_RADIUS_KM = 6371.009
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int) -> str:
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash: list[str] = []
+    bits, bit_count, is_longitude_bit = 0, 0, True
+    while len(geohash) < precision:
+        value_range, value = (longitude_range, longitude) if is_longitude_bit else (latitude_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        is_longitude_bit = not is_longitude_bit
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(geohash)
+
+
+def geohash_bounds(geohash: str) -> tuple[tuple[float, float], tuple[float, float]]:
+    # Returns the (south, west) and (north, east) corners of the cell
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    is_longitude_bit = True
+    for char in geohash:
+        bits = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            value_range = longitude_range if is_longitude_bit else latitude_range
+            middle = (value_range[0] + value_range[1]) / 2
+            if bits >> shift & 1:
+                value_range[0] = middle
+            else:
+                value_range[1] = middle
+            is_longitude_bit = not is_longitude_bit
+    return (latitude_range[0], longitude_range[0]), (latitude_range[1], longitude_range[1])
+
+
+def geohash_center(geohash: str) -> tuple[float, float]:
+    (south, west), (north, east) = geohash_bounds(geohash)
+    return (south + north) / 2, (west + east) / 2
+
+
+def haversine_km(origin: tuple[float, float], destination: tuple[float, float]) -> float:
+    return haversine_km_each(origin, [destination])[0]
+
+
+def haversine_km_each(origin: tuple[float, float], destinations: list[tuple[float, float]]) -> list[float]:
+    # Distance from one point to each of the destinations, one after the other. Only the terms that depend on the
+    # origin alone are shared; the candidates are at most a few hundred sites, too few for vectorizing to pay off.
+    origin_latitude, origin_longitude = map(math.radians, origin)
+    cos_origin_latitude = math.cos(origin_latitude)
+    distances = []
+    for latitude, longitude in destinations:
+        latitude, longitude = math.radians(latitude), math.radians(longitude)
+        a = (
+            math.sin((latitude - origin_latitude) / 2) ** 2
+            + cos_origin_latitude * math.cos(latitude) * math.sin((longitude - origin_longitude) / 2) ** 2
+        )
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)))
+    return distances
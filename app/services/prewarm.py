@@ -0,0 +1,109 @@
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from threading import Lock
+
+from app.cache import cache
+from app.circuitbreaker import CircuitOpenError
+from app.models import GeolocationFilter, MatchFilter, SiteInfo
+from app.services.availability import refresh_date_matches
+from app.services.sites import get_playtomic_sites, site_catalogue
+from app.settings import (
+    DEFAULT_GEOLOCATION,
+    PREWARM_DEFAULT_HOURS,
+    PREWARM_QUERIED_HOURS_DAYS,
+    PREWARM_QUERIED_HOURS_FLUSH_INTERVAL,
+    PREWARM_TOP_HOURS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Requests are counted by the hour they arrive at, the hour `get_cycle_interval` compares with. The counts are kept
+# in daily buckets expiring after `days`, so the most queried hours follow the recent traffic. Each process adds up
+# its counts in memory and writes them at most every `flush_interval` seconds, instead of a cache round trip per
+# request; the counts of a process that exits before writing them are lost.
+class QueriedHours:
+    def __init__(self, days: int, flush_interval: float) -> None:
+        self.days = days
+        self.flush_interval = flush_interval
+        self._lock = Lock()
+        self._counts: Counter[str] = Counter()
+        self._flushed_at = time.monotonic()
+
+    def record(self) -> None:
+        now = datetime.now()
+        with self._lock:
+            self._counts[self._key(now.date(), now.hour)] += 1
+            if time.monotonic() - self._flushed_at < self.flush_interval:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        for key, count in counts.items():
+            # The bucket is created with its expiration, the increment alone would keep it forever
+            cache.add(key, 0, timeout=self.days * 24 * 3600)
+            cache.cache.inc(key, count)
+
+    def most_queried(self, limit: int) -> list[int]:
+        today = datetime.now().date()
+        days = [today - timedelta(days=day) for day in range(self.days)]
+        hits = cache.get_many(*[self._key(day, hour) for day in days for hour in range(24)])
+        totals = [sum(hits[day * 24 + hour] or 0 for day in range(len(days))) for hour in range(24)]
+        queried_hours = sorted(
+            (hour for hour in range(24) if totals[hour]), key=lambda hour: totals[hour], reverse=True
+        )
+        return queried_hours[:limit]
+
+    def _key(self, day: date, hour: int) -> str:
+        return f"prewarm-queried-hour-{day.isoformat()}-{hour}"
+
+
+queried_hours = QueriedHours(PREWARM_QUERIED_HOURS_DAYS, PREWARM_QUERIED_HOURS_FLUSH_INTERVAL)
+
+
+def get_most_queried_hours(limit: int = PREWARM_TOP_HOURS) -> list[int]:
+    return queried_hours.most_queried(limit) or PREWARM_DEFAULT_HOURS[:limit]
+
+
+def get_prewarm_sites() -> list[SiteInfo]:
+    latitude, longitude, radius = DEFAULT_GEOLOCATION.split(",")
+    geo_filter = GeolocationFilter(latitude=float(latitude), longitude=float(longitude), radius_km=int(radius))
+    return [*site_catalogue.sites, *(site for site, _ in get_playtomic_sites(geo_filter))]
+
+
+def get_prewarm_units(sites: list[SiteInfo], days: int) -> list[tuple[SiteInfo, str]]:
+    now = datetime.now()
+    return [(site, (now + timedelta(days=day)).strftime("%Y-%m-%d")) for day in range(days) for site in sites]
+
+
+def get_cycle_interval(interval: float) -> float:
+    # The most queried hours get fresher data, the rest of the day cycles last twice as long.
+    return interval if datetime.now().hour in get_most_queried_hours() else interval * 2
+
+
+def run_prewarm_cycle(days: int, interval: float) -> None:
+    units = get_prewarm_units(get_prewarm_sites(), days)
+    interval = get_cycle_interval(interval)
+    logger.info(f"Prewarming {len(units)} site dates in {interval} seconds")
+
+    # The cached day grid does not depend on the filter, any valid one works to scrape it.
+    match_filter = MatchFilter(days="0", time_min="00:00", time_max="03:00")
+
+    # Units are spread evenly along the interval instead of being scraped in a burst, to be nice with the clubs.
+    delay = interval / len(units) if units else 0
+    for site, day in units:
+        started_at = time.monotonic()
+        try:
+            refresh_date_matches(site, match_filter, day)
+            site_catalogue.record_scrape_result(site.url, success=True)
+        except CircuitOpenError:
+            logger.info(f"Skipping site {site.url} for date {day}, its circuit is open")
+        except Exception as e:
+            logger.error(f"Error prewarming site {site.url} for date {day}: {e}")
+            site_catalogue.record_scrape_result(site.url, success=False)
+        time.sleep(max(delay - (time.monotonic() - started_at), 0))
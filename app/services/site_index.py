@@ -0,0 +1,86 @@
+import math
+from itertools import count
+from threading import Lock
+
+from app.models import SiteInfo
+from app.services.geo import (
+    EARTH_RADIUS_KM,
+    geohash_bounds,
+    geohash_encode,
+    haversine_km_each,
+)
+
+
+# Geohash grid over the sites with coordinates. A radius query only looks at the cells overlapping the bounding box
+# of the circle, so its cost depends on the sites around the point instead of on the size of the catalogue.
+class SiteIndex:
+    def __init__(self, precision: int = 4) -> None:
+        self.precision = precision
+        (south, west), (north, east) = geohash_bounds("0" * precision)
+        self._cell_height = north - south
+        self._cell_width = east - west
+        self._lock = Lock()
+        self._sequence = count()
+        self._cells: dict[str, dict[str, SiteInfo]] = {}
+        self._site_cells: dict[str, str] = {}
+        self._site_order: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._site_cells)
+
+    def insert(self, site: SiteInfo) -> None:
+        if site.coordinates is None:
+            return
+
+        cell = geohash_encode(*site.coordinates, self.precision)
+        with self._lock:
+            previous_cell = self._site_cells.get(site.url)
+            if previous_cell is not None and previous_cell != cell:
+                del self._cells[previous_cell][site.url]
+            self._cells.setdefault(cell, {})[site.url] = site
+            self._site_cells[site.url] = cell
+            self._site_order.setdefault(site.url, next(self._sequence))
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            cell = self._site_cells.pop(url, None)
+            if cell is not None:
+                del self._cells[cell][url]
+            self._site_order.pop(url, None)
+
+    def insert_many(self, sites: list[SiteInfo]) -> None:
+        for site in sites:
+            self.insert(site)
+
+    def query(self, latitude: float, longitude: float, radius_km: float) -> list[tuple[SiteInfo, float]]:
+        # Returns the sites within the radius with their distance in km, in insertion order.
+        center = (latitude, longitude)
+        with self._lock:
+            candidates = [
+                site
+                for cell in self._get_cells_around(latitude, longitude, radius_km)
+                for site in self._cells.get(cell, {}).values()
+            ]
+            order = dict(self._site_order)
+
+        distances = haversine_km_each(center, [site.coordinates for site in candidates])  # type: ignore[misc]
+        results = [(site, distance_km) for site, distance_km in zip(candidates, distances) if distance_km <= radius_km]
+        return sorted(results, key=lambda result: order[result[0].url])
+
+    def _get_cells_around(self, latitude: float, longitude: float, radius_km: float) -> set[str]:
+        latitude_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = max(latitude - latitude_delta, -90.0), min(latitude + latitude_delta, 90.0)
+        # The widest parallel of the bounding box is the one closest to the pole
+        widest_latitude = min(max(abs(south), abs(north)), 89.9)
+        longitude_delta = min(latitude_delta / math.cos(math.radians(widest_latitude)), 180.0)
+        west, east = longitude - longitude_delta, longitude + longitude_delta
+
+        cells: set[str] = set()
+        for row in range(math.ceil((north - south) / self._cell_height) + 1):
+            cell_latitude = min(south + row * self._cell_height, north)
+            for column in range(math.ceil((east - west) / self._cell_width) + 1):
+                cell_longitude = min(west + column * self._cell_width, east)
+                # Longitudes out of range wrap around the antimeridian
+                cell_longitude = (cell_longitude + 180.0) % 360.0 - 180.0
+                cells.add(geohash_encode(cell_latitude, cell_longitude, self.precision))
+        return cells
@@ -1,9 +1,26 @@
 import logging
+import math
 
-import requests
-from geopy.distance import great_circle
-
+from app.cache import cache
+from app.integrations.http import http_session
+from app.metrics import record_cache_lookup
 from app.models import AvailableSitesResponse, GeolocationFilter, SiteInfo, SiteType
+from app.services.catalogue import SiteCatalogue
+from app.services.geo import (
+    geohash_bounds,
+    geohash_center,
+    geohash_encode,
+    haversine_km,
+    haversine_km_each,
+)
+from app.services.site_index import SiteIndex
+from app.settings import (
+    PLAYTOMIC_TENANTS_CACHE_TTL,
+    PLAYTOMIC_TENANTS_GEOHASH_PRECISION,
+    PLAYTOMIC_TENANTS_RADIUS_CLASSES,
+    SITE_CATALOGUE_PATH,
+    SITE_CATALOGUE_RELOAD_INTERVAL,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -95,41 +112,90 @@ SUPPORTED_SITES = [
     ),
 ]
 
-SITES_BY_URL = {site.url: site for site in SUPPORTED_SITES}
+# Holds the catalogue sites, the Playtomic tenants are only those of the cached lookup of each request
+site_index = SiteIndex()
+# The supported sites are the seed of the catalogue, they are served until a catalogue file is created
+site_catalogue = SiteCatalogue(SITE_CATALOGUE_PATH, SUPPORTED_SITES, site_index, SITE_CATALOGUE_RELOAD_INTERVAL)
+
 
+def compute_site_distances(sites: list[SiteInfo], geo_filter: GeolocationFilter) -> dict[str, float]:
+    # Distance in km from the filter center to every site with coordinates.
+    located_sites = [site for site in sites if site.coordinates]
+    distances = haversine_km_each(
+        (geo_filter.latitude, geo_filter.longitude), [site.coordinates for site in located_sites]  # type: ignore[misc]
+    )
+    return {site.url: distance_km for site, distance_km in zip(located_sites, distances)}
 
-def filter_sites_by_distance(sites: list[SiteInfo], geo_filter: GeolocationFilter) -> list[SiteInfo]:
-    center = (geo_filter.latitude, geo_filter.longitude)
-    return [site for site in sites if great_circle(center, site.coordinates).km <= geo_filter.radius_km]
 
+def filter_sites_by_distance(sites: list[SiteInfo], geo_filter: GeolocationFilter) -> list[tuple[SiteInfo, float]]:
+    # Returns the sites within the radius with their distance in km, computed once for the filter and the caller.
+    distances = compute_site_distances(sites, geo_filter)
+    return [(site, distances[site.url]) for site in sites if distances.get(site.url, math.inf) <= geo_filter.radius_km]
 
-def get_playtomic_sites(geo_filter: GeolocationFilter) -> list[SiteInfo]:
-    # Call Playtomic API to get the list of sites using the GeolocationFilter
-    sites: list[SiteInfo] = []
-    request = requests.get(
-        (
-            "https://playtomic.io/api/v1/tenants?user_id=me&playtomic_status=ACTIVE&with_properties=ALLOWS_CASH_PAYMENT&"
-            f"coordinate={geo_filter.latitude}%2C{geo_filter.longitude}&sport_id=PADEL&radius={geo_filter.radius_km}000&size=40"
-        )
+
+def fetch_playtomic_sites(latitude: float, longitude: float, radius_km: int) -> list[SiteInfo]:
+    # Call Playtomic API to get the list of sites around the given point
+    request = http_session.get(
+        "https://playtomic.io/api/v1/tenants?user_id=me&playtomic_status=ACTIVE&with_properties=ALLOWS_CASH_PAYMENT&"
+        f"coordinate={latitude}%2C{longitude}&sport_id=PADEL&radius={radius_km}000&size=40"
     )
-    try:
-        response = request.json()
-        for tenant in response:
-            name = tenant["tenant_name"]
-            url = f"https://playtomic.io/tenant/{tenant['tenant_id']}"
-            coordinates = float(tenant["address"]["coordinate"]["lat"]), float(tenant["address"]["coordinate"]["lon"])
-            sites.append(SiteInfo(name=name, url=url, coordinates=coordinates, type=SiteType.PLAYTOMIC))
-    except Exception as e:  # TODO: Specify the exception type + Add lint rule to not use bare except.
-        logger.error(f"Error getting Playtomic sites: {e}")
+    sites: list[SiteInfo] = []
+    for tenant in request.json():
+        name = tenant["tenant_name"]
+        url = f"https://playtomic.io/tenant/{tenant['tenant_id']}"
+        coordinates = float(tenant["address"]["coordinate"]["lat"]), float(tenant["address"]["coordinate"]["lon"])
+        sites.append(SiteInfo(name=name, url=url, coordinates=coordinates, type=SiteType.PLAYTOMIC))
     return sites
 
 
+def get_radius_class(radius_km: int) -> int:
+    return next(
+        (radius_class for radius_class in PLAYTOMIC_TENANTS_RADIUS_CLASSES if radius_km <= radius_class),
+        math.ceil(radius_km / 100) * 100,
+    )
+
+
+def get_playtomic_sites(geo_filter: GeolocationFilter) -> list[tuple[SiteInfo, float]]:
+    # Returns the tenants within the radius with their distance in km to the filter center. Tenants are cached by
+    # geohash cell and radius class, so nearby users share the same Playtomic lookup. The lookup is centered in the
+    # cell and covers the whole radius class from any point of it.
+    geohash = geohash_encode(geo_filter.latitude, geo_filter.longitude, PLAYTOMIC_TENANTS_GEOHASH_PRECISION)
+    radius_class = get_radius_class(geo_filter.radius_km)
+    cache_key = f"playtomic-tenants-{geohash}-{radius_class}"
+
+    sites = cache.get(cache_key)
+    record_cache_lookup("playtomic_tenants", "miss" if sites is None else "hit")
+    if sites is None:
+        center = geohash_center(geohash)
+        cell_radius_km = haversine_km(center, geohash_bounds(geohash)[0])
+        try:
+            sites = fetch_playtomic_sites(
+                round(center[0], 6), round(center[1], 6), math.ceil(radius_class + cell_radius_km)
+            )
+        except Exception as e:  # TODO: Specify the exception type + Add lint rule to not use bare except.
+            logger.error(f"Error getting Playtomic sites: {e}")
+            return []
+        cache.set(cache_key, sites, timeout=PLAYTOMIC_TENANTS_CACHE_TTL)
+
+    return filter_sites_by_distance(sites, geo_filter)
+
+
 def find_site_by_url_or_unknown(url: str) -> SiteInfo:
     # TODO: This should also get the website type as a parameter.
-    return SITES_BY_URL.get(url, SiteInfo(name="Unknown", url=url, type=SiteType.WEBSDEPADEL))
+    return site_catalogue.get(url) or SiteInfo(name="Unknown", url=url, type=SiteType.WEBSDEPADEL)
+
+
+def get_sites_in_radius(geo_filter: GeolocationFilter) -> list[tuple[SiteInfo, float]]:
+    # Returns the sites with their distance in km to the filter center, the distances are reused to sort the matches.
+    # The catalogue sites come first, then the Playtomic tenants around that are not in it.
+    playtomic_sites = get_playtomic_sites(geo_filter)
+    site_catalogue.reload_if_changed()
+    sites_in_radius = site_index.query(geo_filter.latitude, geo_filter.longitude, geo_filter.radius_km)
+    indexed_urls = {site.url for site, _ in sites_in_radius}
+    sites_in_radius.extend((site, distance_km) for site, distance_km in playtomic_sites if site.url not in indexed_urls)
+    return sites_in_radius
 
 
-def get_available_sites(geo_filter: GeolocationFilter, with_playtomic: bool = True) -> AvailableSitesResponse:
-    sites = filter_sites_by_distance(SUPPORTED_SITES, geo_filter) if geo_filter else list(SUPPORTED_SITES)
-    sites.extend(get_playtomic_sites(geo_filter))
-    return AvailableSitesResponse(sites=sites, last_update="2024-06-20")
+def get_available_sites(geo_filter: GeolocationFilter) -> AvailableSitesResponse:
+    sites = [site for site, _ in get_sites_in_radius(geo_filter)]
+    return AvailableSitesResponse(sites=sites, last_update=site_catalogue.last_update)
@@ -8,3 +8,71 @@ CACHE_REDIS_PORT = os.getenv("CACHE_REDIS_PORT", 6379)
 CACHE_REDIS_DB = os.getenv("CACHE_REDIS_DB", 0)
 
 LOCATION_IQ_API_KEY = os.getenv("LOCATION_IQ_API_KEY")
+
+SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", 16))
+SCRAPER_MAX_WORKERS_PER_HOST = int(os.getenv("SCRAPER_MAX_WORKERS_PER_HOST", 4))
+SCRAPER_HTTP_TIMEOUT = float(os.getenv("SCRAPER_HTTP_TIMEOUT", 10))
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 100))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 10))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.3))
+
+AVAILABILITY_TIMEOUT = float(os.getenv("AVAILABILITY_TIMEOUT", 10))
+AVAILABILITY_MAX_TIMEOUT = float(os.getenv("AVAILABILITY_MAX_TIMEOUT", 30))
+
+DEFAULT_GEOLOCATION = os.getenv("DEFAULT_GEOLOCATION", "39.469908,-0.376288,100")
+
+PREWARM_DAYS = int(os.getenv("PREWARM_DAYS", 3))
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", 1800))
+PREWARM_TOP_HOURS = int(os.getenv("PREWARM_TOP_HOURS", 3))
+PREWARM_DEFAULT_HOURS = [int(hour) for hour in os.getenv("PREWARM_DEFAULT_HOURS", "18,19,20").split(",")]
+PREWARM_QUERIED_HOURS_DAYS = int(os.getenv("PREWARM_QUERIED_HOURS_DAYS", 7))
+PREWARM_QUERIED_HOURS_FLUSH_INTERVAL = float(os.getenv("PREWARM_QUERIED_HOURS_FLUSH_INTERVAL", 60))
+
+SINGLE_FLIGHT_LEASE = int(os.getenv("SINGLE_FLIGHT_LEASE", 30))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", 0.2))
+
+AVAILABILITY_CACHE_SOFT_TTL = int(os.getenv("AVAILABILITY_CACHE_SOFT_TTL", 900))
+AVAILABILITY_CACHE_HARD_TTL = int(os.getenv("AVAILABILITY_CACHE_HARD_TTL", 3600))
+
+PLAYTOMIC_TENANTS_CACHE_TTL = int(os.getenv("PLAYTOMIC_TENANTS_CACHE_TTL", 21600))
+PLAYTOMIC_TENANTS_GEOHASH_PRECISION = int(os.getenv("PLAYTOMIC_TENANTS_GEOHASH_PRECISION", 5))
+PLAYTOMIC_TENANTS_RADIUS_CLASSES = [5, 10, 25, 50, 100, 200]
+
+SITE_CATALOGUE_PATH = os.getenv("SITE_CATALOGUE_PATH", "data/sites.db")
+SITE_CATALOGUE_RELOAD_INTERVAL = float(os.getenv("SITE_CATALOGUE_RELOAD_INTERVAL", 30))
+
+MATCHPOINT_BOOTSTRAP_TTL = int(os.getenv("MATCHPOINT_BOOTSTRAP_TTL", 21600))
+
+# A site is not called for CIRCUIT_BREAKER_COOLDOWN seconds after failing (or answering slower than
+# CIRCUIT_BREAKER_SLOW_CALL_DURATION seconds) CIRCUIT_BREAKER_FAILURE_THRESHOLD times within CIRCUIT_BREAKER_WINDOW
+# seconds
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5))
+CIRCUIT_BREAKER_SLOW_CALL_DURATION = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_DURATION", 8))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", 60))
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", 300))
+
+# Tracing is disabled unless an exporter is set: "log" writes the spans as JSON log lines, "otlp" sends them to an
+# OTLP/HTTP collector
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "padel-api")
+TRACING_EXPORT_INTERVAL = float(os.getenv("TRACING_EXPORT_INTERVAL", 2))
+
+# Production server, see gunicorn.conf.py. Each worker process runs its own scrape executor, so the scrape limits
+# above are per worker. GUNICORN_THREADS only applies to the gthread worker class.
+GUNICORN_BIND = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", os.cpu_count() or 1))
+GUNICORN_WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn_worker.UvicornWorker")
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", 16))
+GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", 60))
+GUNICORN_GRACEFUL_TIMEOUT = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+GUNICORN_KEEPALIVE = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+GUNICORN_MAX_REQUESTS = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+GUNICORN_MAX_REQUESTS_JITTER = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+# Seconds browsers and CDNs may reuse a response without revalidating it, partial availability responses (with sites
+# that timed out or failed) are not cached
+HTTP_CACHE_SITES_MAX_AGE = int(os.getenv("HTTP_CACHE_SITES_MAX_AGE", 300))
+HTTP_CACHE_AVAILABILITY_MAX_AGE = int(os.getenv("HTTP_CACHE_AVAILABILITY_MAX_AGE", 60))
@@ -0,0 +1,80 @@
+import logging
+import time
+from threading import Event, Lock
+from typing import Any, Callable, Generic, TypeVar
+from uuid import uuid4
+
+from app.cache import cache
+from app.settings import SINGLE_FLIGHT_LEASE, SINGLE_FLIGHT_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: T | None = None
+        self.error: Exception | None = None
+
+
+# Makes concurrent callers of the same key share a single execution. Callers in the same process wait for the
+# thread that got there first, callers in other processes (gunicorn workers) wait for the worker holding the
+# lease stored in the cache and then read the value it cached.
+class SingleFlight:
+    def __init__(self, lease: int, poll_interval: float) -> None:
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._lock = Lock()
+        self._calls: dict[str, _Call[Any]] = {}
+
+    def do(self, key: str, fn: Callable[[], T], lookup: Callable[[], T | None]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+
+        try:
+            call.result = self._do_with_lease(key, fn, lookup)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _do_with_lease(self, key: str, fn: Callable[[], T], lookup: Callable[[], T | None]) -> T:
+        lease_key = f"{key}-lease"
+        token = uuid4().hex
+        if cache.add(lease_key, token, timeout=self.lease):
+            try:
+                return fn()
+            finally:
+                if cache.get(lease_key) == token:
+                    cache.delete(lease_key)
+
+        logger.debug(f"Waiting for another worker to compute key: {key}")
+        deadline = time.monotonic() + self.lease
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            result = lookup()
+            if result is not None:
+                return result
+            if not cache.has(lease_key):
+                break
+
+        # The worker holding the lease failed or is taking too long, compute it here.
+        return fn()
+
+
+single_flight = SingleFlight(SINGLE_FLIGHT_LEASE, SINGLE_FLIGHT_POLL_INTERVAL)
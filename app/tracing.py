@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import TracebackType
+from typing import Any, Iterator
+
+import requests
+
+from app.settings import (
+    TRACING_EXPORT_INTERVAL,
+    TRACING_EXPORTER,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SERVICE_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any], parent: "Span | None") -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id: str = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id: str = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.start_time = time.time_ns()
+        self.end_time: int | None = None
+        self.error: str | None = None
+        self._token: Any = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.end_time = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__ if exc_type else 'Error'}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Spans opened and closed in different hooks of a request may end in a copied context
+            _current_span.set(None)
+        self.tracer.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time": self.start_time,
+            "duration_ms": round(((self.end_time or self.start_time) - self.start_time) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class NoopSpan:
+    # Returned while tracing is disabled, a shared instance so a disabled span costs a call and an attribute check.
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class SpanExporter:
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+class LogSpanExporter(SpanExporter):
+    def export(self, span: Span) -> None:
+        logger.info(json.dumps(span.to_dict(), default=str))
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+# Sends the spans in batches to an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces) with the JSON encoding,
+# from a background thread so the traced code never waits for the collector.
+class OTLPSpanExporter(SpanExporter):
+    def __init__(self, endpoint: str, service_name: str, interval: float, max_batch_size: int = 512) -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.interval = interval
+        self.max_batch_size = max_batch_size
+        self._start()
+        # Forked server workers (gunicorn preloads the app) do not inherit the thread, each one starts its own
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue: queue.SimpleQueue[Span] = queue.SimpleQueue()
+        # Own session, the shared one traces its requests and exporting them would never end
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def flush(self) -> None:
+        while not self._queue.empty():
+            spans: list[Span] = []
+            while len(spans) < self.max_batch_size and not self._queue.empty():
+                spans.append(self._queue.get())
+            try:
+                self._session.post(self.endpoint, json=self.to_otlp(spans), timeout=5)
+            except requests.RequestException as e:
+                logger.warning(f"Error exporting {len(spans)} spans to {self.endpoint}: {e}")
+
+    def to_otlp(self, spans: list[Span]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": _otlp_value(self.service_name)}]},
+                    "scopeSpans": [
+                        {"scope": {"name": __name__}, "spans": [self._to_otlp_span(span) for span in spans]}
+                    ],
+                }
+            ]
+        }
+
+    def _to_otlp_span(self, span: Span) -> dict:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_time),
+            "endTimeUnixNano": str(span.end_time or span.start_time),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_span_id:
+            otlp_span["parentSpanId"] = span.parent_span_id
+        return otlp_span
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter | None = None) -> None:
+        self.exporter = exporter
+
+    def span(self, name: str, **attributes: Any) -> Span | NoopSpan:
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(self, name, attributes, _current_span.get())
+
+    def export(self, span: Span) -> None:
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def use_span(span: Span | None) -> Iterator[None]:
+    # Makes the spans opened in another thread children of `span`, e.g. the scrapes of a request.
+    token = _current_span.set(span)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+def build_exporter(name: str) -> SpanExporter | None:
+    if name == "log":
+        return LogSpanExporter()
+    if name == "otlp":
+        return OTLPSpanExporter(TRACING_OTLP_ENDPOINT, TRACING_SERVICE_NAME, TRACING_EXPORT_INTERVAL)
+    return None
+
+
+tracer = Tracer(build_exporter(TRACING_EXPORTER))
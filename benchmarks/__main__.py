@@ -0,0 +1,37 @@
+"""Runs every benchmark and writes the results as JSON, to compare them between releases.
+
+Usage: python -m benchmarks [--output results.json] [--sites 1,14,50,500] [--days 1,2,3] [--repeat 3]
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks import pipeline, scrapers, websdepadel_parse
+from benchmarks.common import metadata
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="File to write the results to, stdout by default.")
+    parser.add_argument("--sites", type=pipeline.parse_list, default=pipeline.SITE_COUNTS, help="Site counts.")
+    parser.add_argument("--days", type=pipeline.parse_list, default=pipeline.DAYS, help="Day counts.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per pipeline measure.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every stub response.")
+    args = parser.parse_args()
+
+    results = [
+        websdepadel_parse.run(repeat=50),
+        *scrapers.run(repeat=50),
+        *pipeline.run(args.sites, args.days, args.repeat, args.latency_ms / 1000),
+    ]
+    report = json.dumps({"metadata": metadata(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import logging
+import platform
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+
+from flask import Flask
+
+from app.cache import cache
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+@contextmanager
+def bench_app() -> Iterator[Flask]:
+    # In-process cache, so the results do not depend on a Redis server and a cold run only needs a clear.
+    logging.getLogger().setLevel(logging.WARNING)
+    app = Flask(__name__)
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_THRESHOLD": 1_000_000, "CACHE_DEFAULT_TIMEOUT": 0})
+    with app.app_context():
+        yield app
+
+
+def timings(fn: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> dict:
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started_at = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started_at) * 1000)
+
+    return {
+        "repeat": repeat,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def metadata() -> dict:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
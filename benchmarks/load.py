@@ -0,0 +1,180 @@
+"""Throughput of the availability endpoint with concurrent clients, by server setup.
+
+Each server runs the app against the stub server, with every club answering after --latency-ms:
+  flask     the Flask development server (`flask run`), a thread per request in one process
+  uvicorn   the ASGI app in one uvicorn process
+  gunicorn  the production setup of gunicorn.conf.py, GUNICORN_* variables apply
+
+The cache is filled by a first request before measuring, so by default the results are those of a warm cache. With
+--cache SimpleCache each process has its own cache and the other gunicorn workers scrape on their first requests,
+--cache RedisCache shares it between the workers (it needs the Redis of the CACHE_REDIS_* settings) and with
+--cache NullCache every request scrapes the stub server.
+
+Usage: python -m benchmarks.load [--servers flask,uvicorn,gunicorn] [--clients 32] [--duration 10]
+                                 [--latency-ms 50] [--cache SimpleCache]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from app.settings import GUNICORN_WORKER_CLASS
+from benchmarks.common import metadata
+from benchmarks.server import StubServer
+
+ROOT_DIR = Path(__file__).parent.parent
+# Late evening slots, so the fixtures have matches left after the past ones are filtered out
+AVAILABILITY_PATH = "/api/availability/?days=012&time_min=20:00&time_max=23:00"
+SERVERS = {
+    "flask": ["-m", "flask", "--app", "benchmarks.load_app:app", "run", "--port", "{port}"],
+    "uvicorn": ["-m", "uvicorn", "benchmarks.load_app:asgi_app", "--port", "{port}", "--log-level", "warning"],
+    "gunicorn": [
+        "-m",
+        "gunicorn",
+        "-c",
+        "gunicorn.conf.py",
+        "--bind",
+        "127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+        "benchmarks.load_app:{gunicorn_app}",
+    ],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, port: int, env: dict) -> subprocess.Popen:
+    gunicorn_app = "asgi_app" if GUNICORN_WORKER_CLASS.startswith("uvicorn") else "app"
+    args = [arg.format(port=port, gunicorn_app=gunicorn_app) for arg in SERVERS[name]]
+    process = subprocess.Popen(
+        [sys.executable, *args], cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1).ok:
+                return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_clients(url: str, clients: int, duration: float) -> dict:
+    # Every client sends a request after the other until the duration is over, the responses with sites that
+    # timed out or failed count as errors.
+    deadline = time.monotonic() + duration
+
+    def client() -> tuple[list[float], int]:
+        samples, errors = [], 0
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                started_at = time.perf_counter()
+                try:
+                    response = session.get(url, timeout=60)
+                    failed = not response.ok or "X-Timed-Out-Sites" in response.headers
+                    failed = failed or "X-Failed-Sites" in response.headers
+                except requests.RequestException:
+                    failed = True
+                if failed:
+                    errors += 1
+                else:
+                    samples.append((time.perf_counter() - started_at) * 1000)
+        return samples, errors
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        results = list(executor.map(lambda _: client(), range(clients)))
+    elapsed = time.perf_counter() - started_at
+
+    samples = sorted(sample for client_samples, _ in results for sample in client_samples)
+    if not samples:
+        raise RuntimeError(f"Every request to {url} failed")
+    return {
+        "requests": len(samples),
+        "errors": sum(errors for _, errors in results),
+        "requests_per_second": round(len(samples) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95)], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def run(servers: list[str], clients: int, duration: float, latency: float, cache_type: str) -> list[dict]:
+    results = []
+    with StubServer(latency) as stub_server, tempfile.TemporaryDirectory() as tmp_dir:
+        env = {
+            **os.environ,
+            "BENCH_STUB_URL": stub_server.base_url,
+            "BENCH_CACHE_TYPE": cache_type,
+            "SITE_CATALOGUE_PATH": os.path.join(tmp_dir, "sites.db"),
+        }
+        for name in servers:
+            port = free_port()
+            # Only gunicorn has several processes to merge the metrics of, it creates the directory
+            server_env = (
+                {**env, "PROMETHEUS_MULTIPROC_DIR": os.path.join(tmp_dir, "metrics")} if name == "gunicorn" else env
+            )
+            process = start_server(name, port, server_env)
+            url = f"http://127.0.0.1:{port}{AVAILABILITY_PATH}"
+            try:
+                # Fills the cache of the app (of one process with SimpleCache), the first scrape of the sites is not
+                # what is measured
+                requests.get(url, timeout=60)
+                stats = run_clients(url, clients, duration)
+            finally:
+                stop_server(process)
+            results.append(
+                {
+                    "benchmark": "load",
+                    "server": name,
+                    "clients": clients,
+                    "cache": cache_type,
+                    "latency_ms": latency * 1000,
+                    **stats,
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", default=",".join(SERVERS), help="Comma separated server setups.")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per server.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latency added to every stub response.")
+    parser.add_argument(
+        "--cache", default="SimpleCache", help="Cache type of the app: SimpleCache, RedisCache or NullCache."
+    )
+    args = parser.parse_args()
+    results = run(args.servers.split(","), args.clients, args.duration, args.latency_ms / 1000, args.cache)
+    json.dump({"metadata": metadata(), "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""The app served by the load test: the scrapers request the stub server at BENCH_STUB_URL instead of the clubs.
+
+BENCH_CACHE_TYPE sets the cache: SimpleCache (the default) keeps the scrapes in the memory of each worker, RedisCache
+shares them between the workers like in production (the Redis of the CACHE_REDIS_* settings) and NullCache scrapes
+the stub server on every request. Not meant to be run directly, see benchmarks.load.
+"""
+
+import os
+from unittest.mock import patch
+
+from app import create_app
+from app.api.routes import api
+from app.asgi import ASGIApp
+from app.cache import cache
+from benchmarks.server import StubServerAdapter, stub_session_factory
+
+patch(
+    "app.integrations.scrapers.scraper_interface.new_session",
+    stub_session_factory(StubServerAdapter(os.environ["BENCH_STUB_URL"])),
+).start()
+# Only the supported sites, the Playtomic tenants around would be requested to playtomic.io
+patch("app.services.sites.get_playtomic_sites", return_value=[]).start()
+
+app = create_app()
+# The scrapes do not expire during the run, under its own prefix to keep them apart from those of the app in Redis
+cache.init_app(
+    app,
+    config={
+        **(cache.config or {}),
+        "CACHE_TYPE": os.getenv("BENCH_CACHE_TYPE", "SimpleCache"),
+        "CACHE_DEFAULT_TIMEOUT": 0,
+        "CACHE_KEY_PREFIX": "bench-",
+    },
+)
+asgi_app = ASGIApp(app, api)
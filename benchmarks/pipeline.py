@@ -0,0 +1,95 @@
+"""End to end cost of get_court_data against the stub server, by site count, days and cache state.
+
+Usage: python -m benchmarks.pipeline [--sites 1,14,50,500] [--days 1,2,3] [--repeat 3] [--latency-ms 0]
+"""
+
+import argparse
+import json
+import sys
+from unittest.mock import patch
+
+from app.cache import cache
+from app.models import MatchFilter, SiteInfo, SiteType
+from app.services.availability import get_court_data
+from benchmarks.common import bench_app, metadata, timings
+from benchmarks.server import StubServer, StubServerAdapter, stub_session_factory
+
+SITE_COUNTS = [1, 14, 50, 500]
+DAYS = [1, 2, 3]
+SITE_TYPES = [SiteType.WEBSDEPADEL, SiteType.MATCHPOINT, SiteType.PLAYTOMIC]
+
+
+def make_sites(count: int) -> list[SiteInfo]:
+    # Every club has its own host except the Playtomic ones, which share playtomic.io like in production.
+    sites = []
+    for i in range(count):
+        site_type = SITE_TYPES[i % len(SITE_TYPES)]
+        url = {
+            SiteType.WEBSDEPADEL: f"club{i}.websdepadel.bench",
+            SiteType.MATCHPOINT: f"club{i}.matchpoint.bench",
+            SiteType.PLAYTOMIC: f"https://playtomic.io/tenant/bench-{i}",
+        }[site_type]
+        coordinates = (39.47 + (i % 20) * 0.01, -0.37 - (i // 20) * 0.01)
+        sites.append(SiteInfo(name=f"Club {i}", url=url, type=site_type, coordinates=coordinates))
+    return sites
+
+
+def run(site_counts: list[int], days: list[int], repeat: int, latency: float) -> list[dict]:
+    results = []
+    with (
+        bench_app(),
+        StubServer(latency) as server,
+        patch(
+            "app.integrations.scrapers.scraper_interface.new_session",
+            stub_session_factory(StubServerAdapter(server.base_url)),
+        ),
+    ):
+        for site_count in site_counts:
+            sites = make_sites(site_count)
+            for day_count in days:
+                # Late evening slots, so the fixtures have matches left after the past ones are filtered out
+                match_filter = MatchFilter(
+                    days="".join(str(day) for day in range(day_count)), time_min="20:00", time_max="23:00"
+                )
+
+                def scrape() -> None:
+                    response = get_court_data(match_filter, sites)
+                    if response.timed_out_sites or response.failed_sites:
+                        raise RuntimeError(f"Scrape failed: {response.failed_sites or response.timed_out_sites}")
+
+                for cache_state in ["cold", "warm"]:
+                    cache.clear()
+                    if cache_state == "warm":
+                        scrape()
+                    stats = timings(scrape, repeat, setup=cache.clear if cache_state == "cold" else None)
+                    results.append(
+                        {
+                            "benchmark": "get_court_data",
+                            "sites": site_count,
+                            "days": day_count,
+                            "cache": cache_state,
+                            "latency_ms": latency * 1000,
+                            **stats,
+                        }
+                    )
+    return results
+
+
+def parse_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=parse_list, default=SITE_COUNTS, help="Comma separated site counts.")
+    parser.add_argument("--days", type=parse_list, default=DAYS, help="Comma separated day counts.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measure.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every stub response.")
+    args = parser.parse_args()
+    results = run(args.sites, args.days, args.repeat, args.latency_ms / 1000)
+    json.dump({"metadata": metadata(), "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
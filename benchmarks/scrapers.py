@@ -0,0 +1,84 @@
+"""Parse, filter and cache encoding cost of each scraper on the recorded fixtures, without network.
+
+Usage: python -m benchmarks.scrapers [--repeat 50]
+"""
+
+import argparse
+import json
+import pickle
+import sys
+from datetime import datetime, timedelta, timezone
+
+from app.integrations.scrapers import (
+    MatchpointScraper,
+    PlaytomicScraper,
+    ScraperInterface,
+    WebsdepadelScraper,
+)
+from app.integrations.scrapers.grid_codec import decode_day_grid, encode_day_grid
+from app.models import DayGrid, MatchFilter, SiteInfo, SiteType
+from benchmarks.common import bench_app, load_fixture, metadata, timings
+
+
+def make_scrapers() -> dict[SiteType, ScraperInterface]:
+    # Scrapers reading the fixtures instead of requesting them, so only the parse is measured.
+    match_filter = MatchFilter(days="1", time_min="18:00", time_max="21:00")
+
+    websdepadel = WebsdepadelScraper(
+        SiteInfo(name="Websdepadel", url="club.websdepadel.bench", type=SiteType.WEBSDEPADEL), match_filter
+    )
+    html = load_fixture("websdepadel_partidas.html")
+    websdepadel._get_scraped_availability = lambda date: websdepadel._parse_availability(html)  # type: ignore
+
+    matchpoint = MatchpointScraper(
+        SiteInfo(name="Matchpoint", url="club.matchpoint.bench", type=SiteType.MATCHPOINT), match_filter, sport_id=4
+    )
+    matchpoint.sport_names = {4: "Pádel"}
+    grid = load_fixture("matchpoint_cuadro.json")
+    matchpoint._get_scraped_availability = lambda date: json.loads(grid)["d"]["Columnas"]  # type: ignore
+
+    playtomic = PlaytomicScraper(
+        SiteInfo(name="Playtomic", url="https://playtomic.io/tenant/bench", type=SiteType.PLAYTOMIC), match_filter
+    )
+    availability = load_fixture("playtomic_availability.json")
+    playtomic._get_scraped_availability = lambda date: json.loads(availability)  # type: ignore
+
+    return {SiteType.WEBSDEPADEL: websdepadel, SiteType.MATCHPOINT: matchpoint, SiteType.PLAYTOMIC: playtomic}
+
+
+def run(repeat: int) -> list[dict]:
+    date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    results = []
+    with bench_app():
+        for site_type, scraper in make_scrapers().items():
+            matches = scraper._get_daily_matches(date)
+            filtered_matches = scraper._filter_matches(date, matches)
+            grid = DayGrid(matches=matches, scraped_at=datetime.now(timezone.utc))
+            encoded_grid = encode_day_grid(grid)
+            results.append(
+                {
+                    "benchmark": "scraper",
+                    "site_type": site_type.value,
+                    "matches": len(matches),
+                    "filtered_matches": len(filtered_matches),
+                    "parse": timings(lambda: scraper._get_daily_matches(date), repeat),
+                    "filter": timings(lambda: scraper._filter_matches(date, matches), repeat),
+                    "cached_bytes": len(encoded_grid),
+                    "pickled_bytes": len(pickle.dumps(grid)),
+                    "encode": timings(lambda: encode_day_grid(grid), repeat),
+                    "decode": timings(lambda: decode_day_grid(encoded_grid), repeat),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measure.")
+    args = parser.parse_args()
+    json.dump({"metadata": metadata(), "results": run(args.repeat)}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
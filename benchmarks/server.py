@@ -0,0 +1,104 @@
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from types import TracebackType
+from typing import Any
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from app.integrations.http import SharedHTTPAdapter
+from benchmarks.common import load_fixture
+
+# Responses of each site type, by path. Every club gets the same recorded page.
+ROUTES = {
+    ("GET", "/Booking/Grid.aspx"): ("text/html; charset=utf-8", "matchpoint_grid.html"),
+    ("POST", "/booking/srvc.aspx/ObtenerCuadros"): ("application/json", "matchpoint_sports.json"),
+    ("POST", "/booking/srvc.aspx/ObtenerCuadro"): ("application/json", "matchpoint_cuadro.json"),
+    ("GET", "/api/v1/availability"): ("application/json", "playtomic_availability.json"),
+    ("GET", "/partidas/"): ("text/html; charset=utf-8", "websdepadel_partidas.html"),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def do_GET(self) -> None:
+        self._respond("GET")
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond("POST")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _respond(self, method: str) -> None:
+        path = urlsplit(self.path).path
+        route = next(
+            (
+                route
+                for (route_method, prefix), route in ROUTES.items()
+                if method == route_method and path.startswith(prefix)
+            ),
+            None,
+        )
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if route is None:
+            self.send_error(404)
+            return
+
+        content_type, fixture = route
+        body = self.server.bodies[fixture]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# Stand-in for the club websites and the Playtomic API, served from the recorded fixtures on localhost.
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.bodies = {fixture: load_fixture(fixture).encode() for _, fixture in ROUTES.values()}
+        self._thread = Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: type[BaseException] | BaseException | TracebackType | None) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StubServerAdapter(SharedHTTPAdapter):
+    # Sends every request to the stub server, keeping the path and the query of the original url.
+    def __init__(self, base_url: str) -> None:
+        self.base_url = urlsplit(base_url)
+        super().__init__(pool_maxsize=64)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        url = urlsplit(request.url or "")
+        request.url = urlunsplit((self.base_url.scheme, self.base_url.netloc, url.path, url.query, ""))
+        return super().send(request, **kwargs)
+
+
+def stub_session_factory(adapter: StubServerAdapter) -> Any:
+    def new_session() -> requests.Session:
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return new_session
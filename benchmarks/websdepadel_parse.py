@@ -0,0 +1,70 @@
+"""Parse time and memory per Webs de Padel page, full page parse against the strained one.
+
+Usage: python -m benchmarks.websdepadel_parse [--repeat 50]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from bs4 import BeautifulSoup, Tag
+
+from app.integrations.scrapers import WebsdepadelScraper
+from app.models import MatchFilter, SiteInfo, SiteType
+from benchmarks.common import load_fixture
+
+
+def full_parse(html: str) -> Tag | None:
+    # The parse used before the strainer, kept as the reference
+    availability = BeautifulSoup(html, "html.parser").find("div", id="resumen-disponibilidad")
+    return availability if isinstance(availability, Tag) else None
+
+
+def measure(parse: Callable[[str], Tag | None], html: str, repeat: int) -> dict:
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    elapsed = time.perf_counter() - started_at
+
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"parse_ms": round(elapsed / repeat * 1000, 3), "peak_memory_kb": round(peak / 1024, 1)}
+
+
+def run(repeat: int) -> dict:
+    html = load_fixture("websdepadel_partidas.html")
+    scraper = WebsdepadelScraper(
+        SiteInfo(name="Example", url="example.com", type=SiteType.WEBSDEPADEL),
+        MatchFilter(days="0", time_min="00:00", time_max="03:00"),
+    )
+
+    expected = scraper._get_availability_matches(full_parse(html))
+    if scraper._get_availability_matches(scraper._parse_availability(html)) != expected:
+        raise AssertionError("The strained parse does not return the same matches as the full one")
+
+    return {
+        "benchmark": "websdepadel_parse",
+        "page_kb": round(len(html.encode()) / 1024, 1),
+        "matches": len(expected),
+        "repeat": repeat,
+        "full_parse": measure(full_parse, html, repeat),
+        "strained_parse": measure(scraper._parse_availability, html, repeat),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="Parses per measure.")
+    args = parser.parse_args()
+    json.dump(run(args.repeat), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Production server settings, taken from app.settings: `gunicorn -c gunicorn.conf.py`
+import os
+from typing import Any
+
+# prometheus_client picks where the metrics are stored when it is imported, and importing app.settings loads the app
+# (and its metrics), so the directory is set first. Only here, the other commands (e.g. `flask prewarm`) keep the
+# metrics in memory.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/padel-api-metrics")
+PROMETHEUS_MULTIPROC_DIR = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+# isort: split
+from app.settings import (  # noqa: E402
+    GUNICORN_BIND,
+    GUNICORN_GRACEFUL_TIMEOUT,
+    GUNICORN_KEEPALIVE,
+    GUNICORN_MAX_REQUESTS,
+    GUNICORN_MAX_REQUESTS_JITTER,
+    GUNICORN_THREADS,
+    GUNICORN_TIMEOUT,
+    GUNICORN_WORKER_CLASS,
+    GUNICORN_WORKERS,
+)
+
+# The uvicorn workers serve the ASGI app, where requests waiting for the scrapes do not hold a thread. The gthread
+# workers serve the Flask app with GUNICORN_THREADS requests at a time.
+wsgi_app = "app:asgi_app" if GUNICORN_WORKER_CLASS.startswith("uvicorn") else "app:app"
+bind = GUNICORN_BIND
+workers = GUNICORN_WORKERS
+worker_class = GUNICORN_WORKER_CLASS
+threads = GUNICORN_THREADS
+# The app is loaded once in the master and the workers share its memory copy-on-write, a broken app also fails the
+# start instead of every worker
+preload_app = True
+# Workers are replaced after a number of requests, the jitter keeps them from restarting all at once
+max_requests = GUNICORN_MAX_REQUESTS
+max_requests_jitter = GUNICORN_MAX_REQUESTS_JITTER
+# Longer than AVAILABILITY_MAX_TIMEOUT, so a worker waiting for the slowest sites is not killed
+timeout = GUNICORN_TIMEOUT
+graceful_timeout = GUNICORN_GRACEFUL_TIMEOUT
+keepalive = GUNICORN_KEEPALIVE
+
+
+def on_starting(server: Any) -> None:
+    # The metrics of a previous run would be merged with the new ones, the app is already loaded but it only
+    # writes metrics from the workers
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
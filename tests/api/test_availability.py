@@ -1,14 +1,18 @@
+import json
+from datetime import datetime, timezone
 from unittest.mock import patch
 
 from flask import Response
 from freezegun import freeze_time
+from pytest import mark
 
-from app.models import MatchInfo, SiteMatches
+from app.models import CourtAvailabilityResponse, MatchInfo, SiteMatches
+from app.settings import AVAILABILITY_MAX_TIMEOUT, HTTP_CACHE_AVAILABILITY_MAX_AGE
 
 
 @patch("app.api.availability.get_court_data")
 def test_get_returns_response(mock_get_court_data, client) -> None:
-    mock_get_court_data.return_value = []
+    mock_get_court_data.return_value = CourtAvailabilityResponse(site_matches=[])
     response = client.get("/api/availability/?sport=padel")
     assert isinstance(response, Response)
 
@@ -18,29 +22,31 @@ def test_get_returns_json_response_with_court_data(mocker, client, example_site)
     """Information returned by the API is the same as the one returned by the scrap_websdepadel_court_data service
     so this is straightforward to test."""
 
-    return_value = [
-        SiteMatches(
-            site=example_site,
-            date="2024-06-11",
-            distance_km=0.0,
-            matches=[
-                MatchInfo(
-                    sport="padel",
-                    court="Court 1",
-                    time="10:00",
-                    url="http://example.com/match1",
-                    is_available=True,
-                ),
-                MatchInfo(
-                    sport="tenis",
-                    court="Court 2",
-                    time="12:00",
-                    url="http://example.com/match2",
-                    is_available=False,
-                ),
-            ],
-        )
-    ]
+    return_value = CourtAvailabilityResponse(
+        site_matches=[
+            SiteMatches(
+                site=example_site,
+                date="2024-06-11",
+                distance_km=0.0,
+                matches=[
+                    MatchInfo(
+                        sport="padel",
+                        court="Court 1",
+                        time="10:00",
+                        url="http://example.com/match1",
+                        is_available=True,
+                    ),
+                    MatchInfo(
+                        sport="tenis",
+                        court="Court 2",
+                        time="12:00",
+                        url="http://example.com/match2",
+                        is_available=False,
+                    ),
+                ],
+            )
+        ]
+    )
     mocker.patch("app.api.availability.get_court_data", return_value=return_value)
 
     response = client.get("/api/availability/?sport=padel")
@@ -62,3 +68,126 @@ def test_get_returns_json_response_with_court_data(mocker, client, example_site)
     assert matches[1]["time"] == "12:00"
     assert matches[1]["url"] == "http://example.com/match2"
     assert matches[1]["is_available"] is False
+
+
+@patch("app.api.availability.get_court_data")
+def test_get_returns_timed_out_and_failed_sites_headers(mock_get_court_data, client) -> None:
+    mock_get_court_data.return_value = CourtAvailabilityResponse(
+        site_matches=[],
+        timed_out_sites=["slow.com", "slower.com"],
+        failed_sites=["broken.com"],
+        unavailable_sites=["down.com"],
+    )
+    response = client.get("/api/availability/?timeout=2.5")
+
+    assert response.status_code == 200
+    assert response.get_json() == []
+    assert response.headers["X-Timed-Out-Sites"] == "slow.com,slower.com"
+    assert response.headers["X-Failed-Sites"] == "broken.com"
+    assert response.headers["X-Unavailable-Sites"] == "down.com"
+    assert mock_get_court_data.call_args.args[3] == 2.5
+
+
+@patch("app.api.availability.get_court_data")
+def test_get_answers_not_modified_while_the_data_does_not_change(mock_get_court_data, client, example_site) -> None:
+    site_matches = SiteMatches(
+        site=example_site,
+        date="2024-06-11",
+        matches=[MatchInfo(sport="padel", court="Court 1", time="21:00", url="http://a.com", is_available=True)],
+        scraped_at=datetime(2024, 6, 11, 9, 30, tzinfo=timezone.utc),
+    )
+    mock_get_court_data.return_value = CourtAvailabilityResponse(site_matches=[site_matches])
+    url = "/api/availability/?time_min=20:00&time_max=23:00"
+
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == f"public, max-age={HTTP_CACHE_AVAILABILITY_MAX_AGE}"
+    assert response.headers["Vary"] == "X-SITE, X-GEOLOCATION"
+    # The matches also depend on the current time, the ETag is the only validator
+    assert "Last-Modified" not in response.headers
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    site_matches.scraped_at = datetime(2024, 6, 11, 9, 45, tzinfo=timezone.utc)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@patch("app.api.availability.get_court_data")
+def test_get_does_not_cache_partial_responses(mock_get_court_data, client) -> None:
+    mock_get_court_data.return_value = CourtAvailabilityResponse(site_matches=[], timed_out_sites=["slow.com"])
+
+    response = client.get("/api/availability/")
+
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in response.headers
+
+
+@patch("app.api.availability.get_court_data")
+def test_get_caps_timeout(mock_get_court_data, client) -> None:
+    mock_get_court_data.return_value = CourtAvailabilityResponse(site_matches=[])
+    response = client.get("/api/availability/?timeout=3600")
+
+    assert response.status_code == 200
+    assert "X-Timed-Out-Sites" not in response.headers
+    assert mock_get_court_data.call_args.args[3] == AVAILABILITY_MAX_TIMEOUT
+
+
+@mark.parametrize("timeout", ["0", "-1", "nan", "inf"])
+def test_get_rejects_invalid_timeout(client, timeout) -> None:
+    response = client.get(f"/api/availability/?timeout={timeout}")
+
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "timeout must be greater than 0"
+
+
+def stream_items(example_site) -> list:
+    match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://example.com/1", is_available=True)
+    return [
+        SiteMatches(site=example_site, date="2024-06-11", matches=[match]),
+        CourtAvailabilityResponse(site_matches=[], timed_out_sites=["slow.com"]),
+    ]
+
+
+@patch("app.api.availability.stream_court_data")
+def test_stream_sends_ndjson_events(mock_stream_court_data, client, example_site) -> None:
+    mock_stream_court_data.return_value = iter(stream_items(example_site))
+
+    response = client.get("/api/availability/stream?time_min=10:00&time_max=12:00")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    site_matches, summary = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert site_matches["event"] == "site_matches"
+    assert site_matches["data"]["site"]["url"] == example_site.url
+    assert site_matches["data"]["matches"][0]["time"] == "10:00"
+    assert summary["event"] == "summary"
+    assert summary["data"]["timed_out_sites"] == ["slow.com"]
+    assert summary["data"]["failed_sites"] == []
+    assert summary["data"]["duration_ms"] >= 0
+    assert "site_matches" not in summary["data"]
+
+
+@patch("app.api.availability.stream_court_data")
+def test_stream_sends_server_sent_events(mock_stream_court_data, client, example_site) -> None:
+    mock_stream_court_data.return_value = iter(stream_items(example_site))
+
+    response = client.get("/api/availability/stream?format=sse")
+
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = response.get_data(as_text=True).split("\n\n")
+    assert events[0].startswith("event: site_matches\ndata: {")
+    assert events[1].startswith("event: summary\ndata: {")
+    assert json.loads(events[1].split("data: ", 1)[1])["timed_out_sites"] == ["slow.com"]
+    assert events[2] == ""
+
+
+def test_stream_rejects_unknown_format(client) -> None:
+    response = client.get("/api/availability/stream?format=xml")
+
+    assert response.status_code == 400
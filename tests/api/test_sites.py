@@ -4,6 +4,7 @@ from pytest import fixture
 
 from app.models import GeolocationFilter, SiteType
 from app.services.sites import get_available_sites, get_playtomic_sites
+from app.settings import HTTP_CACHE_SITES_MAX_AGE
 
 
 class TestAvailableSites:
@@ -12,7 +13,7 @@ class TestAvailableSites:
         return GeolocationFilter(latitude=40.416775, longitude=-3.703790, radius_km=25)
 
     def test_get_returns_response(self, mocker, client, playtomic_site, geo_filter) -> None:
-        mocker.patch("app.services.sites.get_playtomic_sites", return_value=[playtomic_site])
+        mocker.patch("app.services.sites.get_playtomic_sites", return_value=[(playtomic_site, 0.0)])
         response = client.get("/api/sites/", headers={"X-GEOLOCATION": "40.416775,-3.703790,25"})
         json_data = response.get_json()
         expected_response = get_available_sites(geo_filter).model_dump()
@@ -25,14 +26,31 @@ class TestAvailableSites:
         assert len(playtomic_sites) == 1
         assert json_data["last_update"] == expected_response["last_update"]
 
+    def test_get_answers_not_modified_while_the_sites_do_not_change(self, mocker, client, playtomic_site) -> None:
+        mock_get_playtomic_sites = mocker.patch("app.services.sites.get_playtomic_sites", return_value=[])
+        headers = {"X-GEOLOCATION": "39.469908,-0.376288,100"}
+
+        response = client.get("/api/sites/", headers=headers)
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == f"public, max-age={HTTP_CACHE_SITES_MAX_AGE}"
+        assert response.headers["Vary"] == "X-SITE, X-GEOLOCATION"
+
+        response = client.get("/api/sites/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        mock_get_playtomic_sites.return_value = [(playtomic_site, 0.0)]
+        response = client.get("/api/sites/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
 
 class TestGetPlaytomicSites:
     @fixture
     def geo_filter(self) -> GeolocationFilter:
         return GeolocationFilter(latitude=40.416775, longitude=-3.703790, radius_km=25)
 
-    @patch("app.services.sites.requests.get")
-    def test_get_playtomic_sites_success(self, mock_get, geo_filter: GeolocationFilter):
+    @patch("app.services.sites.http_session.get")
+    def test_get_playtomic_sites_success(self, mock_get, app, geo_filter: GeolocationFilter):
         mock_response = Mock()
         mock_response.json.return_value = [
             {
@@ -46,17 +64,47 @@ class TestGetPlaytomicSites:
         sites = get_playtomic_sites(geo_filter)
 
         assert len(sites) == 1
-        assert sites[0].name == "Playtomic Test Site"
-        assert sites[0].url == "https://playtomic.io/tenant/67890"
-        assert sites[0].coordinates == (40.416775, -3.70379)
-        assert sites[0].type == SiteType.PLAYTOMIC
+        site, distance_km = sites[0]
+        assert site.name == "Playtomic Test Site"
+        assert site.url == "https://playtomic.io/tenant/67890"
+        assert site.coordinates == (40.416775, -3.70379)
+        assert site.type == SiteType.PLAYTOMIC
+        assert distance_km == 0
 
+        # Looks up the center of the geohash cell with the radius class plus the cell radius
         args, kwargs = mock_get.call_args
-        assert "coordinate=40.416775%2C-3.70379" in args[0]
-        assert "radius=25000" in args[0]
+        assert "coordinate=40.407715%2C-3.713379" in args[0]
+        assert "radius=29000" in args[0]
 
-    @patch("app.services.sites.requests.get")
-    def test_get_playtomic_sites_error(self, mock_get, geo_filter: GeolocationFilter):
+    @patch("app.services.sites.http_session.get")
+    def test_get_playtomic_sites_cached_by_bucket(self, mock_get, app, geo_filter: GeolocationFilter):
+        mock_response = Mock()
+        mock_response.json.return_value = [
+            {
+                "tenant_name": "Near",
+                "tenant_id": "1",
+                "address": {"coordinate": {"lat": "40.416775", "lon": "-3.703790"}},
+            },
+            {
+                "tenant_name": "Far",
+                "tenant_id": "2",
+                "address": {"coordinate": {"lat": "40.700000", "lon": "-3.703790"}},
+            },
+        ]
+        mock_get.return_value = mock_response
+
+        sites = get_playtomic_sites(geo_filter)
+        nearby_sites = get_playtomic_sites(GeolocationFilter(latitude=40.41, longitude=-3.71, radius_km=20))
+
+        assert mock_get.call_count == 1
+        assert [site.name for site, _ in sites] == ["Near"]
+        assert [site.name for site, _ in nearby_sites] == ["Near"]
+
+        get_playtomic_sites(GeolocationFilter(latitude=40.416775, longitude=-3.703790, radius_km=30))
+        assert mock_get.call_count == 2
+
+    @patch("app.services.sites.http_session.get")
+    def test_get_playtomic_sites_error(self, mock_get, app, geo_filter: GeolocationFilter):
         mock_response = Mock()
         mock_response.json.side_effect = ValueError("Invalid JSON")
         mock_get.return_value = mock_response
@@ -65,3 +113,6 @@ class TestGetPlaytomicSites:
 
         assert len(sites) == 0
         mock_get.assert_called_once()
+
+        get_playtomic_sites(geo_filter)
+        assert mock_get.call_count == 2
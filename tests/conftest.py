@@ -7,17 +7,39 @@ from flask import Flask
 from flask.testing import FlaskClient
 
 from app.api.routes import api
-from app.middleware import site_middleware
+from app.cache import cache
+from app.metrics import metrics_view
+from app.middleware import (
+    conditional_middleware,
+    metrics_middleware,
+    request_middleware,
+)
 from app.models import SiteInfo, SiteType
+from app.services.catalogue import SiteCatalogue
+from app.services.site_index import SiteIndex
+from app.services.sites import SUPPORTED_SITES
 
 
 def guard(*args, **kwargs):
     raise Exception("Network calls are not allowed in tests")
 
 
+real_socket = socket.socket
+real_socketpair = socket.socketpair
 socket.socket = guard  # type: ignore
 
 
+@pytest.fixture
+def local_socketpair():
+    # asyncio event loops wake themselves up through a local socket pair, the only sockets async tests can open.
+    def socketpair(*args, **kwargs):
+        with patch("socket.socket", real_socket):
+            return real_socketpair(*args, **kwargs)
+
+    with patch("socket.socketpair", socketpair):
+        yield
+
+
 @pytest.fixture
 def app() -> Iterable[Flask]:
     app = Flask(__name__)
@@ -27,7 +49,11 @@ def app() -> Iterable[Flask]:
         }
     )
     api.init_app(app)
-    app.before_request(site_middleware())
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    app.before_request(request_middleware())
+    app.after_request(metrics_middleware())
+    app.after_request(conditional_middleware())
+    app.add_url_rule("/metrics", "metrics", metrics_view)
 
     with app.app_context():
         yield app
@@ -57,6 +83,21 @@ def patch_cache():
     with (
         patch("app.cache.cache.get") as mock_cache_get,
         patch("app.cache.cache.set") as mock_cache_set,
+        patch("app.cache.cache.add", return_value=True),
+        patch("app.cache.cache.delete"),
     ):
         mock_cache_get.return_value = None
         yield mock_cache_get, mock_cache_set
+
+
+@pytest.fixture(autouse=True)
+def site_index(tmp_path) -> Iterable[SiteIndex]:
+    # Each test starts with a catalogue and an index of the supported sites only.
+    index = SiteIndex()
+    catalogue = SiteCatalogue(str(tmp_path / "sites.db"), SUPPORTED_SITES, index)
+    with (
+        patch("app.services.sites.site_index", index),
+        patch("app.services.sites.site_catalogue", catalogue),
+        patch("app.services.prewarm.site_catalogue", catalogue),
+    ):
+        yield index
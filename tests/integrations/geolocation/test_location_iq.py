@@ -4,7 +4,7 @@ from app.integrations.geolocation.location_iq import LocationIQProvider
 from app.models import GeolocatedPlace
 
 
-@patch("app.integrations.geolocation.location_iq.requests.get")
+@patch("app.integrations.geolocation.location_iq.http_session.get")
 def test_get_reverse_geolocation(mock_get):
     mock_response = {
         "place_id": "12345",
@@ -23,7 +23,7 @@ def test_get_reverse_geolocation(mock_get):
     assert result.lon == -0.654321
 
 
-@patch("app.integrations.geolocation.location_iq.requests.get")
+@patch("app.integrations.geolocation.location_iq.http_session.get")
 def test_get_matching_places(mock_get):
     mock_response = [
         {
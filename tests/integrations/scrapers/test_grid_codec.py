@@ -0,0 +1,51 @@
+import pickle
+from datetime import datetime, timezone
+
+from app.integrations.scrapers.grid_codec import (
+    GRID_FORMAT_VERSION,
+    decode_day_grid,
+    encode_day_grid,
+)
+from app.models import DayGrid, MatchInfo
+
+
+def day_grid() -> DayGrid:
+    return DayGrid(
+        matches=[
+            MatchInfo(
+                sport="Pádel",
+                court=f"Pista {court}",
+                time=f"{hour:02d}:30",
+                url="https://a.com",
+                is_available=hour % 2 == 0,
+            )
+            for court in range(1, 5)
+            for hour in range(8, 23)
+        ],
+        scraped_at=datetime(2024, 6, 10, 23, 55, 12, 345678, tzinfo=timezone.utc),
+    )
+
+
+def test_encoded_grid_round_trips():
+    grid = day_grid()
+
+    data = encode_day_grid(grid)
+
+    assert data[0] == GRID_FORMAT_VERSION
+    assert decode_day_grid(data) == grid
+    assert len(data) < len(pickle.dumps(grid)) / 4
+
+
+def test_empty_grid_round_trips():
+    grid = DayGrid(matches=[], scraped_at=datetime(2024, 6, 10, tzinfo=timezone.utc))
+
+    assert decode_day_grid(encode_day_grid(grid)) == grid
+
+
+def test_legacy_entries_are_read():
+    grid = day_grid()
+
+    assert decode_day_grid(grid) is grid
+    assert decode_day_grid([grid.matches[0]]) is None
+    assert decode_day_grid(bytes([GRID_FORMAT_VERSION + 1]) + encode_day_grid(grid)[1:]) is None
+    assert decode_day_grid(None) is None
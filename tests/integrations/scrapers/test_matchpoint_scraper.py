@@ -1,10 +1,13 @@
 from unittest.mock import Mock, patch
 
 from freezegun import freeze_time
-from pytest import fixture, mark
+from pytest import fixture, mark, raises
 
 from app.integrations.scrapers import MatchpointScraper
+from app.integrations.scrapers.grid_codec import decode_day_grid
+from app.integrations.scrapers.scraper_interface import ScrapeError
 from app.models import MatchFilter, SiteInfo, SiteType
+from app.settings import MATCHPOINT_BOOTSTRAP_TTL
 
 
 @freeze_time("2024-06-11")
@@ -49,7 +52,7 @@ class TestMatchpointScrapCourtData:
         ]
 
     @patch.object(MatchpointScraper, "_get_sport_ids", return_value=[4, 5])
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.get")
+    @patch("app.integrations.http.requests.Session.get")
     def test_get_api_key(self, mock_requests_get, _):
         site = SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT)
         filter = MatchFilter(days="0", time_min="10:00", time_max="13:00")
@@ -66,7 +69,7 @@ class TestMatchpointScrapCourtData:
         mock_requests_get.assert_called_once_with("https://example.com/Booking/Grid.aspx")
 
     @patch.object(MatchpointScraper, "_get_sport_ids", return_value=[4, 5])
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.get")
+    @patch("app.integrations.http.requests.Session.get")
     def test_get_api_key_value_error(self, mock_requests_get, _mock_requests_post):
         site = SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT)
         filter = MatchFilter(days="0", time_min="10:00", time_max="13:00")
@@ -79,7 +82,7 @@ class TestMatchpointScrapCourtData:
         assert scraper.key == ""
 
     @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
     def test_get_sport_ids(self, mock_requests_post, _):
         site = SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT)
         filter = MatchFilter(days="0", time_min="10:00", time_max="13:00")
@@ -98,7 +101,7 @@ class TestMatchpointScrapCourtData:
         )
 
     @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
     def test_get_sport_ids_filter_by_sport(self, mock_requests_post, _):
         site = SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT)
 
@@ -116,7 +119,18 @@ class TestMatchpointScrapCourtData:
         assert padel_scraper.sport_ids == [4]
 
     @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
+    def test_get_sport_ids_limited_by_site_params(self, mock_requests_post, _):
+        site = SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT, scraper_params={"sport_ids": "4"})
+        mock_requests_post.return_value.json.return_value = self.SPORT_LIST_RESPONSE
+
+        scraper = MatchpointScraper(site, MatchFilter(days="0", time_min="10:00", time_max="13:00"))
+
+        assert scraper.sport_ids == [4]
+        assert scraper.sport_names == {5: "TeniS", 4: "PádEl"}
+
+    @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
+    @patch("app.integrations.http.requests.Session.post")
     def test_get_sport_ids_filter_by_sport_not_found(self, mock_requests_post, _):
         site = SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT)
         filter = MatchFilter(days="0", time_min="10:00", time_max="13:00", sport="pickleball or something worse")
@@ -129,7 +143,7 @@ class TestMatchpointScrapCourtData:
         scraper = MatchpointScraper(site, filter)
         assert scraper.sport_ids == []
 
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_sport_ids")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_api_key")
     def test_get_site_matches(self, mock_get_api_key, mock_get_sport_ids, mock_requests_post, sites):
@@ -155,7 +169,7 @@ class TestMatchpointScrapCourtData:
         assert matches[2].time == "10:30"
 
     @freeze_time("2024-06-11 11:00")
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_sport_ids")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_api_key")
     def test_get_site_matches_past_date(self, mock_get_api_key, mock_get_sport_ids, mock_requests_post, sites):
@@ -175,7 +189,7 @@ class TestMatchpointScrapCourtData:
         assert len(matches) == 1
         assert matches[0].time == "12:00"
 
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_sport_ids")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_api_key")
     def test_get_site_matches_filter_date(self, mock_get_api_key, mock_get_sport_ids, mock_requests_post, sites):
@@ -206,7 +220,7 @@ class TestMatchpointScrapCourtData:
 
         assert result == []
 
-    @patch("app.integrations.scrapers.scraper_interface.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.post")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_sport_ids")
     @patch("app.integrations.scrapers.matchpoint_scraper.MatchpointScraper._get_api_key")
     def test_get_site_matches_1_site_matches_per_date(
@@ -227,3 +241,133 @@ class TestMatchpointScrapCourtData:
         assert len(result) == 2
         assert result[0].date == "2024-06-11"
         assert result[1].date == "2024-06-12"
+
+    @patch("app.integrations.http.requests.Session.post")
+    @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
+    def test_get_site_matches_merges_every_sport_grid(self, _mock_get_api_key, mock_requests_post, patch_cache, sites):
+        _, mock_cache_set = patch_cache
+        mock_cache_set.reset_mock()
+        tennis_courts = {
+            "d": {"Columnas": [{"Id": 3, "TextoPrincipal": "Tenis 1", "HorariosFijos": [{"StrHoraInicio": "11:00"}]}]}
+        }
+
+        def post(url, json):
+            response = Mock()
+            if "idCuadro" not in json:
+                response.json.return_value = self.SPORT_LIST_RESPONSE
+            else:
+                response.json.return_value = tennis_courts if json["idCuadro"] == 5 else self.COURT_LIST_RESPONSE
+            return response
+
+        mock_requests_post.side_effect = post
+
+        filter = MatchFilter(days="0", time_min="10:00", time_max="13:00")
+        result = MatchpointScraper(sites[0], filter).get_site_matches()
+
+        assert [(match.sport, match.court, match.time) for match in result[0].matches] == [
+            ("TeniS", "Tenis 1", "11:00"),
+            ("PádEl", "Court 1", "10:00"),
+            ("PádEl", "Court 1", "12:00"),
+            ("PádEl", "Court 2", "10:30"),
+        ]
+        cached_keys = [call.args[0] for call in mock_cache_set.call_args_list]
+        assert "availability-example.com-5-2024-06-11" in cached_keys
+        assert "availability-example.com-4-2024-06-11" in cached_keys
+
+    @patch("app.integrations.scrapers.scraper_interface.scrape_executor.submit", side_effect=lambda _, fn: fn())
+    @patch("app.integrations.http.requests.Session.post")
+    @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
+    def test_background_refresh_keeps_the_sport_of_the_grid(
+        self, _mock_get_api_key, mock_requests_post, _mock_submit, patch_cache, sites
+    ):
+        _, mock_cache_set = patch_cache
+        mock_cache_set.reset_mock()
+        tennis_courts = {
+            "d": {"Columnas": [{"Id": 3, "TextoPrincipal": "Tenis 1", "HorariosFijos": [{"StrHoraInicio": "11:00"}]}]}
+        }
+        mock_requests_post.return_value.json.side_effect = [self.SPORT_LIST_RESPONSE, tennis_courts]
+
+        scraper = MatchpointScraper(sites[0], MatchFilter(days="0", time_min="10:00", time_max="13:00"))
+        tennis_scraper = scraper._get_sport_scraper(scraper.sport_ids[0])
+        tennis_scraper._refresh_in_background("availability-example.com-5-2024-06-11", "2024-06-11")
+
+        cache_key, data = mock_cache_set.call_args_list[-1].args[:2]
+        assert cache_key == "availability-example.com-5-2024-06-11"
+        assert [match.sport for match in decode_day_grid(data).matches] == ["TeniS"]
+
+
+@patch("app.integrations.scrapers.matchpoint_scraper.cache")
+class TestMatchpointBootstrapCache:
+    SPORTS = [{"Id": 5, "Nombre": "TeniS"}, {"Id": 4, "Nombre": "PádEl"}]
+
+    @fixture
+    def site(self) -> SiteInfo:
+        return SiteInfo(url="example.com", name="Example", type=SiteType.MATCHPOINT)
+
+    @fixture
+    def match_filter(self) -> MatchFilter:
+        return MatchFilter(days="0", time_min="10:00", time_max="13:00", sport="padel")
+
+    @patch("app.integrations.http.requests.Session.post")
+    @patch("app.integrations.http.requests.Session.get")
+    def test_cached_bootstrap_does_no_requests(self, mock_get, mock_post, mock_cache, site, match_filter):
+        cached = {"matchpoint-key-example.com": "c00lk3y==", "matchpoint-sports-example.com": self.SPORTS}
+        mock_cache.get.side_effect = cached.get
+
+        scraper = MatchpointScraper(site, match_filter)
+
+        assert scraper.key == "c00lk3y=="
+        assert scraper.sport_ids == [4]
+        assert scraper.sport_names == {5: "TeniS", 4: "PádEl"}
+        mock_get.assert_not_called()
+        mock_post.assert_not_called()
+
+    @patch.object(MatchpointScraper, "_get_sports", return_value=SPORTS)
+    @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
+    def test_bootstrap_is_cached(self, _mock_get_api_key, _mock_get_sports, mock_cache, site, match_filter):
+        mock_cache.get.return_value = None
+
+        scraper = MatchpointScraper(site, match_filter)
+
+        assert scraper.key == "c00lk3y=="
+        assert scraper.sport_ids == [4]
+        mock_cache.set.assert_any_call("matchpoint-key-example.com", "c00lk3y==", timeout=MATCHPOINT_BOOTSTRAP_TTL)
+        mock_cache.set.assert_any_call("matchpoint-sports-example.com", self.SPORTS, timeout=MATCHPOINT_BOOTSTRAP_TTL)
+
+    @patch.object(MatchpointScraper, "_get_api_key", return_value="")
+    def test_empty_key_is_not_cached(self, _mock_get_api_key, mock_cache, site, match_filter):
+        mock_cache.get.return_value = None
+
+        assert MatchpointScraper(site, match_filter).key == ""
+        mock_cache.set.assert_not_called()
+
+    @freeze_time("2024-06-11")
+    @patch("app.integrations.http.requests.Session.post")
+    @patch.object(MatchpointScraper, "_get_sport_ids", return_value=[4])
+    @patch.object(MatchpointScraper, "_get_api_key", side_effect=["exp1r3d==", "c00lk3y=="])
+    def test_rejected_key_is_renewed(self, _mock_get_api_key, _mock_sport_ids, mock_post, mock_cache, site):
+        mock_cache.get.return_value = None
+        mock_post.return_value.json.side_effect = [
+            {"d": None},
+            TestMatchpointScrapCourtData.COURT_LIST_RESPONSE,
+        ]
+
+        matches = MatchpointScraper(
+            site, MatchFilter(days="0", time_min="10:00", time_max="13:00"), sport_id=4
+        )._get_daily_matches("2024-06-11")
+
+        assert len(matches) == 4
+        assert [call.kwargs["json"]["key"] for call in mock_post.call_args_list] == ["exp1r3d==", "c00lk3y=="]
+        mock_cache.delete.assert_any_call("matchpoint-key-example.com")
+
+    @freeze_time("2024-06-11")
+    @patch("app.integrations.http.requests.Session.post")
+    @patch.object(MatchpointScraper, "_get_sport_ids", return_value=[4])
+    @patch.object(MatchpointScraper, "_get_api_key", return_value="c00lk3y==")
+    def test_grid_without_courts_raises(self, _mock_get_api_key, _mock_sport_ids, mock_post, mock_cache, site):
+        mock_cache.get.return_value = None
+        mock_post.return_value.json.return_value = {"d": None}
+
+        scraper = MatchpointScraper(site, MatchFilter(days="0", time_min="10:00", time_max="13:00"), sport_id=4)
+        with raises(ScrapeError, match="Columns not found"):
+            scraper._get_daily_matches("2024-06-11")
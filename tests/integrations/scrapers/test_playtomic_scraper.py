@@ -1,15 +1,16 @@
 from unittest.mock import Mock, patch
 
 from freezegun import freeze_time
-from pytest import fixture, mark
+from pytest import fixture, mark, raises
 
 from app.integrations.scrapers import PlaytomicScraper
-from app.models import MatchFilter
+from app.integrations.scrapers.scraper_interface import ScrapeError
+from app.models import MatchFilter, SiteInfo, SiteType
 
 
 @freeze_time("2024-06-20")
 @mark.usefixtures("patch_cache")
-@patch("app.integrations.scrapers.scraper_interface.requests.Session.get")
+@patch("app.integrations.http.requests.Session.get")
 class TestPlaytomicScrapCourtData:
     @fixture
     def match_filter(self) -> MatchFilter:
@@ -42,8 +43,9 @@ class TestPlaytomicScrapCourtData:
         assert site.site == playtomic_site
         assert site.date == "2024-06-20"
 
+        # Court 2 slot starts at 16:00 local time, out of the requested time range
         matches = result[0].matches
-        assert len(matches) == 3
+        assert len(matches) == 2
         assert matches[0].sport == "padel"
         assert matches[0].court == "Padel 1"
         assert matches[0].time == "12:00"
@@ -56,14 +58,8 @@ class TestPlaytomicScrapCourtData:
         assert matches[1].url == playtomic_site.url
         assert matches[1].is_available is True
 
-        assert matches[2].sport == "padel"
-        assert matches[2].court == "Padel 2"
-        assert matches[2].time == "16:00"
-        assert matches[2].url == playtomic_site.url
-        assert matches[2].is_available is True
-
     @freeze_time("2024-06-11 12:01")
-    def test_get_site_matches_filters_past_date(self, mock_requests_get, playtomic_site, match_filter):
+    def test_get_site_matches_filters_past_date(self, mock_requests_get, playtomic_site):
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.json.return_value = [
@@ -83,6 +79,7 @@ class TestPlaytomicScrapCourtData:
         ]
         mock_requests_get.return_value = mock_response
 
+        match_filter = MatchFilter(days="0", time_min="13:00", time_max="16:00")
         result = PlaytomicScraper(playtomic_site, match_filter).get_site_matches()
 
         matches = result[0].matches
@@ -90,7 +87,7 @@ class TestPlaytomicScrapCourtData:
         assert len(result) == 1
         assert len(matches) == 1
         assert matches[0].sport == "padel"
-        assert matches[0].court == "Padel 1"
+        assert matches[0].court == "Padel 2"
         assert matches[0].time == "16:00"
 
     def test_get_site_matches_filters_by_duration(self, mock_requests_get, playtomic_site, match_filter):
@@ -143,6 +140,38 @@ class TestPlaytomicScrapCourtData:
         assert matches[0].time == "12:00"
         assert matches[1].time == "13:30"
 
+    def test_get_site_matches_raises_on_error_status(
+        self, mock_requests_get, playtomic_site, match_filter, patch_cache
+    ):
+        _, mock_cache_set = patch_cache
+        mock_cache_set.reset_mock()
+        mock_requests_get.return_value = Mock(status_code=503)
+
+        with raises(ScrapeError, match="status 503"):
+            PlaytomicScraper(playtomic_site, match_filter).get_site_matches()
+
+        assert not [call for call in mock_cache_set.call_args_list if call.args[0].startswith("availability-")]
+
+    def test_get_site_matches_requests_whole_day(self, mock_requests_get, playtomic_site, match_filter):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = []
+        mock_requests_get.return_value = mock_response
+
+        PlaytomicScraper(playtomic_site, match_filter).get_site_matches()
+
+        params = mock_requests_get.call_args.kwargs["params"]
+        assert params["local_start_min"] == "2024-06-20T00:00:00"
+        assert params["local_start_max"] == "2024-06-20T23:59:59"
+
+    def test_get_site_matches_requests_the_tenant_of_the_site_params(self, mock_requests_get, match_filter):
+        mock_requests_get.return_value = Mock(status_code=200, json=Mock(return_value=[]))
+        site = SiteInfo(url="club.com", name="Club", type=SiteType.PLAYTOMIC, scraper_params={"tenant_id": "uuid"})
+
+        PlaytomicScraper(site, match_filter).get_site_matches()
+
+        assert mock_requests_get.call_args.kwargs["params"]["tenant_id"] == "uuid"
+
     def test_get_site_matches_request_time_to_localtime(self, mock_requests_get, playtomic_site, match_filter):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -1,15 +1,19 @@
+from datetime import datetime, timezone
 from unittest.mock import Mock, patch
 
+from bs4 import BeautifulSoup
 from freezegun import freeze_time
-from pytest import fixture, mark
+from pytest import fixture, mark, raises
 
 from app.integrations.scrapers import WebsdepadelScraper
-from app.models import MatchFilter, SiteInfo, SiteType
+from app.integrations.scrapers.grid_codec import decode_day_grid
+from app.integrations.scrapers.scraper_interface import ScrapeError
+from app.models import DayGrid, MatchFilter, MatchInfo, SiteInfo, SiteType
 
 
 @freeze_time("2024-06-11")
 @mark.usefixtures("patch_cache")
-@patch("app.integrations.scrapers.scraper_interface.requests.Session.get")
+@patch("app.integrations.http.requests.Session.get")
 class TestWebsDePadelScrapCourtData:
     HTML_CONTENT = """
     <div id="resumen-disponibilidad">
@@ -182,3 +186,99 @@ class TestWebsDePadelScrapCourtData:
         assert result[0].date == "2024-06-15"
         assert result[1].date == "2024-06-16"
         assert result[2].date == "2024-06-17"
+
+    def test_get_court_data_caches_whole_day(self, mock_requests_get, example_site, patch_cache):
+        """Caches every match of the day, not only the filtered ones."""
+        _, mock_cache_set = patch_cache
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.text = self.HTML_CONTENT
+        mock_requests_get.return_value = mock_response
+
+        match_filter = MatchFilter(sport="tenis", days="0", time_min="10:00", time_max="11:00")
+        result = WebsdepadelScraper(example_site, match_filter).get_site_matches()
+
+        assert len(result[0].matches) == 1
+        cache_key, cached_data = mock_cache_set.call_args.args
+        cached_grid = decode_day_grid(cached_data)
+        assert cache_key == "availability-example.com-2024-06-11"
+        assert len(cached_grid.matches) == 5
+        assert result[0].scraped_at == cached_grid.scraped_at
+
+    def test_get_court_data_filters_cached_day(self, mock_requests_get, example_site):
+        """Serves any filter from the cached day without scraping the site again."""
+        cached_matches = [
+            MatchInfo(sport="Padel", court="Court 1", time="10:00", url="http://example.com/1", is_available=True),
+            MatchInfo(sport="Padel", court="Court 1", time="18:00", url="http://example.com/2", is_available=False),
+            MatchInfo(sport="Tenis", court="Court 2", time="18:30", url="http://example.com/3", is_available=True),
+        ]
+        cached_grid = DayGrid(matches=cached_matches, scraped_at=datetime(2024, 6, 10, 23, 55, tzinfo=timezone.utc))
+        match_filter = MatchFilter(sport="padel", days="0", time_min="17:00", time_max="20:00")
+
+        with (
+            patch("app.cache.cache.get", return_value=cached_grid),
+            patch("app.integrations.scrapers.scraper_interface.scrape_executor.submit") as mock_submit,
+        ):
+            result = WebsdepadelScraper(example_site, match_filter).get_site_matches()
+
+        mock_requests_get.assert_not_called()
+        mock_submit.assert_not_called()
+        assert result[0].matches == [cached_matches[1]]
+        assert result[0].scraped_at == cached_grid.scraped_at
+
+    def test_get_court_data_refreshes_stale_day_in_background(self, mock_requests_get, example_site):
+        """Serves a stale cached day right away and refreshes it in background."""
+        cached_matches = [
+            MatchInfo(sport="Padel", court="Court 1", time="18:00", url="http://example.com/1", is_available=True),
+        ]
+        cached_grid = DayGrid(matches=cached_matches, scraped_at=datetime(2024, 6, 10, 20, 0, tzinfo=timezone.utc))
+        match_filter = MatchFilter(days="0", time_min="17:00", time_max="20:00")
+
+        with (
+            patch("app.cache.cache.get", return_value=cached_grid),
+            patch("app.integrations.scrapers.scraper_interface.scrape_executor.submit") as mock_submit,
+        ):
+            result = WebsdepadelScraper(example_site, match_filter).get_site_matches()
+
+        mock_requests_get.assert_not_called()
+        assert result[0].matches == cached_matches
+        assert mock_submit.call_count == 1
+        assert mock_submit.call_args.args[0] == "example.com"
+
+        mock_requests_get.return_value = Mock(status_code=200, text=self.HTML_CONTENT)
+        host, refresh = mock_submit.call_args.args
+        refresh()
+        mock_requests_get.assert_called_once()
+
+    def test_get_court_data_raises_without_availability(self, mock_requests_get, example_site):
+        mock_requests_get.return_value = Mock(status_code=200, text="<html><body>Mantenimiento</body></html>")
+
+        match_filter = MatchFilter(days="0", time_min="10:00", time_max="13:00")
+        with raises(ScrapeError, match="Availability summary not found"):
+            WebsdepadelScraper(example_site, match_filter).get_site_matches()
+
+    def test_parse_availability_matches_full_page_parse(self, mock_requests_get, example_site):
+        page = f"""
+        <html>
+            <head><title>Partidas</title><script>var partidas = [];</script></head>
+            <body>
+                <ul class="menu"><li class="deporte"><span class="nombre">Menu</span></li></ul>
+                {self.HTML_CONTENT}
+                <footer><li class="pista"><span class="nombre">Footer</span></li></footer>
+            </body>
+        </html>
+        """
+        scraper = WebsdepadelScraper(example_site, MatchFilter(days="0", time_min="10:00", time_max="13:00"))
+
+        full_availability = BeautifulSoup(page, "html.parser").find("div", id="resumen-disponibilidad")
+        availability = scraper._parse_availability(page)
+
+        assert str(availability) == str(full_availability)
+        assert scraper._get_availability_matches(availability) == scraper._get_availability_matches(
+            full_availability  # type: ignore[arg-type]
+        )
+        assert len(scraper._get_availability_matches(availability)) == 5
+        assert scraper._parse_availability("<html><body>Sin partidas</body></html>") is None
+
+        quoted_page = page.replace("<head>", """<head><script>var id = '<b id="resumen-disponibilidad">';</script>""")
+        assert str(scraper._parse_availability(quoted_page)) == str(full_availability)
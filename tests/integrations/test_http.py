@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from app.integrations.http import http_adapter, new_session
+from app.settings import SCRAPER_HTTP_TIMEOUT
+
+
+def test_sessions_share_the_connection_pools():
+    first_session, second_session = new_session(), new_session()
+
+    assert first_session.get_adapter("https://playtomic.io") is http_adapter
+    assert second_session.get_adapter("http://ialesport.com") is http_adapter
+    assert first_session.headers is not second_session.headers
+
+
+def test_closing_a_session_keeps_the_connection_pools():
+    pool = http_adapter.poolmanager.connection_from_url("https://playtomic.io")
+
+    new_session().close()
+
+    assert http_adapter.poolmanager.connection_from_url("https://playtomic.io") is pool
+
+
+@patch.object(HTTPAdapter, "send")
+def test_requests_get_a_default_timeout(mock_send):
+    mock_send.return_value = Response()
+    mock_send.return_value.status_code = 200
+    session = new_session()
+
+    session.get("https://playtomic.io")
+    session.get("https://playtomic.io", timeout=1)
+
+    assert [call.kwargs["timeout"] for call in mock_send.call_args_list] == [SCRAPER_HTTP_TIMEOUT, 1]
@@ -1,12 +1,39 @@
+import asyncio
+import gc
+from datetime import datetime, timezone
+from threading import Event
 from unittest.mock import patch
 
-from pytest import fixture
+from pytest import fixture, mark
 
-from app.integrations.scrapers import PlaytomicScraper, WebsdepadelScraper
-from app.models import MatchFilter, MatchInfo, SiteInfo, SiteMatches, SiteType
-from app.services.availability import get_court_data
+from app.cache import cache
+from app.circuitbreaker import CircuitOpenError
+from app.integrations.scrapers import (
+    MatchpointScraper,
+    PlaytomicScraper,
+    WebsdepadelScraper,
+)
+from app.integrations.scrapers.grid_codec import encode_day_grid
+from app.models import (
+    CourtAvailabilityResponse,
+    DayGrid,
+    GeolocationFilter,
+    MatchFilter,
+    MatchInfo,
+    SiteInfo,
+    SiteMatches,
+    SiteType,
+)
+from app.services.availability import (
+    get_court_data,
+    get_court_data_async,
+    prefetch_cached_data,
+    stream_court_data,
+)
+from app.services.common import get_weekly_dates
 
 
+@mark.usefixtures("app")
 class TestGetCourtData:
     @fixture
     def sites(self):
@@ -16,14 +43,27 @@ class TestGetCourtData:
             SiteInfo(url="test.com", name="Test", type=SiteType.PLAYTOMIC),
         ]
 
-    @patch.object(PlaytomicScraper, "get_site_matches", return_value=[])
-    @patch.object(WebsdepadelScraper, "get_site_matches", return_value=[])
+    @patch.object(PlaytomicScraper, "get_date_matches")
+    @patch.object(WebsdepadelScraper, "get_date_matches")
     def test_get_court_data_calls(self, mock_scrap_websdepadel_court_data, mock_scrap_playtomic_court_data, sites):
+        mock_scrap_websdepadel_court_data.return_value = SiteMatches(site=sites[0], date="2024-06-11", matches=[])
+        mock_scrap_playtomic_court_data.return_value = SiteMatches(site=sites[2], date="2024-06-11", matches=[])
         get_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), sites)
         assert mock_scrap_websdepadel_court_data.call_count == 2
         assert mock_scrap_playtomic_court_data.call_count == 1
 
-    @patch.object(WebsdepadelScraper, "get_site_matches")
+    @patch.object(PlaytomicScraper, "get_date_matches")
+    @patch.object(WebsdepadelScraper, "get_date_matches")
+    def test_get_court_data_calls_once_per_site_and_date(
+        self, mock_scrap_websdepadel_court_data, mock_scrap_playtomic_court_data, sites
+    ):
+        mock_scrap_websdepadel_court_data.return_value = SiteMatches(site=sites[0], date="2024-06-11", matches=[])
+        mock_scrap_playtomic_court_data.return_value = SiteMatches(site=sites[2], date="2024-06-11", matches=[])
+        get_court_data(MatchFilter(days="012", time_min="10:00", time_max="13:00"), sites)
+        assert mock_scrap_websdepadel_court_data.call_count == 6
+        assert mock_scrap_playtomic_court_data.call_count == 3
+
+    @patch.object(WebsdepadelScraper, "get_date_matches")
     def test_get_court_data_sorts(self, mock_scrap_websdepadel_court_data, sites):
         """Sorts the matches by date and time."""
         match1 = MatchInfo(
@@ -59,8 +99,8 @@ class TestGetCourtData:
             SiteMatches(site=sites[0], date="2024-06-12", distance_km=0.0, matches=[match1, match3]),
         ]
 
-        mock_scrap_websdepadel_court_data.return_value = site_matches
-        response = get_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), [sites[0]])
+        mock_scrap_websdepadel_court_data.side_effect = site_matches
+        response = get_court_data(MatchFilter(days="01", time_min="10:00", time_max="13:00"), [sites[0]]).site_matches
         site_match1, site_match2 = response
         day1_matches, day2_matches = site_match1.matches, site_match2.matches
 
@@ -71,3 +111,212 @@ class TestGetCourtData:
         assert day1_matches[1].court == "Court 4"
         assert day2_matches[0].court == "Court 1"
         assert day2_matches[1].court == "Court 3"
+
+    @patch.object(WebsdepadelScraper, "get_date_matches", autospec=True)
+    def test_get_court_data_sorts_by_date_and_distance(self, mock_scrap_websdepadel_court_data):
+        match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://a.com", is_available=True)
+        far_site = SiteInfo(url="far.com", name="Far", type=SiteType.WEBSDEPADEL, coordinates=(39.6, -0.4))
+        near_site = SiteInfo(url="near.com", name="Near", type=SiteType.WEBSDEPADEL, coordinates=(39.47, -0.38))
+        geolocation_filter = GeolocationFilter(latitude=39.469908, longitude=-0.376288, radius_km=100)
+        mock_scrap_websdepadel_court_data.side_effect = lambda scraper, date: SiteMatches(
+            site=scraper.site, date=date, matches=[match]
+        )
+
+        response = get_court_data(
+            MatchFilter(days="01", time_min="10:00", time_max="13:00"), [far_site, near_site], geolocation_filter
+        ).site_matches
+
+        assert [(site_match.date, site_match.site.url) for site_match in response] == [
+            (response[0].date, "near.com"),
+            (response[0].date, "far.com"),
+            (response[2].date, "near.com"),
+            (response[2].date, "far.com"),
+        ]
+        assert response[0].date < response[2].date
+
+    @patch.object(WebsdepadelScraper, "get_date_matches", autospec=True)
+    def test_get_court_data_uses_given_site_distances(self, mock_scrap_websdepadel_court_data, sites):
+        match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://a.com", is_available=True)
+        geolocation_filter = GeolocationFilter(latitude=39.469908, longitude=-0.376288, radius_km=100)
+        mock_scrap_websdepadel_court_data.side_effect = lambda scraper, date: SiteMatches(
+            site=scraper.site, date=date, matches=[match]
+        )
+
+        response = get_court_data(
+            MatchFilter(days="0", time_min="10:00", time_max="13:00"),
+            sites[:2],
+            geolocation_filter,
+            site_distances={"example.com": 12.5},
+        ).site_matches
+
+        assert [(site_match.site.url, site_match.distance_km) for site_match in response] == [
+            ("example2.com", 0),
+            ("example.com", 12.5),
+        ]
+
+    @patch.object(PlaytomicScraper, "get_date_matches", side_effect=ValueError("Unexpected response"))
+    @patch.object(WebsdepadelScraper, "get_date_matches")
+    def test_get_court_data_reports_failed_sites(
+        self, mock_scrap_websdepadel_court_data, _mock_scrap_playtomic_court_data, sites
+    ):
+        match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://a.com", is_available=True)
+        mock_scrap_websdepadel_court_data.return_value = SiteMatches(site=sites[0], date="2024-06-11", matches=[match])
+
+        response = get_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), sites)
+
+        assert len(response.site_matches) == 2
+        assert response.failed_sites == ["test.com"]
+        assert response.timed_out_sites == []
+
+    @mark.usefixtures("local_socketpair")
+    @patch.object(PlaytomicScraper, "get_date_matches", side_effect=ValueError("Unexpected response"))
+    @patch.object(WebsdepadelScraper, "get_date_matches")
+    def test_get_court_data_async_retrieves_the_failures(
+        self, mock_scrap_websdepadel_court_data, _mock_scrap_playtomic_court_data, sites, caplog
+    ):
+        mock_scrap_websdepadel_court_data.return_value = SiteMatches(site=sites[0], date="2024-06-11", matches=[])
+
+        response = asyncio.run(get_court_data_async(MatchFilter(days="0", time_min="10:00", time_max="13:00"), sites))
+        gc.collect()
+
+        assert response.failed_sites == ["test.com"]
+        assert "never retrieved" not in caplog.text
+
+    @patch.object(PlaytomicScraper, "get_date_matches", side_effect=CircuitOpenError("test.com"))
+    @patch.object(WebsdepadelScraper, "get_date_matches")
+    def test_get_court_data_reports_unavailable_sites(
+        self, mock_scrap_websdepadel_court_data, _mock_scrap_playtomic_court_data, sites
+    ):
+        match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://a.com", is_available=True)
+        mock_scrap_websdepadel_court_data.side_effect = lambda date: SiteMatches(
+            site=sites[0], date=date, matches=[match], unavailable=True
+        )
+
+        response = get_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), sites)
+
+        assert len(response.site_matches) == 2
+        assert response.unavailable_sites == ["example.com", "example2.com", "test.com"]
+        assert response.failed_sites == []
+
+    @patch.object(PlaytomicScraper, "get_date_matches")
+    @patch.object(WebsdepadelScraper, "get_date_matches")
+    def test_get_court_data_returns_partial_results_on_timeout(
+        self, mock_scrap_websdepadel_court_data, mock_scrap_playtomic_court_data, sites
+    ):
+        match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://a.com", is_available=True)
+        slow_site_released = Event()
+        mock_scrap_websdepadel_court_data.return_value = SiteMatches(site=sites[0], date="2024-06-11", matches=[match])
+        mock_scrap_playtomic_court_data.side_effect = lambda date: slow_site_released.wait(1)
+
+        response = get_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), sites, timeout=0.1)
+        slow_site_released.set()
+
+        assert len(response.site_matches) == 2
+        assert response.timed_out_sites == ["test.com"]
+        assert response.failed_sites == []
+
+
+@mark.usefixtures("app")
+class TestPrefetchCachedData:
+    MATCH = MatchInfo(sport="Padel", court="Court 1", time="23:30", url="http://a.com", is_available=True)
+
+    def cache_grid(self, key):
+        grid = DayGrid(matches=[self.MATCH], scraped_at=datetime.now(timezone.utc))
+        cache.set(key, encode_day_grid(grid))
+
+    def test_warm_request_reads_the_cache_once(self, example_site):
+        match_filter = MatchFilter(days="12", time_min="21:00", time_max="23:59")
+        dates = get_weekly_dates(match_filter)
+        for date in dates:
+            self.cache_grid(f"availability-{example_site.url}-{date}")
+
+        with (
+            patch("app.services.availability.cache.get_many", wraps=cache.get_many) as mock_get_many,
+            patch("app.services.availability.scrape_executor.submit") as mock_submit,
+            patch.object(cache, "get") as mock_get,
+        ):
+            response = get_court_data(match_filter, [example_site])
+
+        assert mock_get_many.call_count == 1
+        mock_get.assert_not_called()
+        mock_submit.assert_not_called()
+        assert [site_match.date for site_match in response.site_matches] == dates
+        assert response.site_matches[1].matches == [self.MATCH]
+
+    def test_misses_are_scraped(self, example_site):
+        match_filter = MatchFilter(days="12", time_min="21:00", time_max="23:59")
+        tomorrow, day_after_tomorrow = get_weekly_dates(match_filter)
+        self.cache_grid(f"availability-{example_site.url}-{day_after_tomorrow}")
+
+        with patch.object(WebsdepadelScraper, "_get_daily_matches", return_value=[self.MATCH]) as mock_scrape:
+            response = get_court_data(match_filter, [example_site])
+
+        mock_scrape.assert_called_once_with(tomorrow)
+        assert [site_match.date for site_match in response.site_matches] == [tomorrow, day_after_tomorrow]
+
+    def test_matchpoint_grids_are_read_after_the_sports(self):
+        site = SiteInfo(url="matchpoint.com", name="Matchpoint", type=SiteType.MATCHPOINT)
+        match_filter = MatchFilter(days="1", time_min="21:00", time_max="23:59")
+        (date,) = get_weekly_dates(match_filter)
+        cache.set(f"matchpoint-sports-{site.url}", [{"Id": 4, "Nombre": "Pádel"}, {"Id": 5, "Nombre": "Tenis"}])
+        self.cache_grid(f"availability-{site.url}-4-{date}")
+        self.cache_grid(f"availability-{site.url}-5-{date}")
+        scraper = MatchpointScraper(site, match_filter)
+
+        with patch("app.services.availability.cache.get_many", wraps=cache.get_many) as mock_get_many:
+            prefetch_cached_data([(scraper, date)])
+
+        assert [call.args for call in mock_get_many.call_args_list] == [
+            (f"matchpoint-sports-{site.url}",),
+            (f"availability-{site.url}-4-{date}", f"availability-{site.url}-5-{date}"),
+        ]
+        assert scraper.has_prefetched_grids(date)
+        assert len(scraper.get_date_matches(date).matches) == 2
+
+
+@mark.usefixtures("app")
+class TestStreamCourtData:
+    @patch.object(PlaytomicScraper, "get_date_matches")
+    @patch.object(WebsdepadelScraper, "get_date_matches")
+    def test_yields_sites_as_they_finish(self, mock_scrap_websdepadel_court_data, mock_scrap_playtomic_court_data):
+        fast_site = SiteInfo(url="fast.com", name="Fast", type=SiteType.WEBSDEPADEL)
+        slow_site = SiteInfo(url="slow.com", name="Slow", type=SiteType.PLAYTOMIC)
+        match = MatchInfo(sport="padel", court="Court 1", time="10:00", url="http://a.com", is_available=True)
+        fast_site_sent = Event()
+        mock_scrap_websdepadel_court_data.side_effect = lambda date: SiteMatches(
+            site=fast_site, date=date, matches=[match]
+        )
+
+        def slow_scrape(date):
+            fast_site_sent.wait(1)
+            return SiteMatches(site=slow_site, date=date, matches=[match])
+
+        mock_scrap_playtomic_court_data.side_effect = slow_scrape
+
+        items = stream_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), [slow_site, fast_site])
+        first = next(items)
+        fast_site_sent.set()
+        rest = list(items)
+
+        assert first.site.url == "fast.com"
+        assert rest[0].site.url == "slow.com"
+        assert rest[1] == CourtAvailabilityResponse(site_matches=[])
+
+    @patch.object(PlaytomicScraper, "get_date_matches")
+    @patch.object(WebsdepadelScraper, "get_date_matches", side_effect=ValueError("Unexpected response"))
+    def test_summary_lists_timed_out_and_failed_sites(
+        self, _mock_scrap_websdepadel_court_data, mock_scrap_playtomic_court_data
+    ):
+        sites = [
+            SiteInfo(url="broken.com", name="Broken", type=SiteType.WEBSDEPADEL),
+            SiteInfo(url="slow.com", name="Slow", type=SiteType.PLAYTOMIC),
+        ]
+        slow_site_released = Event()
+        mock_scrap_playtomic_court_data.side_effect = lambda date: slow_site_released.wait(1)
+
+        items = list(stream_court_data(MatchFilter(days="0", time_min="10:00", time_max="13:00"), sites, timeout=0.1))
+        slow_site_released.set()
+
+        assert items == [
+            CourtAvailabilityResponse(site_matches=[], timed_out_sites=["slow.com"], failed_sites=["broken.com"])
+        ]
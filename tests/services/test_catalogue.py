@@ -0,0 +1,90 @@
+import sqlite3
+from contextlib import closing
+
+from pytest import fixture
+
+from app.models import SiteInfo, SiteType
+from app.services.catalogue import SEED_LAST_UPDATE, SiteCatalogue, init_catalogue
+from app.services.site_index import SiteIndex
+
+
+@fixture
+def seed() -> list[SiteInfo]:
+    return [
+        SiteInfo(url="example.com", name="Example", type=SiteType.WEBSDEPADEL, coordinates=(39.47, -0.38)),
+        SiteInfo(
+            url="test.com",
+            name="Test",
+            type=SiteType.MATCHPOINT,
+            coordinates=(39.48, -0.38),
+            scraper_params={"sport_ids": "4"},
+        ),
+    ]
+
+
+@fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "sites.db")
+
+
+def execute(path: str, query: str, *params) -> list[tuple]:
+    with closing(sqlite3.connect(path)) as connection, connection:
+        return connection.execute(query, params).fetchall()
+
+
+def test_catalogue_serves_seed_without_file(path, seed):
+    index = SiteIndex()
+    catalogue = SiteCatalogue(path, seed, index)
+
+    assert catalogue.sites == seed
+    assert catalogue.get("test.com") == seed[1]
+    assert catalogue.get("unknown.com") is None
+    assert catalogue.last_update == SEED_LAST_UPDATE
+    assert len(index) == 2
+
+
+def test_catalogue_loads_sites_from_file(path, seed):
+    init_catalogue(path, seed)
+    catalogue = SiteCatalogue(path, [], SiteIndex())
+
+    assert catalogue.sites == seed
+    assert catalogue.get("test.com").scraper_params == {"sport_ids": "4"}  # type: ignore[union-attr]
+    assert catalogue.last_update != SEED_LAST_UPDATE
+
+
+def test_catalogue_reloads_when_file_changes(path, seed):
+    init_catalogue(path, seed)
+    index = SiteIndex()
+    catalogue = SiteCatalogue(path, [], index, reload_interval=0)
+
+    execute(path, "UPDATE sites SET enabled = 0 WHERE url = ?", "example.com")
+    execute(path, "INSERT INTO sites (url, name, type) VALUES (?, ?, ?)", "new.com", "New", "websdepadel")
+
+    assert [site.url for site in catalogue.sites] == ["test.com", "new.com"]
+    assert [site.url for site, _ in index.query(39.47, -0.38, 10)] == ["test.com"]
+
+
+def test_catalogue_does_not_reload_on_health_updates(path, seed):
+    init_catalogue(path, seed)
+    catalogue = SiteCatalogue(path, [], SiteIndex(), reload_interval=0)
+
+    catalogue.record_scrape_result("example.com", success=False)
+    catalogue.record_scrape_result("example.com", success=False)
+    catalogue.record_scrape_result("test.com", success=True)
+
+    assert catalogue.reload_if_changed() is False
+    assert execute(path, "SELECT url, consecutive_failures, last_success_at IS NOT NULL FROM sites") == [
+        ("example.com", 2, 0),
+        ("test.com", 0, 1),
+    ]
+
+
+def test_init_catalogue_keeps_health_of_existing_sites(path, seed):
+    init_catalogue(path, seed)
+    execute(path, "UPDATE sites SET consecutive_failures = 3 WHERE url = ?", "example.com")
+
+    init_catalogue(path, [seed[0].model_copy(update={"name": "Renamed"})])
+
+    assert execute(path, "SELECT name, consecutive_failures FROM sites WHERE url = ?", "example.com") == [
+        ("Renamed", 3)
+    ]
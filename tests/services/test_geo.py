@@ -0,0 +1,39 @@
+import pytest
+
+from app.services.geo import (
+    geohash_bounds,
+    geohash_center,
+    geohash_encode,
+    haversine_km,
+    haversine_km_each,
+)
+
+
+def test_geohash_encode():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash_encode(39.469908, -0.376288, 5) == "ezp8x"
+
+
+def test_geohash_bounds_contain_the_point():
+    (south, west), (north, east) = geohash_bounds(geohash_encode(39.469908, -0.376288, 5))
+    assert south <= 39.469908 <= north
+    assert west <= -0.376288 <= east
+
+
+def test_geohash_center():
+    latitude, longitude = geohash_center("ezp8x")
+    assert geohash_encode(latitude, longitude, 5) == "ezp8x"
+    assert latitude == pytest.approx(39.4849, abs=1e-3)
+    assert longitude == pytest.approx(-0.3735, abs=1e-3)
+
+
+def test_haversine_km_each_matches_single_distances():
+    origin = (39.469908, -0.376288)
+    destinations = [(39.469908, -0.376288), (39.5082456, -0.3612918), (37.9264372, -1.1721104)]
+
+    distances = haversine_km_each(origin, destinations)
+
+    assert distances[0] == 0
+    assert distances[1] == pytest.approx(4.45, abs=1e-2)
+    assert distances == [haversine_km(origin, destination) for destination in destinations]
+    assert haversine_km_each(origin, []) == []
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from freezegun import freeze_time
+from pytest import fixture
+
+from app.models import SiteInfo, SiteType
+from app.services.prewarm import (
+    get_cycle_interval,
+    get_most_queried_hours,
+    get_prewarm_units,
+    queried_hours,
+    run_prewarm_cycle,
+)
+from app.settings import PREWARM_DEFAULT_HOURS
+
+
+@fixture
+def sites() -> list[SiteInfo]:
+    return [
+        SiteInfo(url="example.com", name="Example", type=SiteType.WEBSDEPADEL),
+        SiteInfo(url="test.com", name="Test", type=SiteType.MATCHPOINT),
+    ]
+
+
+@patch.object(queried_hours, "flush_interval", float("inf"))
+def test_get_most_queried_hours_ranks_recorded_hours(app):
+    for now in ["2024-06-10 18:00", "2024-06-11 19:30", "2024-06-11 19:00", "2024-06-11 10:15", "2024-06-11 19:45"]:
+        with freeze_time(now):
+            queried_hours.record()
+    with freeze_time("2024-06-11 18:10"):
+        queried_hours.record()
+        queried_hours.flush()
+
+        assert get_most_queried_hours(limit=2) == [19, 18]
+        assert get_most_queried_hours(limit=5) == [19, 18, 10]
+
+
+def test_get_most_queried_hours_forgets_old_traffic(app):
+    with freeze_time("2024-06-01 10:00"):
+        queried_hours.record()
+        queried_hours.flush()
+
+    with freeze_time("2024-06-11 12:00"):
+        assert get_most_queried_hours(limit=2) == PREWARM_DEFAULT_HOURS[:2]
+
+
+def test_queried_hours_are_written_in_batches(app):
+    with (
+        patch.object(queried_hours, "flush_interval", 60),
+        patch("app.services.prewarm.cache.cache.inc") as mock_inc,
+        freeze_time("2024-06-11 19:00") as frozen_time,
+    ):
+        queried_hours.flush()
+        queried_hours.record()
+        queried_hours.record()
+        mock_inc.assert_not_called()
+
+        frozen_time.tick(61)
+        queried_hours.record()
+
+    mock_inc.assert_called_once_with("prewarm-queried-hour-2024-06-11-19", 3)
+
+
+def test_get_most_queried_hours_defaults_without_stats(app):
+    assert get_most_queried_hours(limit=2) == PREWARM_DEFAULT_HOURS[:2]
+
+
+@freeze_time("2024-06-11 19:00")
+def test_get_prewarm_units_orders_by_date(sites):
+    units = get_prewarm_units(sites, days=2)
+
+    assert [(site.url, date) for site, date in units] == [
+        ("example.com", "2024-06-11"),
+        ("test.com", "2024-06-11"),
+        ("example.com", "2024-06-12"),
+        ("test.com", "2024-06-12"),
+    ]
+
+
+@freeze_time("2024-06-11 19:30")
+@patch("app.services.prewarm.get_most_queried_hours", return_value=[19, 20])
+def test_get_cycle_interval_is_shorter_on_most_queried_hours(_):
+    assert get_cycle_interval(600) == 600
+
+    with freeze_time("2024-06-11 08:00"):
+        assert get_cycle_interval(600) == 1200
+
+
+@freeze_time("2024-06-11 18:00")
+@patch("app.services.prewarm.time.sleep")
+@patch("app.services.prewarm.refresh_date_matches")
+@patch("app.services.prewarm.get_most_queried_hours", return_value=[18])
+def test_run_prewarm_cycle_spreads_units_over_interval(_, mock_refresh_date_matches, mock_sleep, sites):
+    mock_refresh_date_matches.side_effect = [None, ValueError("Site down"), None, None]
+    with patch("app.services.prewarm.get_prewarm_sites", return_value=sites):
+        run_prewarm_cycle(days=2, interval=60)
+
+    assert mock_refresh_date_matches.call_count == 4
+    assert mock_sleep.call_count == 4
+    assert all(0 < call.args[0] <= 15 for call in mock_sleep.call_args_list)
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+from geopy.distance import great_circle
+
+from app.models import SiteInfo, SiteType
+from app.services.site_index import SiteIndex
+
+
+def make_site(url: str, coordinates: tuple[float, float] | None) -> SiteInfo:
+    return SiteInfo(url=url, name=url, type=SiteType.PLAYTOMIC, coordinates=coordinates)
+
+
+def test_query_returns_sites_in_radius_in_insertion_order():
+    index = SiteIndex()
+    index.insert_many(
+        [
+            make_site("far.com", (39.9, -0.376288)),
+            make_site("near.com", (39.47, -0.38)),
+            make_site("middle.com", (39.6, -0.376288)),
+        ]
+    )
+
+    results = index.query(39.469908, -0.376288, 20)
+
+    assert [site.url for site, _ in results] == ["near.com", "middle.com"]
+    assert results[1][1] == pytest.approx(great_circle((39.469908, -0.376288), (39.6, -0.376288)).km)
+
+
+def test_insert_ignores_sites_without_coordinates():
+    index = SiteIndex()
+    index.insert(make_site("unknown.com", None))
+    assert len(index) == 0
+
+
+def test_insert_updates_existing_site():
+    index = SiteIndex()
+    index.insert(make_site("moved.com", (39.47, -0.38)))
+    index.insert(make_site("moved.com", (40.41, -3.70)))
+
+    assert len(index) == 1
+    assert index.query(39.469908, -0.376288, 50) == []
+    assert [site.url for site, _ in index.query(40.416775, -3.703790, 50)] == ["moved.com"]
+
+
+def test_remove_site():
+    index = SiteIndex()
+    index.insert_many([make_site("near.com", (39.47, -0.38)), make_site("other.com", (39.48, -0.38))])
+
+    index.remove("near.com")
+    index.remove("unknown.com")
+
+    assert len(index) == 1
+    assert [site.url for site, _ in index.query(39.469908, -0.376288, 20)] == ["other.com"]
+
+
+def test_query_matches_brute_force():
+    generator = random.Random(23)
+    sites = [
+        make_site(f"site{i}.com", (generator.uniform(36.0, 43.5), generator.uniform(-9.0, 3.0))) for i in range(2000)
+    ]
+    index = SiteIndex()
+    index.insert_many(sites)
+
+    for _ in range(20):
+        center = (generator.uniform(37.0, 42.0), generator.uniform(-7.0, 2.0))
+        radius_km = generator.choice([1, 10, 25, 100, 300])
+        expected = [site.url for site in sites if great_circle(center, site.coordinates).km <= radius_km]
+        assert [site.url for site, _ in index.query(*center, radius_km)] == expected
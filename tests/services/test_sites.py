@@ -1,8 +1,10 @@
 from app.models import GeolocationFilter
+from app.services import sites as sites_module
 from app.services.sites import (
     SUPPORTED_SITES,
     find_site_by_url_or_unknown,
     get_available_sites,
+    get_sites_in_radius,
 )
 
 
@@ -36,3 +38,31 @@ def test_get_available_sites_filter_by_geolocation(mocker):
     geolocation_filter = GeolocationFilter(latitude=39.5082456, longitude=-0.3612918, radius_km=10)
     response = get_available_sites(geolocation_filter)
     assert len(response.sites) == 8
+
+
+def test_get_available_sites_lists_only_the_tenants_of_the_lookup(mocker, app):
+    tenant = {"tenant_name": "Tenant", "tenant_id": "1", "address": {"coordinate": {"lat": "39.47", "lon": "-0.38"}}}
+    mock_get = mocker.patch("app.services.sites.http_session.get")
+    mock_get.return_value.json.side_effect = [[tenant], []]
+
+    sites = get_available_sites(GeolocationFilter(latitude=39.469908, longitude=-0.376288, radius_km=10)).sites
+    assert "https://playtomic.io/tenant/1" in [site.url for site in sites]
+
+    # Another radius class is another lookup, the tenants of the first one are not listed
+    sites = get_available_sites(GeolocationFilter(latitude=39.469908, longitude=-0.376288, radius_km=1)).sites
+    assert mock_get.call_count == 2
+    assert "https://playtomic.io/tenant/1" not in [site.url for site in sites]
+
+
+def test_get_sites_in_radius_computes_the_tenant_distances_once(mocker, app):
+    tenant = {"tenant_name": "Tenant", "tenant_id": "1", "address": {"coordinate": {"lat": "39.47", "lon": "-0.38"}}}
+    mocker.patch("app.services.sites.http_session.get").return_value.json.return_value = [tenant]
+    spy = mocker.spy(sites_module, "compute_site_distances")
+
+    sites_in_radius = get_sites_in_radius(GeolocationFilter(latitude=39.469908, longitude=-0.376288, radius_km=10))
+
+    spy.assert_called_once()
+    distance_km = dict((site.url, distance_km) for site, distance_km in sites_in_radius)[
+        "https://playtomic.io/tenant/1"
+    ]
+    assert distance_km == spy.spy_return["https://playtomic.io/tenant/1"]
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.api.routes import api
+from app.asgi import ASGIApp, AsyncStreamingResponse
+from app.integrations.scrapers import WebsdepadelScraper
+from app.models import MatchInfo
+
+MATCH = MatchInfo(sport="padel", court="Court 1", time="23:30", url="http://a.com", is_available=True)
+
+
+@pytest.fixture
+def asgi_app(mocker, app, local_socketpair):
+    mocker.patch("app.services.sites.get_playtomic_sites", return_value=[])
+    return ASGIApp(app, api)
+
+
+def call(asgi_app, scope: dict) -> list[dict]:
+    messages: list[dict] = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # Once the request is read, like a server while the client stays connected
+        if not requests:
+            await asyncio.Event().wait()
+        return requests.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages
+
+
+def get(asgi_app, path: str, query_string: str = "", headers: dict | None = None) -> tuple[int, dict, bytes]:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    start, *body = call(asgi_app, scope)
+    assert all(message["type"] == "http.response.body" for message in body)
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return start["status"], headers, b"".join(message.get("body", b"") for message in body)
+
+
+@patch.object(WebsdepadelScraper, "_get_daily_matches", return_value=[MATCH])
+def test_availability_matches_the_wsgi_endpoint(_mock_get_daily_matches, asgi_app, client, example_site):
+    query_string = "days=1&time_min=21:00&time_max=23:59"
+
+    status, headers, body = get(asgi_app, "/api/availability/", query_string, {"X-SITE": example_site.url})
+
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    site_matches = json.loads(body)
+    assert site_matches[0]["matches"] == [MATCH.model_dump()]
+    assert site_matches == client.get(f"/api/availability/?{query_string}", headers={"X-SITE": example_site.url}).json
+
+
+@patch.object(WebsdepadelScraper, "_get_daily_matches", return_value=[MATCH])
+def test_stream_is_sent_in_chunks(_mock_get_daily_matches, asgi_app, example_site):
+    status, headers, body = get(
+        asgi_app, "/api/availability/stream", "days=12&time_min=21:00&time_max=23:59", {"X-SITE": example_site.url}
+    )
+
+    assert status == 200
+    assert headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in body.decode().splitlines()]
+    assert [event["event"] for event in events] == ["site_matches", "site_matches", "summary"]
+    assert events[-1]["data"]["failed_sites"] == []
+
+
+def test_stream_is_closed_when_the_client_goes_away(asgi_app):
+    messages: list[dict] = []
+    closed = []
+
+    async def stream():
+        try:
+            yield "first\n"
+            await asyncio.Event().wait()
+            yield "never sent\n"
+        finally:
+            closed.append(True)
+
+    async def run():
+        first_chunk_sent = asyncio.Event()
+
+        async def receive():
+            await first_chunk_sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if message.get("body"):
+                first_chunk_sent.set()
+
+        await asgi_app._send_response(AsyncStreamingResponse(stream()), receive, send)
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert [message.get("body") for message in messages] == [None, b"first\n"]
+    assert closed == [True]
+
+
+def test_async_views_use_the_error_handlers(asgi_app):
+    status, _, body = get(asgi_app, "/api/availability/", headers={"X-GEOLOCATION": "39.4"})
+
+    assert status == 400
+    assert json.loads(body)["error"] == "value_error"
+
+
+def test_sites(asgi_app, client):
+    status, _, body = get(asgi_app, "/api/sites/")
+
+    assert status == 200
+    assert json.loads(body) == client.get("/api/sites/").json
+
+
+def test_sites_answer_not_modified(asgi_app, client):
+    _, headers, _ = get(asgi_app, "/api/sites/")
+
+    status, _, body = get(asgi_app, "/api/sites/", headers={"If-None-Match": headers["etag"]})
+
+    assert status == 304
+    assert body == b""
+    assert headers["etag"] == client.get("/api/sites/").headers["ETag"]
+
+
+def test_other_endpoints_are_served_by_the_wsgi_app(asgi_app):
+    status, headers, body = get(asgi_app, "/metrics")
+
+    assert status == 200
+    assert headers["content-type"].startswith("text/plain")
+    assert b"padel_api_request_duration_seconds" in body
+
+
+def test_lifespan(asgi_app):
+    messages = []
+    events = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+
+    async def receive():
+        return events.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app({"type": "lifespan"}, receive, send))
+
+    assert messages == [{"type": "lifespan.startup.complete"}, {"type": "lifespan.shutdown.complete"}]
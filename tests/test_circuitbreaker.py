@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.circuitbreaker import CircuitBreaker, CircuitOpenError
+from app.integrations.scrapers import WebsdepadelScraper
+from app.models import DayGrid, MatchFilter, MatchInfo
+
+
+@pytest.fixture
+def circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(failure_threshold=2, slow_call_duration=1, cooldown=60, window=300)
+
+
+def fail():
+    raise ConnectionError("Site down")
+
+
+def fail_calls(circuit_breaker, count):
+    for _ in range(count):
+        with pytest.raises(ConnectionError):
+            circuit_breaker.call("example.com", fail)
+
+
+def test_opens_after_repeated_failures(app, circuit_breaker):
+    fail_calls(circuit_breaker, 1)
+    assert not circuit_breaker.is_open("example.com")
+
+    fail_calls(circuit_breaker, 1)
+    assert circuit_breaker.is_open("example.com")
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.call("example.com", lambda: "matches")
+    assert circuit_breaker.call("other.com", lambda: "matches") == "matches"
+
+
+def test_success_resets_the_failures(app, circuit_breaker):
+    fail_calls(circuit_breaker, 1)
+    circuit_breaker.call("example.com", lambda: "matches")
+    fail_calls(circuit_breaker, 1)
+
+    assert not circuit_breaker.is_open("example.com")
+
+
+def test_slow_calls_count_as_failures(app, circuit_breaker):
+    with patch("app.circuitbreaker.time.monotonic", side_effect=[0, 5, 10, 15]):
+        assert circuit_breaker.call("example.com", lambda: "matches") == "matches"
+        assert circuit_breaker.call("example.com", lambda: "matches") == "matches"
+
+    assert circuit_breaker.is_open("example.com")
+
+
+def test_probes_once_after_the_cooldown(app, circuit_breaker):
+    fail_calls(circuit_breaker, 2)
+    opened_at = circuit_breaker._get_state("example.com")["opened_at"]
+
+    with patch("app.circuitbreaker.time.time", return_value=opened_at + 61):
+        assert not circuit_breaker.is_open("example.com")
+        # The failed probe opens the circuit again and the rest of the callers are rejected meanwhile
+        fail_calls(circuit_breaker, 1)
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.call("example.com", lambda: "matches")
+
+    with patch("app.circuitbreaker.time.time", return_value=opened_at + 200):
+        assert circuit_breaker.call("example.com", lambda: "matches") == "matches"
+        assert circuit_breaker._get_state("example.com") is None
+
+
+def test_nested_calls_count_a_failure_once(app, circuit_breaker):
+    with pytest.raises(ConnectionError):
+        circuit_breaker.call("example.com", lambda: circuit_breaker.call("example.com", fail))
+
+    assert circuit_breaker._get_state("example.com")["failures"] == 1
+    assert not circuit_breaker.is_open("example.com")
+
+
+def test_scraper_serves_stale_grid_while_the_circuit_is_open(app, example_site):
+    match = MatchInfo(sport="padel", court="Court 1", time="23:30", url="http://a.com", is_available=True)
+    scraper = WebsdepadelScraper(example_site, MatchFilter(days="1", time_min="21:00", time_max="23:59"))
+    date = "2099-01-01"
+    stale_grid = DayGrid(matches=[match], scraped_at=datetime.now(timezone.utc) - timedelta(days=1))
+
+    with (
+        patch.object(scraper, "_get_cached_data", return_value=stale_grid),
+        patch.object(scraper, "_refresh_in_background") as mock_refresh,
+        patch("app.integrations.scrapers.scraper_interface.circuit_breaker.is_open", return_value=True),
+    ):
+        site_matches = scraper.get_date_matches(date)
+
+    assert site_matches.matches == [match]
+    assert site_matches.unavailable
+    mock_refresh.assert_not_called()
+
+
+def test_scraper_failures_open_the_circuit(app, example_site):
+    scraper = WebsdepadelScraper(example_site, MatchFilter(days="1", time_min="21:00", time_max="23:59"))
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_duration=10, cooldown=60, window=300)
+
+    with (
+        patch("app.integrations.scrapers.scraper_interface.circuit_breaker", breaker),
+        patch.object(WebsdepadelScraper, "_get_daily_matches", side_effect=ConnectionError("Site down")) as mock_get,
+    ):
+        with pytest.raises(ConnectionError):
+            scraper.get_date_matches("2099-01-01")
+        with pytest.raises(CircuitOpenError):
+            scraper.get_date_matches("2099-01-02")
+
+    assert mock_get.call_count == 1
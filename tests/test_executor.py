@@ -0,0 +1,81 @@
+import time
+from threading import Lock
+
+import pytest
+
+from app.executor import ScrapeExecutor
+
+
+class TestScrapeExecutor:
+    def test_submit_returns_results(self):
+        executor = ScrapeExecutor(max_workers=4, max_workers_per_host=2)
+        futures = [executor.submit("example.com", lambda x: x * 2, i) for i in range(5)]
+        assert [future.result() for future in futures] == [0, 2, 4, 6, 8]
+
+    def test_submit_propagates_exceptions(self):
+        def fail():
+            raise ValueError("boom")
+
+        executor = ScrapeExecutor(max_workers=2, max_workers_per_host=1)
+        with pytest.raises(ValueError, match="boom"):
+            executor.submit("example.com", fail).result()
+
+    def test_submit_respects_per_host_limit(self):
+        lock = Lock()
+        running: dict[str, int] = {"a.com": 0, "b.com": 0}
+        peak: dict[str, int] = {"a.com": 0, "b.com": 0}
+
+        def work(host):
+            with lock:
+                running[host] += 1
+                peak[host] = max(peak[host], running[host])
+            time.sleep(0.01)
+            with lock:
+                running[host] -= 1
+
+        executor = ScrapeExecutor(max_workers=8, max_workers_per_host=2)
+        futures = [executor.submit(host, work, host) for host in ["a.com", "b.com"] * 6]
+        for future in futures:
+            future.result()
+
+        assert peak == {"a.com": 2, "b.com": 2}
+
+    def test_cancelled_pending_units_are_skipped(self):
+        executor = ScrapeExecutor(max_workers=2, max_workers_per_host=1)
+        calls: list[int] = []
+
+        first = executor.submit("example.com", lambda: time.sleep(0.05))
+        pending = executor.submit("example.com", calls.append, 1)
+        last = executor.submit("example.com", calls.append, 2)
+
+        assert pending.cancel()
+        first.result()
+        last.result()
+        assert calls == [2]
+
+    def test_run_all_runs_the_units_of_a_busy_host_in_the_caller(self):
+        executor = ScrapeExecutor(max_workers=2, max_workers_per_host=1)
+
+        # The caller holds the only slot of the host, the units waiting for it run in the caller instead
+        def fan_out():
+            return executor.run_all("example.com", lambda x: x * 2, [1, 2, 3])
+
+        assert executor.submit("example.com", fan_out).result(timeout=5) == [2, 4, 6]
+
+    def test_run_all_respects_per_host_limit(self):
+        lock = Lock()
+        running, peak = 0, 0
+
+        def work(_):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        executor = ScrapeExecutor(max_workers=8, max_workers_per_host=2)
+        executor.submit("example.com", executor.run_all, "example.com", work, list(range(6))).result(timeout=5)
+
+        assert peak == 2
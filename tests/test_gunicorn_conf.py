@@ -0,0 +1,71 @@
+import os
+import runpy
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from gunicorn.config import Config
+
+GUNICORN_CONF = Path(__file__).parent.parent / "gunicorn.conf.py"
+
+
+def load_config(metrics_dir: Path, **settings: Any) -> dict:
+    # The config exports PROMETHEUS_MULTIPROC_DIR, it must not leak to the metrics of the other tests
+    with (
+        patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(metrics_dir)}),
+        patch.multiple("app.settings", **settings),
+    ):
+        return runpy.run_path(str(GUNICORN_CONF))
+
+
+def test_config_is_valid_for_gunicorn(tmp_path):
+    config = load_config(tmp_path, GUNICORN_WORKERS=3, GUNICORN_MAX_REQUESTS=100)
+
+    gunicorn_config = Config()
+    for name, value in config.items():
+        if name in gunicorn_config.settings:
+            gunicorn_config.set(name, value)
+
+    assert gunicorn_config.workers == 3
+    assert gunicorn_config.max_requests == 100
+    assert gunicorn_config.preload_app is True
+    assert gunicorn_config.worker_class_str == "uvicorn_worker.UvicornWorker"
+    assert gunicorn_config.wsgi_app == "app:asgi_app"
+
+
+def test_threaded_workers_serve_the_wsgi_app(tmp_path):
+    config = load_config(tmp_path, GUNICORN_WORKER_CLASS="gthread", GUNICORN_THREADS=32)
+
+    assert config["wsgi_app"] == "app:app"
+    assert config["threads"] == 32
+
+
+def test_metrics_of_a_previous_run_are_removed_on_start(tmp_path):
+    config = load_config(tmp_path / "metrics", GUNICORN_WORKERS=1)
+    (tmp_path / "metrics" / "counter_1234.db").touch()
+
+    config["on_starting"](None)
+
+    assert list((tmp_path / "metrics").iterdir()) == []
+
+
+def test_metrics_of_exited_workers_are_marked_dead(tmp_path):
+    config = load_config(tmp_path, GUNICORN_WORKERS=1)
+
+    with patch("prometheus_client.multiprocess.mark_process_dead") as mock_mark_process_dead:
+        config["child_exit"](None, type("Worker", (), {"pid": 1234}))
+
+    mock_mark_process_dead.assert_called_once_with(1234)
+
+
+def test_preloaded_app_stores_the_metrics_in_the_multiprocess_directory():
+    # In a new interpreter, loading the config is what imports the app and prometheus_client like in gunicorn, with
+    # the default directory
+    script = f"import runpy; runpy.run_path({str(GUNICORN_CONF)!r}); from prometheus_client import values; "
+    script += "print(values.ValueClass.__qualname__)"
+    env = {key: value for key, value in os.environ.items() if key != "PROMETHEUS_MULTIPROC_DIR"}
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+
+    assert "MultiProcessValue" in result.stdout
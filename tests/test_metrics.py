@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from app.integrations.scrapers import WebsdepadelScraper
+from app.metrics import record_request
+from app.models import MatchFilter, MatchInfo
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_record_request_uses_the_route_namespace():
+    before = sample("padel_api_request_duration_seconds_count", namespace="sites", method="GET", status="200")
+    unmatched = sample("padel_api_request_duration_seconds_count", namespace="unmatched", method="GET", status="404")
+
+    record_request("/api/sites/", "GET", 200, 0.1)
+    record_request(None, "GET", 404, 0.1)
+
+    assert sample("padel_api_request_duration_seconds_count", namespace="sites", method="GET", status="200") == (
+        before + 1
+    )
+    assert (
+        sample("padel_api_request_duration_seconds_count", namespace="unmatched", method="GET", status="404")
+        == unmatched + 1
+    )
+
+
+def test_metrics_endpoint(client):
+    before = sample("padel_api_request_duration_seconds_count", namespace="sites", method="GET", status="200")
+
+    client.get("/api/sites/")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert b"padel_scrape_duration_seconds" in response.data
+    assert sample("padel_api_request_duration_seconds_count", namespace="sites", method="GET", status="200") == (
+        before + 1
+    )
+
+
+@patch.object(WebsdepadelScraper, "_get_daily_matches")
+def test_scrapes_are_measured_per_site(mock_get_daily_matches, app, example_site):
+    mock_get_daily_matches.return_value = [
+        MatchInfo(sport="padel", court="Court 1", time="23:30", url="http://a.com", is_available=True)
+    ]
+    scrape_labels = {"site_type": "websdepadel", "site": example_site.url}
+    scrapes = sample("padel_scrape_duration_seconds_count", **scrape_labels)
+    misses = sample("padel_cache_requests_total", family="availability", result="miss")
+    hits = sample("padel_cache_requests_total", family="availability", result="hit")
+
+    scraper = WebsdepadelScraper(example_site, MatchFilter(days="1", time_min="21:00", time_max="23:59"))
+    scraper.get_site_matches()
+    scraper.get_site_matches()
+
+    assert sample("padel_scrape_duration_seconds_count", **scrape_labels) == scrapes + 1
+    assert sample("padel_cache_requests_total", family="availability", result="miss") == misses + 1
+    assert sample("padel_cache_requests_total", family="availability", result="hit") == hits + 1
+    assert sample("padel_scrapes_in_progress", site_type="websdepadel") == 0
+
+
+@patch("app.api.geolocation.GeolocationManager.get_matching_places", return_value=[])
+def test_cached_views_count_their_cache_lookups(mock_get_matching_places, app):
+    # Without the client fixture, which bypasses the cache of the views
+    misses = sample("padel_cache_requests_total", family="geolocation", result="miss")
+    hits = sample("padel_cache_requests_total", family="geolocation", result="hit")
+
+    client = app.test_client()
+    client.get("/api/geolocation/matching-places/?query=metrics")
+    client.get("/api/geolocation/matching-places/?query=metrics")
+
+    assert sample("padel_cache_requests_total", family="geolocation", result="miss") == misses + 1
+    assert sample("padel_cache_requests_total", family="geolocation", result="hit") == hits + 1
+    mock_get_matching_places.assert_called_once()
@@ -2,6 +2,7 @@ import pytest
 from flask import Flask, g
 from flask.testing import FlaskClient
 
+from app.context_helpers import get_geo_filter, get_sites
 from app.models import GeolocationFilter, SiteType
 from app.services.sites import SUPPORTED_SITES
 
@@ -10,8 +11,17 @@ from app.services.sites import SUPPORTED_SITES
 def middleware_client(app: Flask) -> FlaskClient:
     @app.route("/test")
     def test_middlewares():
+        get_sites()
         return "ok"
 
+    @app.route("/siteless")
+    def siteless():
+        return "ok"
+
+    @app.route("/geo-filter")
+    def geo_filter():
+        return str(get_geo_filter().radius_km)
+
     return app.test_client()
 
 
@@ -33,7 +43,7 @@ def test_site_middleware_custom(middleware_client):
 
 
 def test_geolocation_middleware_custom(mocker, middleware_client, playtomic_site):
-    mocker.patch("app.services.sites.get_playtomic_sites", return_value=[playtomic_site])
+    mocker.patch("app.services.sites.get_playtomic_sites", return_value=[(playtomic_site, 5.6)])
     response = middleware_client.get("/test", headers={"X-GEOLOCATION": "39.509908,-0.386288,3"})
     assert response.text == "ok"
     assert g.sites == [SUPPORTED_SITES[0], SUPPORTED_SITES[7], playtomic_site]
@@ -58,3 +68,32 @@ def test_bad_geolocation_header(middleware_client):
     assert (
         str(exc_info.value) == "Please provide a valid geolocation header with the format: latitude,longitude,radius_km"
     )
+
+
+def test_sites_are_not_resolved_when_not_used(mocker, middleware_client):
+    mock_get_playtomic_sites = mocker.patch("app.services.sites.get_playtomic_sites", return_value=[])
+
+    response = middleware_client.get("/siteless", headers={"X-GEOLOCATION": "39.509908"})
+
+    assert response.text == "ok"
+    assert "geo_filter" not in g and "sites" not in g
+    mock_get_playtomic_sites.assert_not_called()
+
+
+def test_geo_filter_does_not_resolve_the_sites(mocker, middleware_client):
+    mock_get_playtomic_sites = mocker.patch("app.services.sites.get_playtomic_sites", return_value=[])
+
+    response = middleware_client.get("/geo-filter", headers={"X-GEOLOCATION": "39.509908,-0.386288,3"})
+
+    assert response.text == "3"
+    assert "sites" not in g
+    mock_get_playtomic_sites.assert_not_called()
+
+
+def test_docs_do_not_resolve_the_sites(mocker, middleware_client):
+    mock_get_playtomic_sites = mocker.patch("app.services.sites.get_playtomic_sites", return_value=[])
+
+    response = middleware_client.get("/docs", headers={"X-SITE": "customsite.com", "X-GEOLOCATION": "39.5,-0.3,3"})
+
+    assert response.status_code == 200
+    mock_get_playtomic_sites.assert_not_called()
@@ -0,0 +1,95 @@
+import time
+from threading import Barrier, Thread
+
+import pytest
+
+from app.cache import cache
+from app.singleflight import SingleFlight
+
+
+@pytest.fixture
+def single_flight() -> SingleFlight:
+    return SingleFlight(lease=2, poll_interval=0.01)
+
+
+def run_in_threads(app, target, count):
+    results: list = []
+
+    def run():
+        with app.app_context():
+            try:
+                results.append(target())
+            except Exception as e:
+                results.append(e)
+
+    threads = [Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution(app, single_flight):
+    calls: list[int] = []
+    barrier = Barrier(5)
+
+    def scrape():
+        calls.append(1)
+        time.sleep(0.05)
+        return ["match"]
+
+    def target():
+        barrier.wait()
+        return single_flight.do("key", scrape, lambda: None)
+
+    results = run_in_threads(app, target, 5)
+
+    assert len(calls) == 1
+    assert results == [["match"]] * 5
+    assert not cache.has("key-lease")
+
+
+def test_concurrent_calls_share_the_error(app, single_flight):
+    barrier = Barrier(3)
+
+    def scrape():
+        time.sleep(0.05)
+        raise ValueError("Site down")
+
+    def target():
+        barrier.wait()
+        return single_flight.do("key", scrape, lambda: None)
+
+    results = run_in_threads(app, target, 3)
+
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_waits_for_the_worker_holding_the_lease(app, single_flight):
+    cache.add("key-lease", "other-worker")
+
+    def other_worker():
+        time.sleep(0.05)
+        with app.app_context():
+            cache.set("key", ["cached match"])
+
+    Thread(target=other_worker).start()
+    result = single_flight.do("key", lambda: ["scraped match"], lambda: cache.get("key"))
+
+    assert result == ["cached match"]
+
+
+def test_computes_when_the_worker_holding_the_lease_fails(app, single_flight):
+    cache.add("key-lease", "other-worker")
+
+    def other_worker():
+        time.sleep(0.05)
+        with app.app_context():
+            cache.delete("key-lease")
+
+    Thread(target=other_worker).start()
+    result = single_flight.do("key", lambda: ["scraped match"], lambda: cache.get("key"))
+
+    assert result == ["scraped match"]
@@ -0,0 +1,127 @@
+import json
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from app.executor import with_app_context
+from app.integrations.scrapers import WebsdepadelScraper
+from app.models import MatchFilter, MatchInfo
+from app.tracing import (
+    NOOP_SPAN,
+    LogSpanExporter,
+    OTLPSpanExporter,
+    Span,
+    SpanExporter,
+    Tracer,
+    current_span,
+    tracer,
+)
+
+
+class InMemorySpanExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    with patch.object(tracer, "exporter", exporter):
+        yield exporter
+
+
+def test_disabled_tracer_returns_the_noop_span():
+    with Tracer().span("request", path="/") as span:
+        assert span is NOOP_SPAN
+        assert current_span() is None
+
+
+def test_spans_are_nested(exporter):
+    with tracer.span("request") as parent:
+        with tracer.span("scrape", site="example.com") as child:
+            assert current_span() is child
+
+    assert current_span() is None
+    assert [span.name for span in exporter.spans] == ["scrape", "request"]
+    assert child.trace_id == parent.trace_id
+    assert child.parent_span_id == parent.span_id
+    assert parent.parent_span_id is None
+    assert child.attributes == {"site": "example.com"}
+
+
+def test_span_records_errors(exporter):
+    with pytest.raises(ValueError), tracer.span("scrape"):
+        raise ValueError("boom")
+
+    assert exporter.spans[0].error == "ValueError: boom"
+
+
+def test_spans_are_propagated_to_the_executor_tasks(exporter, app):
+    with tracer.span("request") as parent:
+        task = with_app_context(lambda: tracer.span("scrape").__enter__())
+
+    child = task()
+    assert child.parent_span_id == parent.span_id
+
+
+def test_log_exporter(caplog):
+    log_tracer = Tracer(LogSpanExporter())
+    with caplog.at_level(logging.INFO, logger="app.tracing"), log_tracer.span("request", status=200):
+        pass
+
+    span = json.loads(caplog.records[0].getMessage())
+    assert span["name"] == "request"
+    assert span["attributes"] == {"status": 200}
+    assert span["parent_span_id"] is None
+
+
+def test_otlp_payload():
+    otlp_exporter = OTLPSpanExporter("http://collector:4318/v1/traces", "padel-api", interval=3600)
+    otlp_tracer = Tracer(otlp_exporter)
+    with otlp_tracer.span("request"):
+        with otlp_tracer.span("http GET", status=200, url="https://example.com"):
+            pass
+
+    with patch.object(otlp_exporter._session, "post") as mock_post:
+        otlp_exporter.flush()
+
+    payload = mock_post.call_args.kwargs["json"]
+    resource_spans = payload["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "padel-api"}}]
+    child, parent = resource_spans["scopeSpans"][0]["spans"]
+    assert child["parentSpanId"] == parent["spanId"]
+    assert "parentSpanId" not in parent
+    assert len(child["traceId"]) == 32 and len(child["spanId"]) == 16
+    assert {"key": "status", "value": {"intValue": "200"}} in child["attributes"]
+    assert otlp_exporter._queue.empty()
+
+
+@patch.object(WebsdepadelScraper, "_get_daily_matches")
+def test_request_is_traced(mock_get_daily_matches, exporter, client, example_site):
+    mock_get_daily_matches.return_value = [
+        MatchInfo(sport="padel", court="Court 1", time="23:30", url="http://a.com", is_available=True)
+    ]
+
+    response = client.get("/api/availability/?days=1", headers={"X-SITE": example_site.url})
+
+    assert response.status_code == 200
+    spans = {span.name: span for span in exporter.spans}
+    request_span = spans["GET /api/availability/"]
+    assert request_span.attributes["status"] == 200
+    assert spans["resolve_sites"].parent_span_id == request_span.span_id
+    assert spans["scrape"].trace_id == request_span.trace_id
+    assert spans["scrape"].attributes["site"] == example_site.url
+
+
+def test_scraper_spans_share_the_trace(exporter, app, example_site):
+    with patch.object(WebsdepadelScraper, "_get_daily_matches", return_value=[]):
+        with tracer.span("request") as parent:
+            WebsdepadelScraper(
+                example_site, MatchFilter(days="1", time_min="21:00", time_max="23:59")
+            ).get_site_matches()
+
+    assert {span.trace_id for span in exporter.spans} == {parent.trace_id}